@@ -3,7 +3,7 @@ from flask import Blueprint
 api = Blueprint('api', __name__, url_prefix='/api')
 
 # Import and register blueprints
-from . import auth, entries, search
+from . import auth, entries, search, stream, sync, jobs, tasks
 from .interactions import interactions_bp
 from .user_manager import user_activity_bp
 from .feed import feed_bp
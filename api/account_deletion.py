@@ -0,0 +1,163 @@
+from models import (db, User, LogEntry, EntryReaction, Comment, ForumTopic, ForumReply,
+                    ForumCategory, project_members)
+from sqlalchemy import select, delete, or_
+from .change_log import change_tracker, DELETE
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _delete(model, ids, changed_ids=None):
+    # changed_ids saves the change log selecting the rows again (entry ids for reactions)
+    db.session.execute(delete(model).where(model.id.in_(ids)).execution_options(
+        synchronize_session=False, changed_ids=ids if changed_ids is None else changed_ids))
+
+
+def _delete_where(model, *where):
+    """delete rows whose ids we don't have, the change log gets them from RETURNING"""
+    ids = db.session.scalars(delete(model).where(*where).returning(model.id)
+                             .execution_options(synchronize_session=False, changed_ids=())).all()
+    change_tracker.record(model.__tablename__, ids, DELETE)
+
+
+def _split(rows):
+    """[(id, parent id)] as the ids and the distinct non-null parent ids"""
+    return [row[0] for row in rows], {row[1] for row in rows if row[1] is not None}
+
+
+class AccountDeletion:
+    """
+    Deletes a user and everything that depends on them, a batch at a time.
+
+    Each batch is its own short transaction, so other writers only ever wait
+    for one batch instead of the whole account. Rows hanging off the user's
+    content go too: every comment and reaction on their entries, every reply
+    in their topics, and the replies under their own comments. Counters on
+    other people's entries, topics and categories are recounted batch by
+    batch, so they stay right while the deletion runs.
+
+    Each step selects its next batch again after the last one committed,
+    which also catches a comment or reply someone added in the meantime.
+    """
+
+    def __init__(self, developer_tag, batch_size=500):
+        self.developer_tag = developer_tag
+        self.batch_size = batch_size
+        self.done = 0
+        self.total = 0
+
+    # what goes
+
+    def _own_entries(self):
+        return select(LogEntry.id).where(LogEntry.developer_tag == self.developer_tag)
+
+    def _own_topics(self):
+        return select(ForumTopic.id).where(ForumTopic.author_id == self.developer_tag)
+
+    def _comments(self):
+        # the user's comments and every comment on their entries, plus all replies below those
+        doomed = select(Comment.id).where(or_(Comment.user_id == self.developer_tag,
+                                              Comment.entry_id.in_(self._own_entries())))\
+                                   .cte('doomed_comments', recursive=True)
+        doomed = doomed.union_all(select(Comment.id).where(Comment.parent_id == doomed.c.id))
+        # replies are newer than their parents, highest ids first never leaves a reply behind
+        return select(Comment.id, Comment.entry_id).where(Comment.id.in_(select(doomed.c.id)))\
+                                                   .order_by(Comment.id.desc())
+
+    def _reactions(self):
+        return select(EntryReaction.id, EntryReaction.entry_id)\
+               .where(or_(EntryReaction.user_id == self.developer_tag,
+                          EntryReaction.entry_id.in_(self._own_entries())))\
+               .order_by(EntryReaction.id)
+
+    def _replies(self):
+        return select(ForumReply.id, ForumReply.topic_id)\
+               .where(or_(ForumReply.author_id == self.developer_tag,
+                          ForumReply.topic_id.in_(self._own_topics())))\
+               .order_by(ForumReply.id)
+
+    def _topics(self):
+        return select(ForumTopic.id, ForumTopic.category_id)\
+               .where(ForumTopic.author_id == self.developer_tag).order_by(ForumTopic.id)
+
+    def _entries(self):
+        return select(LogEntry.id)\
+               .where(LogEntry.developer_tag == self.developer_tag).order_by(LogEntry.id)
+
+    # batches
+
+    def _delete_comments(self, rows):
+        ids, entry_ids = _split(rows)
+        _delete(Comment, ids)
+        LogEntry.refresh_counts(*entry_ids)
+
+    def _delete_reactions(self, rows):
+        ids, entry_ids = _split(rows)
+        _delete(EntryReaction, ids, changed_ids=entry_ids)
+        LogEntry.refresh_counts(*entry_ids)
+
+    def _delete_replies(self, rows):
+        ids, topic_ids = _split(rows)
+        _delete(ForumReply, ids)
+        ForumTopic.refresh_reply_stats(*topic_ids)
+        categories = db.session.scalars(select(ForumTopic.category_id).distinct()
+                                        .where(ForumTopic.id.in_(topic_ids))).all()
+        ForumCategory.refresh_stats(*[category for category in categories if category is not None])
+
+    def _delete_topics(self, rows):
+        ids, category_ids = _split(rows)
+        # anything posted since the reply step
+        _delete_where(ForumReply, ForumReply.topic_id.in_(ids))
+        _delete(ForumTopic, ids)
+        ForumCategory.refresh_stats(*category_ids)
+
+    def _delete_entries(self, rows):
+        ids = [row[0] for row in rows]
+        # anything added since the comment and reaction steps
+        _delete_where(Comment, Comment.entry_id.in_(ids))
+        db.session.execute(delete(EntryReaction).where(EntryReaction.entry_id.in_(ids))
+                           .execution_options(synchronize_session=False, changed_ids=ids))
+        _delete(LogEntry, ids)
+
+    def _steps(self):
+        # dependents before what they depend on
+        return (
+            ('comments', self._comments, self._delete_comments),
+            ('reactions', self._reactions, self._delete_reactions),
+            ('forum replies', self._replies, self._delete_replies),
+            ('forum topics', self._topics, self._delete_topics),
+            ('entries', self._entries, self._delete_entries),
+        )
+
+    def count(self):
+        """rows to delete, for progress reporting"""
+        self.total = sum(
+            db.session.scalar(select(db.func.count()).select_from(query().order_by(None).subquery()))
+            for _, query, _ in self._steps()
+        ) + 1  # the user
+        return self.total
+
+    def run(self, progress=None):
+        """delete everything, committing per batch; progress(done, total) is called after each"""
+        if not self.total:
+            self.count()
+        for name, query, remove in self._steps():
+            while True:
+                rows = db.session.execute(query().limit(self.batch_size)).all()
+                if not rows:
+                    break
+                remove(rows)
+                db.session.commit()
+                self.done += len(rows)
+                logger.info(f"Deleted {len(rows)} {name} of {self.developer_tag}")
+                if progress:
+                    progress(self.done, self.total)
+
+        db.session.execute(project_members.delete().where(project_members.c.user_id == self.developer_tag))
+        db.session.execute(delete(User).where(User.developer_tag == self.developer_tag)
+                           .execution_options(synchronize_session=False))
+        db.session.commit()
+        self.done += 1
+        if progress:
+            progress(self.done, self.total)
+        return self.done
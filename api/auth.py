@@ -5,11 +5,12 @@ from models import db, User
 from . import api
 from .data_manager import DataManager
 from .user_manager import UserManager
-from flask_mail import Message
+from .outbox import queue_email
 import random
 import string
 import logging
 import time
+from password_hasher import PasswordHasherBusy
 
 # Configure logger
 logging.basicConfig(level=logging.INFO)
@@ -36,13 +37,11 @@ def login():
                 session['verification_code'] = code
                 session['verification_expires'] = time.time() + 300  # 5 minute timeout
                 
-                msg = Message('Login Verification Code',
-                            sender='noreply@devlog.com',
-                            recipients=[user.get_email()])  # Use getter method
-                msg.body = f'Your verification code is: {code}'
-                current_app.extensions['mail'].send(msg)
+                queue_email(user.get_email(),  # Use getter method
+                            'Login Verification Code',
+                            f'Your verification code is: {code}')
                 
-                logger.info(f"2FA code sent to user: {user.get_email()}")  # Use getter method
+                logger.info(f"2FA code queued for user: {user.get_email()}")  # Use getter method
                 return jsonify({
                     'require_2fa': True,
                     'message': 'Please enter verification code',
@@ -56,6 +55,8 @@ def login():
             
         return jsonify({'error': 'Invalid credentials'}), 401
         
+    except PasswordHasherBusy as e:
+        return jsonify({'error': 'Server busy, please try again'}), 503, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         logger.error(f"Login error: {str(e)}")
         return jsonify({'error': 'Login failed'}), 500
@@ -87,6 +88,9 @@ def signup():
         print(f"Signup successful for user: {user.get_email()}")  # Use getter method
         return jsonify({'message': 'Registration successful', 'redirect': '/'})
         
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        return jsonify({'error': 'Server busy, please try again'}), 503, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         db.session.rollback()
         print(f"Signup error: {str(e)}")
@@ -110,11 +114,9 @@ def enable_2fa():
     code = generate_verification_code()
     session['verification_code'] = code
     
-    msg = Message('Your Verification Code',
-                  sender='noreply@devlog.com',
-                  recipients=[user.get_email()])  # Use getter method
-    msg.body = f'Your verification code is: {code}'
-    current_app.extensions['mail'].send(msg)
+    queue_email(user.get_email(),  # Use getter method
+                'Your Verification Code',
+                f'Your verification code is: {code}')
     
     return jsonify({'message': 'Verification code sent'})
 
@@ -0,0 +1,167 @@
+from datetime import datetime
+from sqlalchemy import event, tuple_
+from models import db, ChangeLog, LogEntry, EntryReaction, Comment, ForumTopic, ForumReply
+import logging
+
+logger = logging.getLogger(__name__)
+
+UPSERT = 'upsert'
+DELETE = 'delete'
+
+# tables replicated to clients, in the order a page of changes is applied
+SYNCED_MODELS = (LogEntry, Comment, ForumTopic, ForumReply)
+SYNCED_TABLES = tuple(model.__tablename__ for model in SYNCED_MODELS)
+
+# row ids per statement when superseded log rows are deleted
+DELETE_BATCH = 500
+
+
+class ChangeTracker:
+    """
+    Keeps the change_log table that GET /api/sync reads.
+
+    Every committed insert, update or delete of an entry, comment, forum topic
+    or reply writes a row with a new seq, in the same transaction as the change
+    itself. A reaction counts as a change to its entry, whose counters moved.
+    Older rows for the same record are removed as the new one goes in, so the
+    log holds one row per record (deletes stay as tombstones) and a client
+    starting from 0 walks the whole dataset once.
+
+    ORM writes are picked up after flush. update()/delete() statements never
+    reach the flush: ones that know their rows name them with
+    execution_options(changed_ids=...) (entry ids for entry_reaction), the
+    rest have the ids they are about to touch selected first. insert()
+    statements aren't seen at all: code doing bulk inserts has to call
+    record() itself.
+
+    seq order is commit order because sqlite serializes write transactions;
+    a database with concurrent writers would need the cursor held back.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['change_tracker'] = self
+
+        if not event.contains(db.session, 'after_flush', _note_flush):
+            event.listen(db.session, 'after_flush', _note_flush)
+            event.listen(db.session, 'do_orm_execute', _note_bulk_write)
+            event.listen(db.session, 'before_commit', self._before_commit)
+            event.listen(db.session, 'after_rollback', _forget_changes)
+
+    def record(self, table_name, row_ids, op=UPSERT):
+        """note changes to rows the listeners can't see (e.g. core inserts)"""
+        changes = db.session.info.setdefault('change_log', {})
+        for row_id in row_ids:
+            changes[(table_name, row_id)] = op
+
+    def _before_commit(self, session):
+        # the commit's own flush runs after this event, get its changes in first
+        session.flush()
+        changes = session.info.pop('change_log', None)
+        if changes:
+            self.write(session, changes)
+
+    def write(self, session, changes):
+        """append {(table, row id): op} to the log, dropping older rows for the same records"""
+        log = ChangeLog.__table__
+        connection = session.connection()
+        keys = sorted(changes, key=lambda key: (SYNCED_TABLES.index(key[0]), key[1]))
+        for start in range(0, len(keys), DELETE_BATCH):
+            batch = keys[start:start + DELETE_BATCH]
+            connection.execute(log.delete().where(tuple_(log.c.table_name, log.c.row_id).in_(batch)))
+        now = datetime.utcnow()
+        connection.execute(log.insert(), [
+            {'table_name': table_name, 'row_id': row_id, 'op': changes[(table_name, row_id)], 'changed_at': now}
+            for table_name, row_id in keys
+        ])
+
+    def rebuild(self):
+        """replace the log with one row per existing record, e.g. after bulk loading data"""
+        now = datetime.utcnow()
+        db.session.execute(db.delete(ChangeLog))
+        for model in SYNCED_MODELS:
+            db.session.execute(db.insert(ChangeLog).from_select(
+                ['table_name', 'row_id', 'op', 'changed_at'],
+                db.select(db.literal(model.__tablename__), model.id, db.literal(UPSERT), db.literal(now))
+                  .order_by(model.id)
+            ))
+        # anything noted before this is already covered
+        db.session.info.pop('change_log', None)
+        db.session.commit()
+        logger.info("Change log rebuilt")
+
+    def seed(self):
+        """build the log for a database that predates it"""
+        if db.session.query(ChangeLog.seq).first() is None:
+            self.rebuild()
+
+    def latest(self):
+        return db.session.query(db.func.max(ChangeLog.seq)).scalar() or 0
+
+
+def _record(changes, obj, op):
+    table_name = getattr(obj, '__tablename__', None)
+    if table_name in SYNCED_TABLES:
+        changes[(table_name, obj.id)] = op
+    elif isinstance(obj, EntryReaction) and obj.entry_id is not None:
+        # a delete of the entry itself wins
+        changes.setdefault((LogEntry.__tablename__, obj.entry_id), UPSERT)
+
+
+def _tracked(objects):
+    return [obj for obj in objects if isinstance(obj, SYNCED_MODELS + (EntryReaction,))]
+
+
+def _note_flush(session, flush_context):
+    new = _tracked(session.new)
+    dirty = [obj for obj in _tracked(session.dirty) if session.is_modified(obj, include_collections=False)]
+    deleted = _tracked(session.deleted)
+    if not (new or dirty or deleted):
+        return
+    changes = session.info.setdefault('change_log', {})
+    for obj in new + dirty:
+        _record(changes, obj, UPSERT)
+    for obj in deleted:
+        _record(changes, obj, DELETE)
+
+
+def _note_bulk_write(orm_execute_state):
+    # update()/delete() statements skip the flush (counter refreshes, account deletion)
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    statement = orm_execute_state.statement
+    table = getattr(statement, 'table', None)
+    if table is None:
+        return
+    if table.name in SYNCED_TABLES:
+        table_name, column = table.name, table.c.id
+        op = DELETE if orm_execute_state.is_delete else UPSERT
+    elif table.name == EntryReaction.__tablename__:
+        table_name, column, op = LogEntry.__tablename__, table.c.entry_id, UPSERT
+    else:
+        return
+
+    row_ids = orm_execute_state.execution_options.get('changed_ids')
+    if row_ids is None:
+        # costs a round trip, callers that know their ids should pass changed_ids
+        affected = db.select(column).distinct()
+        if statement.whereclause is not None:
+            affected = affected.where(statement.whereclause)
+        row_ids = orm_execute_state.session.scalars(affected).all()
+    if row_ids:
+        changes = orm_execute_state.session.info.setdefault('change_log', {})
+        for row_id in row_ids:
+            if op == DELETE:
+                changes[(table_name, row_id)] = op
+            else:
+                changes.setdefault((table_name, row_id), op)
+
+
+def _forget_changes(session):
+    session.info.pop('change_log', None)
+
+
+change_tracker = ChangeTracker()
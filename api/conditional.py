@@ -0,0 +1,135 @@
+from flask import request, make_response
+from datetime import timezone
+from models import (db, LogEntry, EntryReaction, Comment, User, Project, LanguageTag,
+                    ForumTopic, ForumReply, project_members, project_tags)
+from sqlalchemy import select, func
+import hashlib
+
+# conditional GET helpers: endpoints compute a cheap version stamp (counts,
+# max ids/timestamps) and answer 304 before doing any real serialization
+
+
+def make_etag(*parts):
+    """stable etag from a handful of version-stamp values"""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def _http_date(value):
+    # http dates have second precision and are utc
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+
+def not_modified(etag, last_modified=None):
+    """return a 304 response if the client's copy is current, otherwise None"""
+    last_modified = _http_date(last_modified)
+    if request.if_none_match:
+        # If-None-Match wins over If-Modified-Since when both are sent
+        if not request.if_none_match.contains_weak(etag):
+            return None
+    elif not (last_modified and request.if_modified_since and last_modified <= request.if_modified_since):
+        return None
+
+    response = make_response('', 304)
+    return with_validators(response, etag, last_modified)
+
+
+def with_validators(response, etag, last_modified=None):
+    """attach ETag/Last-Modified and make the browser revalidate every time"""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = _http_date(last_modified)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Cookie')
+    return response
+
+
+def _latest(*values):
+    present = [v for v in values if v is not None]
+    return max(present) if present else None
+
+
+def _scalars(query, **aggregates):
+    """
+    each aggregate of query as its own labelled scalar subquery, so a version
+    stamp selects them side by side without a FROM list to cross-join
+    """
+    return [query.with_only_columns(aggregate).scalar_subquery().label(name)
+            for name, aggregate in aggregates.items()]
+
+
+def _reaction_stats(query):
+    return _scalars(query,
+                    reactions=func.count(EntryReaction.id),
+                    reaction_types=func.coalesce(func.sum(EntryReaction.reaction_type), 0),
+                    reaction_latest=func.max(EntryReaction.timestamp))
+
+
+def _comment_stats(query):
+    return _scalars(query,
+                    comments=func.count(Comment.id),
+                    comment_last=func.max(Comment.id),
+                    comment_latest=func.max(Comment.timestamp))
+
+
+def entry_version(entry_id, developer_tag):
+    """(etag, last_modified) for /api/entries/<id>, or None if the entry doesn't exist"""
+    row = db.session.execute(select(
+        select(LogEntry.timestamp).where(LogEntry.id == entry_id).scalar_subquery().label('created'),
+        select(func.count(LogEntry.id)).where(LogEntry.id == entry_id).scalar_subquery().label('exists'),
+        select(EntryReaction.reaction_type).where(
+            EntryReaction.entry_id == entry_id, EntryReaction.user_id == developer_tag
+        ).scalar_subquery().label('mine'),
+        *_reaction_stats(select(EntryReaction.id).where(EntryReaction.entry_id == entry_id)),
+        *_comment_stats(select(Comment.id).where(Comment.entry_id == entry_id))
+    )).one()
+    if not row.exists:
+        return None
+    etag = make_etag('entry', entry_id, developer_tag, row.mine, row.reactions, row.reaction_types,
+                     row.reaction_latest, row.comments, row.comment_last)
+    return etag, _latest(row.created, row.reaction_latest, row.comment_latest)
+
+
+def comments_version(entry_id):
+    """(etag, last_modified) for /api/entries/<id>/comments"""
+    row = db.session.execute(select(*_comment_stats(select(Comment.id).where(Comment.entry_id == entry_id)))).one()
+    return make_etag('comments', entry_id, row.comments, row.comment_last), row.comment_latest
+
+
+def search_metadata_version():
+    """(etag, last_modified) for /api/search/metadata"""
+    row = db.session.execute(select(
+        *_scalars(select(Project.name),
+                  projects=func.count(Project.name), project_latest=func.max(Project.created_at)),
+        *_scalars(select(LogEntry.id),
+                  entries=func.count(LogEntry.id), entry_last=func.max(LogEntry.id),
+                  entry_latest=func.max(LogEntry.timestamp)),
+        *_scalars(select(User.id), users=func.count(User.id), user_last=func.max(User.id)),
+        *_scalars(select(LanguageTag.id),
+                  languages=func.count(LanguageTag.id), language_last=func.max(LanguageTag.id)),
+        select(func.count()).select_from(project_tags).scalar_subquery().label('tagged')
+    )).one()
+    return make_etag('search-metadata', *row), _latest(row.project_latest, row.entry_latest)
+
+
+def dashboard_version(developer_tag):
+    """(etag, last_modified) for /api/feed/dashboard of one user"""
+    mine = LogEntry.developer_tag == developer_tag
+    row = db.session.execute(select(
+        *_scalars(select(LogEntry.id).where(mine),
+                  entries=func.count(LogEntry.id), entry_last=func.max(LogEntry.id),
+                  entry_latest=func.max(LogEntry.timestamp)),
+        *_reaction_stats(select(EntryReaction.id).join(LogEntry, EntryReaction.entry_id == LogEntry.id).where(mine)),
+        *_comment_stats(select(Comment.id).join(LogEntry, Comment.entry_id == LogEntry.id).where(mine)),
+        *_scalars(select(ForumReply.id).join(ForumTopic, ForumReply.topic_id == ForumTopic.id)
+                  .where(ForumTopic.author_id == developer_tag),
+                  replies=func.count(ForumReply.id), reply_last=func.max(ForumReply.id),
+                  reply_latest=func.max(ForumReply.created_at)),
+        select(func.count()).select_from(project_members)
+        .where(project_members.c.user_id == developer_tag).scalar_subquery().label('memberships')
+    )).one()
+    etag = make_etag('dashboard', developer_tag, *row)
+    return etag, _latest(row.entry_latest, row.reaction_latest, row.comment_latest, row.reply_latest)
@@ -1,13 +1,94 @@
-from datetime import datetime
+from datetime import datetime, timezone
 import re
 from urllib.parse import urlparse
-import bcrypt
-import bleach
 import logging
 import hashlib
+import threading
+from password_hasher import password_hasher
 
 logger = logging.getLogger(__name__)
 
+# compiled once; re.match() with a pattern string looks it up in re's cache on every call
+GITHUB_URL_PATTERN = re.compile(r'^https?:\/\/github\.com\/[\w\-\.\/]+')
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+PROJECT_NAME_PATTERN = re.compile(r'^[a-zA-Z0-9][a-zA-Z0-9\s_-]*$')
+
+# basic formatting kept in entries and comments
+ALLOWED_TAGS = ['b', 'i', 'u', 'p', 'br', 'code']
+# text without these comes out of bleach unchanged, so it can skip the html parser
+_NEEDS_CLEANING = re.compile(r'[<>&\x00-\x08\x0b-\x1f\x7f]')
+# bleach cleaners keep parser state, one per thread
+_cleaners = threading.local()
+
+
+def _clean(text, tags):
+    if not _NEEDS_CLEANING.search(text):
+        return text
+    cleaner = getattr(_cleaners, 'text' if tags else 'plain', None)
+    if cleaner is None:
+        import bleach  # only text with markup needs the html parser
+        cleaner = bleach.Cleaner(tags=tags, strip=True)
+        setattr(_cleaners, 'text' if tags else 'plain', cleaner)
+    return cleaner.clean(text)
+
+
+class Field:
+    """one field of a Schema: parse turns the raw value into the typed one or raises ValueError"""
+    __slots__ = ('name', 'parse', 'required', 'default')
+
+    def __init__(self, name, parse=None, required=True, default=None):
+        self.name = name
+        self.parse = parse
+        self.required = required
+        self.default = default
+
+
+class Schema:
+    """
+    Validates dicts against a list of fields and returns the typed values
+    (datetimes, ints, cleaned text), so callers use them instead of parsing
+    the raw input a second time. checks run on the typed values for rules
+    that involve several fields.
+    """
+
+    def __init__(self, *fields, checks=(), name='Item'):
+        self.fields = fields
+        self.name = name
+        self.required = tuple(field.name for field in fields if field.required)
+        self.checks = checks
+
+    def validate(self, data):
+        """typed values for data, or ValueError on the first problem"""
+        missing = [name for name in self.required if name not in data]
+        if missing:
+            raise ValueError(f"Missing required fields: {', '.join(missing)}")
+        cleaned = {}
+        for field in self.fields:
+            value = data.get(field.name)
+            if value is None and not field.required:
+                cleaned[field.name] = field.default
+            elif field.parse is None:
+                cleaned[field.name] = value
+            else:
+                cleaned[field.name] = field.parse(value)
+        for check in self.checks:
+            check(cleaned)
+        return cleaned
+
+    def validate_many(self, items):
+        """(typed values, None) or (None, error) per item, in order"""
+        results = []
+        for item in items:
+            if not isinstance(item, dict):
+                results.append((None, f"{self.name} must be an object"))
+                continue
+            try:
+                results.append((self.validate(item), None))
+            except ValueError as e:
+                results.append((None, str(e)))
+        return results
+
+
 class DataManager:
     @staticmethod
     def sanitize_repository_url(url):
@@ -15,16 +96,15 @@ class DataManager:
             return None
         url = url.strip()
         # Only allow GitHub URLs
-        url_pattern = r'^https?:\/\/github\.com\/[\w\-\.\/]+'
-        if not re.match(url_pattern, url):
+        if not GITHUB_URL_PATTERN.match(url):
             raise ValueError("URL must be a valid GitHub repository URL")
         return url
 
     @staticmethod
     def validate_timestamps(start_time, end_time):
         try:
-            start = datetime.fromisoformat(start_time)
-            end = datetime.fromisoformat(end_time)
+            start = DataManager.validate_timestamp(start_time)
+            end = DataManager.validate_timestamp(end_time)
             if end <= start:
                 raise ValueError("End time must be after start time")
             return start, end
@@ -50,7 +130,7 @@ class DataManager:
         if not email or not isinstance(email, str):
             raise ValueError("Invalid email format")
         email = email.strip().lower()
-        if not re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', email):
+        if not EMAIL_PATTERN.match(email):
             raise ValueError("Invalid email format")
         return email
 
@@ -65,7 +145,7 @@ class DataManager:
         project = project.strip()
         if len(project) > 100:
             raise ValueError("Project name must be less than 100 characters")
-        if not re.match(r'^[a-zA-Z0-9][a-zA-Z0-9\s_-]*$', project):
+        if not PROJECT_NAME_PATTERN.match(project):
             raise ValueError("Project name must start with alphanumeric and contain only letters, numbers, spaces, underscores, or hyphens")
         return project[:100]
 
@@ -105,34 +185,21 @@ class DataManager:
 
     @staticmethod
     def hash_password(password):
-        salt = bcrypt.gensalt()
-        return bcrypt.hashpw(DataManager.validate_password(password), salt)
+        return password_hasher.hash(DataManager.validate_password(password))
 
     @staticmethod
     def verify_password(password, hashed):
-        return bcrypt.checkpw(DataManager.validate_password(password), hashed)
+        return password_hasher.check(DataManager.validate_password(password), hashed)
 
     @staticmethod
     def validate_entry_data(data):
-        """Validate entry data and return cleaned data or raise ValueError"""
-        required_fields = ['title', 'content', 'project_name', 'start_time', 'end_time', 'time_worked']
-        missing_fields = [field for field in required_fields if field not in data]
-        
-        if missing_fields:
-            raise ValueError(f"Missing required fields: {', '.join(missing_fields)}")
-            
-        # Sanitize text fields
-        cleaned_data = {
-            'title': DataManager.sanitize_text(data['title']),
-            'content': DataManager.sanitize_text(data['content']),
-            'project_name': DataManager.sanitize_text(data['project_name']),
-            'start_time': DataManager.validate_timestamp(data['start_time']),
-            'end_time': DataManager.validate_timestamp(data['end_time']),
-            'time_worked': DataManager.validate_time_worked(data['time_worked']),
-            'commit_sha': data.get('commit_sha')
-        }
-        
-        return cleaned_data
+        """Validate entry data and return cleaned, typed data or raise ValueError"""
+        return ENTRY_SCHEMA.validate(data)
+
+    @staticmethod
+    def validate_entry_batch(items):
+        """Validate a list of entry dicts, returning (cleaned, error) per item in order"""
+        return ENTRY_SCHEMA.validate_many(items)
 
     @staticmethod
     def get_entry_stats(entry_id):
@@ -152,16 +219,26 @@ class DataManager:
         if not text:
             raise ValueError("Text cannot be empty")
         # Allow only basic HTML tags
-        allowed_tags = ['b', 'i', 'u', 'p', 'br', 'code']
-        return bleach.clean(str(text), tags=allowed_tags, strip=True)
+        return _clean(str(text), ALLOWED_TAGS)
 
     @staticmethod
     def validate_timestamp(timestamp_str):
-        """Validate and parse timestamp"""
+        """Validate and parse timestamp, as naive UTC like the stored ones"""
         try:
-            return datetime.fromisoformat(timestamp_str)
+            value = datetime.fromisoformat(timestamp_str)
         except (ValueError, TypeError):
             raise ValueError("Invalid timestamp format")
+        # an offset would make it uncomparable with naive timestamps
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    @staticmethod
+    def validate_commit_sha(commit_sha):
+        """Optional commit sha: a string of at most 40 characters"""
+        if not isinstance(commit_sha, str) or len(commit_sha.strip()) > 40:
+            raise ValueError("Invalid commit sha")
+        return commit_sha.strip() or None
 
     @staticmethod
     def validate_time_worked(time_worked):
@@ -234,10 +311,28 @@ class DataManager:
             return ""
         
         # Remove any potentially harmful content
-        sanitized = bleach.clean(text.strip(), tags=[], strip=True)
+        sanitized = _clean(text.strip(), [])
         
         # Limit length to prevent extremely long inputs
         if len(sanitized) > 1000:
             sanitized = sanitized[:1000]
             
         return sanitized
+
+
+def _end_after_start(cleaned):
+    if cleaned['end_time'] <= cleaned['start_time']:
+        raise ValueError("End time must be after start time")
+
+
+ENTRY_SCHEMA = Schema(
+    Field('title', DataManager.sanitize_text),
+    Field('content', DataManager.sanitize_text),
+    Field('project_name', DataManager.sanitize_text),
+    Field('start_time', DataManager.validate_timestamp),
+    Field('end_time', DataManager.validate_timestamp),
+    Field('time_worked', DataManager.validate_time_worked),
+    Field('commit_sha', DataManager.validate_commit_sha, required=False),
+    checks=(_end_after_start,),
+    name='Entry'
+)
@@ -1,4 +1,4 @@
-from flask import jsonify, request
+from flask import jsonify, request, current_app
 from datetime import datetime
 from flask_login import current_user, login_required
 from models import LogEntry, User, db, Project, LogEntry
@@ -8,8 +8,14 @@ from .user_manager import UserManager
 import logging
 import math
 import json
-from .gogitter import GoGitter
+from .job_queue import accepted
+from .tasks import project_commits
+from .conditional import entry_version, make_etag, not_modified, with_validators
+from .reaction_buffer import reaction_buffer
+from .change_log import change_tracker
 from functools import wraps
+from sqlalchemy import insert
+from werkzeug.exceptions import HTTPException
 
 # logging setup for terminal output
 logging.basicConfig(level=logging.INFO)
@@ -56,14 +62,14 @@ def create_entry():
         # Create entry
         try:
             entry = LogEntry(
-                title=data['title'],
-                content=data['content'],
-                project_name=data['project_name'],
+                title=cleaned_data['title'],
+                content=cleaned_data['content'],
+                project_name=cleaned_data['project_name'],
                 developer_tag=current_user.developer_tag,
-                start_time=datetime.fromisoformat(data['start_time']),
-                end_time=datetime.fromisoformat(data['end_time']),
-                time_worked=int(data['time_worked']),
-                commit_sha=data.get('commit_sha')  # Only include commit_sha
+                start_time=cleaned_data['start_time'],
+                end_time=cleaned_data['end_time'],
+                time_worked=cleaned_data['time_worked'],
+                commit_sha=cleaned_data['commit_sha']  # Only include commit_sha
             )
             
             logger.info(f"Created entry object: {entry}")
@@ -82,40 +88,88 @@ def create_entry():
         db.session.rollback()
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
-    @require_api_key
-    def create_entry_api():
-        try:
-            data = request.get_json()
-            user = User.query.filter_by(api_key=request.headers.get('X-API-Key')).first()
-            
-            start_time, end_time = DataManager.validate_timestamps(
-                data['start_time'], 
-                data['end_time']
-            )
+# bulk create entries for API-key clients (backfills from time trackers etc.)
+@api.route('/entries/bulk', methods=['POST'])
+@require_api_key
+def create_entries_bulk():
+    user = request.current_api_user
+    max_items = current_app.config.get('BULK_ENTRY_MAX_ITEMS', 1000)
+    max_bytes = current_app.config.get('BULK_ENTRY_MAX_BYTES', 2 * 1024 * 1024)
 
-            entry = LogEntry(
-                project=DataManager.sanitize_project(data['project']),
-                content=DataManager.sanitize_content(data['content']),
-                repository_url=DataManager.sanitize_repository_url(data['repository_url']),
-                start_time=start_time,
-                end_time=end_time,
-                developer_tag=user.developer_tag
-            )
+    if request.content_length is not None and request.content_length > max_bytes:
+        return jsonify({'error': f'Payload exceeds {max_bytes} bytes'}), 413
 
-            entry.time_worked = calculate_time_worked(entry.start_time, entry.end_time)
-            
-            db.session.add(entry)
-            db.session.commit()
-            
-            return jsonify(entry.to_dict()), 201
+    data = request.get_json(silent=True)
+    items = data.get('entries') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Expected a non-empty "entries" list'}), 400
+    if len(items) > max_items:
+        return jsonify({'error': f'Batch exceeds maximum of {max_items} entries'}), 413
+    atomic = bool(data.get('atomic')) if isinstance(data, dict) else False
+
+    validated = DataManager.validate_entry_batch(items)
 
+    # one query for every referenced project
+    project_names = {cleaned['project_name'] for cleaned, error in validated if cleaned}
+    existing = {name for (name,) in db.session.query(Project.name)
+                .filter(Project.name.in_(project_names)).all()} if project_names else set()
+
+    results, rows = [], []
+    now = datetime.utcnow()
+    for index, (cleaned, error) in enumerate(validated):
+        if cleaned and cleaned['project_name'] not in existing:
+            error = f"Project not found: {cleaned['project_name']}"
+        if error:
+            results.append({'index': index, 'status': 'error', 'error': error})
+            continue
+        results.append({'index': index, 'status': 'created'})
+        rows.append({
+            'title': cleaned['title'],
+            'content': cleaned['content'],
+            'project_name': cleaned['project_name'],
+            'developer_tag': user.developer_tag,
+            'timestamp': now,
+            'start_time': cleaned['start_time'],
+            'end_time': cleaned['end_time'],
+            'time_worked': cleaned['time_worked'],
+            'commit_sha': cleaned['commit_sha']
+        })
+
+    failed = len(items) - len(rows)
+    if atomic and failed:
+        for result in results:
+            if result['status'] == 'created':
+                result['status'] = 'skipped'
+        return jsonify({'created': 0, 'failed': failed, 'results': results}), 400
+
+    if rows:
+        try:
+            # batched multi-row insert, ids come back in the order of rows
+            ids = db.session.scalars(
+                insert(LogEntry).returning(LogEntry.id, sort_by_parameter_order=True),
+                rows
+            ).all()
+            # core inserts don't go through the flush the change log listens to
+            change_tracker.record(LogEntry.__tablename__, ids)
+            db.session.commit()
         except Exception as e:
+            logger.error("Error bulk creating entries", exc_info=True)
             db.session.rollback()
-            return jsonify({'error': str(e)}), 400
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+        created = iter(ids)
+        for result in results:
+            if result['status'] == 'created':
+                result['id'] = next(created)
+
+    logger.info(f"Bulk created {len(rows)} entries for {user.developer_tag} ({failed} failed)")
+    status = 201 if not failed else (207 if rows else 400)
+    return jsonify({'created': len(rows), 'failed': failed, 'results': results}), status
 
 
 # Get all entries
 @api.route('/entries', methods=['GET'])
+@reaction_buffer.settled
 def get_entries():
     try:
         entries = LogEntry.query.order_by(LogEntry.timestamp.desc()).all()
@@ -148,6 +202,7 @@ def get_metadata():
         return jsonify({'error': str(e)}), 500
 
 @api.route('/entries/user-stats', methods=['GET'])
+@reaction_buffer.settled
 def get_user_stats():
     user = UserManager.get_current_user()
     if not user:
@@ -178,47 +233,42 @@ def get_entry(entry_id):
         return jsonify({'error': 'Authentication required'}), 401
 
     try:
+        # answer polling clients from a one-query version stamp when nothing changed
+        version = entry_version(entry_id, user.developer_tag)
+        if version:
+            # buffered reactions that aren't flushed yet are part of what the client sees
+            pending = reaction_buffer.pending_state(entry_id, user.developer_tag)
+            if pending:
+                version = (make_etag(version[0], pending), version[1])
+            cached = not_modified(*version)
+            if cached:
+                return cached
+
         entry = LogEntry.query.get_or_404(entry_id)
         entry_data = entry.to_dict()
         entry_data['user_reaction'] = entry.get_user_reaction(user.developer_tag)
-        return jsonify(entry_data)
+        reaction_buffer.overlay(entry_data, entry_id, user.developer_tag)
+        return with_validators(jsonify(entry_data), *version)
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
 @api.route('/projects/<string:project_name>/commits', methods=['GET'])
 @login_required
 def get_project_commits(project_name):
-    logger.info(f"Fetching commits for project: {project_name}")
-    
+    """
+    The project's recent commits from the last GitHub fetch. Before the first
+    fetch has finished this answers 202 with the job to poll; its result
+    holds the commits.
+    """
     try:
-        # Get project from database
         project = Project.query.get_or_404(project_name)
-        logger.info(f"Found project: {project.name}")
-
-        # Initialize GoGitter
-        gogitter = GoGitter()
-        
-        # Get commits from GitHub
-        commits = gogitter.get_commit_history(project.repository_url)
-        logger.info(f"Retrieved {len(commits)} commits")
-        
-        # Format commit data for frontend
-        formatted_commits = []
-        for commit in commits:
-            try:
-                formatted_commits.append({
-                    'sha': commit.sha,
-                    'message': commit.commit.message,
-                    'author': commit.commit.author.name,
-                    'date': commit.commit.author.date.isoformat(),
-                    'url': commit.html_url
-                })
-            except AttributeError as e:
-                logger.warning(f"Error formatting commit {commit.sha}: {str(e)}")
-                continue
-        
-        return jsonify(formatted_commits), 200
+        commits, job = project_commits(project.name, created_by=current_user.developer_tag)
+        if commits is None:
+            return accepted(job)
+        return jsonify(commits), 200
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching commits for project {project_name}: {str(e)}", exc_info=True)
         return jsonify({'error': f'Failed to fetch commits: {str(e)}'}), 500
\ No newline at end of file
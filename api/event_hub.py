@@ -0,0 +1,160 @@
+from collections import deque
+from sqlalchemy import event
+from models import db
+import itertools
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# sent instead of the events a slow client missed; the client refetches
+RESYNC = 'resync'
+
+
+def entry_topic(entry_id):
+    return f'entry:{entry_id}'
+
+
+def forum_topic(topic_id):
+    return f'topic:{topic_id}'
+
+
+def inbox_topic(developer_tag):
+    return f'user:{developer_tag}'
+
+
+class Subscriber:
+    """one connected client: the topics it follows and a bounded queue of events"""
+
+    def __init__(self, topics, max_queue):
+        self.topics = frozenset(topics)
+        self.max_queue = max_queue
+        self.queue = deque()
+        self.overflowed = False
+        self._ready = threading.Condition()
+
+    def push(self, item):
+        with self._ready:
+            # nothing more is queued until the client has seen the resync
+            if self.overflowed:
+                return
+            if len(self.queue) >= self.max_queue:
+                self.queue.clear()
+                self.queue.append((None, RESYNC, '{}'))
+                self.overflowed = True
+            else:
+                self.queue.append(item)
+            self._ready.notify()
+
+    def pop(self, timeout):
+        """next (id, type, json) or None if nothing arrived within timeout"""
+        with self._ready:
+            if not self.queue:
+                self._ready.wait(timeout)
+            if not self.queue:
+                return None
+            item = self.queue.popleft()
+            if item[1] == RESYNC:
+                self.overflowed = False
+            return item
+
+
+class EventHub:
+    """
+    In-process pub/sub for the /api/stream endpoint.
+
+    Writers call publish_on_commit() and the events go out once the session
+    commits (and are dropped on rollback), so clients never see a comment
+    that didn't make it to the database. Each subscriber has a bounded queue;
+    one that falls STREAM_QUEUE_SIZE events behind gets a single "resync"
+    marker instead and should refetch what it shows.
+
+    Subscribers only hear about writes made by this process.
+    """
+
+    def __init__(self, app=None):
+        self.max_queue = 100
+        self.max_clients = 200
+        self.keepalive = 15
+        self._topics = {}
+        self._clients = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.published = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_queue = app.config.get('STREAM_QUEUE_SIZE', 100)
+        self.max_clients = app.config.get('STREAM_MAX_CLIENTS', 200)
+        self.keepalive = app.config.get('STREAM_KEEPALIVE', 15)
+        app.extensions['event_hub'] = self
+
+        if not event.contains(db.session, 'after_commit', self._after_commit):
+            event.listen(db.session, 'after_commit', self._after_commit)
+            event.listen(db.session, 'after_rollback', _forget_events)
+
+    # subscriptions
+
+    def subscribe(self, topics):
+        """register a client, or None when STREAM_MAX_CLIENTS are already connected"""
+        subscriber = Subscriber(topics, self.max_queue)
+        with self._lock:
+            if self._clients >= self.max_clients:
+                return None
+            self._clients += 1
+            for topic in subscriber.topics:
+                self._topics.setdefault(topic, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._clients -= 1
+            for topic in subscriber.topics:
+                listeners = self._topics.get(topic)
+                if listeners is not None:
+                    listeners.discard(subscriber)
+                    if not listeners:
+                        del self._topics[topic]
+
+    # publishing
+
+    def publish(self, topic, kind, data):
+        """send an event to everyone following topic right now"""
+        with self._lock:
+            listeners = list(self._topics.get(topic, ()))
+            event_id = next(self._ids)
+            self.published += 1
+        if not listeners:
+            return
+        # serialized once, shared by every subscriber
+        item = (event_id, kind, json.dumps(dict(data, topic=topic)))
+        for subscriber in listeners:
+            subscriber.push(item)
+
+    def publish_on_commit(self, topic, kind, data):
+        """queue an event on the current session, sent when it commits"""
+        db.session.info.setdefault('stream_events', []).append((topic, kind, data))
+
+    def _after_commit(self, session):
+        for topic, kind, data in session.info.pop('stream_events', ()):
+            try:
+                self.publish(topic, kind, data)
+            except Exception as e:
+                logger.error(f"Error publishing {kind} event: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'clients': self._clients,
+                'topics': len(self._topics),
+                'published': self.published
+            }
+
+
+def _forget_events(session):
+    session.info.pop('stream_events', None)
+
+
+event_hub = EventHub()
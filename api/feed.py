@@ -3,13 +3,21 @@ from flask_login import login_required, current_user
 from models import LogEntry, Project, User, Comment, ForumReply, ForumTopic, ForumCategory, EntryReaction
 from sqlalchemy import desc, func
 from datetime import datetime, timedelta
+from .conditional import dashboard_version, not_modified, with_validators
+from .reaction_buffer import reaction_buffer
 
 feed_bp = Blueprint('feed', __name__)
 
 @feed_bp.route('/dashboard')
 @login_required
+@reaction_buffer.settled
 def dashboard_feed():
     try:
+        version = dashboard_version(current_user.developer_tag)
+        cached = not_modified(*version)
+        if cached:
+            return cached
+
         # Get user stats
         user_stats = {
             'project_count': current_user.projects.count(),
@@ -65,7 +73,7 @@ def dashboard_feed():
                     'topic_id': reply.topic_id,
                     'topic_title': topic.title if topic else 'Unknown Topic',
                     'category': category.name if category else 'general',
-                    'language_name': category.language_name if category and category.language_name else None
+                    'language_name': category.language_tag.name if category and category.language_tag else None
                 })
         
         # Get recent comments on user's entries (last 10)
@@ -89,13 +97,13 @@ def dashboard_feed():
                     'project_name': entry.project_name if entry else 'Unknown Project'
                 })
         
-        return jsonify({
+        return with_validators(jsonify({
             'user_stats': user_stats,
             'reaction_stats': reaction_stats,
             'recent_entries': recent_entries_data,
             'recent_topic_replies': recent_topic_replies,
             'recent_entry_comments': recent_entry_comments
-        })
+        }), *version)
         
     except Exception as e:
         current_app.logger.error(f"Dashboard feed error: {str(e)}", exc_info=True)
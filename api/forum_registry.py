@@ -0,0 +1,149 @@
+from sqlalchemy import event, inspect
+from models import db, LanguageTag, ForumCategory
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class LanguageForum:
+    """detached stand-in for a LanguageTag, enough for the forum templates"""
+
+    __slots__ = ('id', 'name')
+
+    def __init__(self, id, name):
+        self.id = id
+        self.name = name
+
+    get_icon_path = LanguageTag.get_icon_path
+    get_icon_fallback = LanguageTag.get_icon_fallback
+
+    def __repr__(self):
+        return f'<LanguageForum {self.name}>'
+
+
+class ForumRegistry:
+    """
+    In-memory map from (language, category) and (project, category) to forum
+    category ids, so forum routes resolve their URL without a query.
+
+    Categories only appear when create_default_forums() runs or a project is
+    created. Committing a new, renamed or deleted tag or category marks the
+    registry stale and the next lookup reloads it. A miss also reloads (at most
+    once per miss_refresh seconds) in case another process added a forum.
+    """
+
+    def __init__(self, app=None):
+        self.languages = {}
+        self.language_categories = {}
+        self.project_categories = {}
+        self.stale = True
+        self.miss_refresh = 30
+        self.loaded_at = 0.0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.miss_refresh = app.config.get('FORUM_REGISTRY_MISS_REFRESH', 30)
+        app.extensions['forum_registry'] = self
+
+        if not event.contains(db.session, 'after_flush', _note_flush):
+            event.listen(db.session, 'after_flush', _note_flush)
+            event.listen(db.session, 'do_orm_execute', _note_bulk_write)
+            event.listen(db.session, 'after_commit', self._after_commit)
+            event.listen(db.session, 'after_rollback', _forget_writes)
+
+    def rebuild(self):
+        """reload every forum category in one query"""
+        rows = db.session.query(ForumCategory.id, ForumCategory.name, ForumCategory.project_name,
+                                LanguageTag.id, LanguageTag.name)\
+                         .outerjoin(LanguageTag, ForumCategory.language_tag_id == LanguageTag.id)\
+                         .all()
+
+        languages = {}
+        language_categories = {}
+        project_categories = {}
+        for category_id, category, project_name, tag_id, tag_name in rows:
+            if project_name is not None:
+                project_categories[(project_name, category)] = category_id
+            elif tag_id is not None:
+                key = tag_name.lower()
+                languages.setdefault(key, LanguageForum(tag_id, tag_name))
+                language_categories[(key, category)] = category_id
+
+        with self._lock:
+            self.languages = languages
+            self.language_categories = language_categories
+            self.project_categories = project_categories
+            self.stale = False
+            self.loaded_at = time.monotonic()
+        logger.info(f"Forum registry built: {len(language_categories)} language forums, "
+                    f"{len(project_categories)} project forums")
+
+    def _lookup(self, find):
+        if self.stale:
+            self.rebuild()
+        found = find()
+        if found is None and time.monotonic() - self.loaded_at > self.miss_refresh:
+            self.rebuild()
+            found = find()
+        return found
+
+    def language_forum(self, language, category):
+        """(LanguageForum, category id) for a default language forum, or (None, None)"""
+        key = (language.lower(), category)
+
+        def find():
+            with self._lock:
+                category_id = self.language_categories.get(key)
+                return None if category_id is None else (self.languages[key[0]], category_id)
+
+        return self._lookup(find) or (None, None)
+
+    def project_category(self, project_name, category):
+        """category id of a project's forum, or None"""
+        key = (project_name, category)
+
+        def find():
+            with self._lock:
+                return self.project_categories.get(key)
+
+        return self._lookup(find)
+
+    def _after_commit(self, session):
+        if session.info.pop('forum_registry_stale', False):
+            self.stale = True
+
+
+def _note_flush(session, flush_context):
+    if any(isinstance(obj, (LanguageTag, ForumCategory)) for obj in session.new) or \
+       any(isinstance(obj, (LanguageTag, ForumCategory)) for obj in session.deleted):
+        session.info['forum_registry_stale'] = True
+        return
+    for obj in session.dirty:
+        if isinstance(obj, LanguageTag) and inspect(obj).attrs.name.history.has_changes():
+            session.info['forum_registry_stale'] = True
+        elif isinstance(obj, ForumCategory):
+            state = inspect(obj).attrs
+            if any(state[attr].history.has_changes() for attr in ('name', 'language_tag_id', 'project_name')):
+                session.info['forum_registry_stale'] = True
+
+
+def _note_bulk_write(orm_execute_state):
+    # the data generator and migrations insert categories with core statements
+    if orm_execute_state.is_insert or orm_execute_state.is_delete or orm_execute_state.is_update:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None and table.name in (LanguageTag.__tablename__, ForumCategory.__tablename__):
+            # stats updates don't move categories around
+            if orm_execute_state.is_update and table.name == ForumCategory.__tablename__:
+                return
+            orm_execute_state.session.info['forum_registry_stale'] = True
+
+
+def _forget_writes(session):
+    session.info.pop('forum_registry_stale', None)
+
+
+forum_registry = ForumRegistry()
@@ -1,20 +1,101 @@
 from flask import Blueprint, jsonify, request, render_template, abort, flash, redirect, url_for
 from flask_login import current_user, login_required
 from models import db, Project, LanguageTag, ForumCategory, ForumTopic, ForumReply
+from sqlalchemy.orm import joinedload
+from .forum_registry import forum_registry
+from .event_hub import event_hub, forum_topic, inbox_topic
 from datetime import datetime
+from werkzeug.exceptions import HTTPException
 import logging
 
 forums_bp = Blueprint('forums', __name__, url_prefix='/forums')
 logger = logging.getLogger(__name__)
 
+TOPICS_PER_PAGE = 20
+
+def topic_sort():
+    """'activity' (bumped by replies, the default) or 'newest'"""
+    return 'newest' if request.args.get('sort') == 'newest' else 'activity'
+
+def paginate_topics(category_id):
+    """one page of a category's topics using the (category_id, last_activity_at) index"""
+    order = ForumTopic.created_at if topic_sort() == 'newest' else ForumTopic.last_activity_at
+    return ForumTopic.query.filter_by(category_id=category_id)\
+                           .order_by(order.desc(), ForumTopic.id.desc())\
+                           .paginate(page=request.args.get('page', 1, type=int),
+                                     per_page=TOPICS_PER_PAGE, error_out=False)
+
+REPLIES_PER_PAGE = 50
+
+def reply_page(topic_id, after=None, limit=REPLIES_PER_PAGE):
+    """replies of a topic in posting order after reply id `after`; returns (replies, has_more)"""
+    query = ForumReply.query.filter(ForumReply.topic_id == topic_id)
+    if after:
+        query = query.filter(ForumReply.id > after)
+    # keyset on id rides the topic_id index, so deep pages cost the same as the first
+    replies = query.order_by(ForumReply.id).limit(limit + 1).all()
+    return replies[:limit], len(replies) > limit
+
+def language_forum_or_404(language, category):
+    """(language, category id) of a default language forum from the registry"""
+    tag, category_id = forum_registry.language_forum(language, category)
+    if category_id is None:
+        abort(404)
+    return tag, category_id
+
+def project_category_or_404(project_name, category):
+    """category id of a project forum from the registry"""
+    category_id = forum_registry.project_category(project_name, category)
+    if category_id is None:
+        abort(404)
+    return category_id
+
+def publish_reply(topic, reply):
+    """live events for a new reply: to the topic's viewers and the topic author's inbox"""
+    # ids only exist after a flush
+    db.session.flush()
+    event_hub.publish_on_commit(forum_topic(topic.id), 'reply', {
+        'id': reply.id,
+        'topic_id': topic.id,
+        'author_id': reply.author_id,
+        'created_at': reply.created_at.isoformat(),
+        'html': render_template('partials/forum_reply.html', reply=reply)
+    })
+    if topic.author_id != reply.author_id:
+        event_hub.publish_on_commit(inbox_topic(topic.author_id), 'inbox', {
+            'kind': 'reply',
+            'topic_id': topic.id,
+            'topic_title': topic.title,
+            'reply_id': reply.id,
+            'author_id': reply.author_id
+        })
+
+def load_topic(topic_id):
+    """topic with its category in one query (replies update the category stats), 404 if missing"""
+    topic = ForumTopic.query.options(joinedload(ForumTopic.category))\
+                            .filter(ForumTopic.id == topic_id).first()
+    if topic is None:
+        abort(404)
+    return topic
+
 @forums_bp.route('/')
 @login_required
 def forum_index():
     """show forum index with all supported languages"""
-    # Only show languages that have default forums
-    languages = LanguageTag.query.filter(
-        LanguageTag.forums.any(ForumCategory.project_name.is_(None))
-    ).all()
+    # Only show languages that have default forums, along with each forum's
+    # maintained stats so the template doesn't query per language
+    rows = db.session.query(LanguageTag, ForumCategory)\
+                     .join(ForumCategory, ForumCategory.language_tag_id == LanguageTag.id)\
+                     .filter(ForumCategory.project_name.is_(None))\
+                     .order_by(LanguageTag.id)\
+                     .all()
+    languages = []
+    forums = {}
+    for tag, forum_cat in rows:
+        if tag.id not in forums:
+            languages.append(tag)
+            forums[tag.id] = {}
+        forums[tag.id][forum_cat.name] = forum_cat
     
     # Get recent topics across all forums
     recent_topics = ForumTopic.query.join(ForumCategory)\
@@ -25,6 +106,7 @@ def forum_index():
     return render_template('forum.html',
                          forum_title="Programming Forums",
                          languages=languages,
+                         forums=forums,
                          recent_topics=recent_topics)
 
 @forums_bp.route('/<language>/<category>')
@@ -34,22 +116,17 @@ def language_forum(language, category):
     if category not in ['general', 'help']:
         abort(400, description="Invalid category")
         
-    tag = LanguageTag.query.filter_by(name=language.lower()).first_or_404()
-    forum_cat = ForumCategory.query.filter_by(
-        language_tag_id=tag.id,
-        name=category,
-        project_name=None  # Ensure this is a language forum, not project forum
-    ).first_or_404()
+    tag, category_id = language_forum_or_404(language, category)
     
-    topics = ForumTopic.query.filter_by(category_id=forum_cat.id)\
-                            .order_by(ForumTopic.created_at.desc())\
-                            .all()
+    topics = paginate_topics(category_id)
     
     return render_template('language_forum.html',
                          language_tag=tag,
                          active_tab=category,
-                         topics=topics,
-                         category_id=forum_cat.id)
+                         topics=topics.items,
+                         pagination=topics,
+                         sort=topic_sort(),
+                         category_id=category_id)
 
 @forums_bp.route('/projects/<project_name>/<category>')
 @login_required
@@ -60,22 +137,21 @@ def project_forum(project_name, category):
             abort(400, description="Invalid category")
             
         project = Project.query.get_or_404(project_name)
-        forum_cat = ForumCategory.query.filter_by(
-            project_name=project_name,
-            name=category
-        ).first_or_404()
+        category_id = project_category_or_404(project_name, category)
         
-        topics = ForumTopic.query.filter_by(category_id=forum_cat.id)\
-                                .order_by(ForumTopic.created_at.desc())\
-                                .all()
+        topics = paginate_topics(category_id)
         
         return render_template('base_forum.html',
                              forum_title=f"{project_name} - {category.capitalize()}",
                              project=project,
                              active_tab=category,
-                             topics=topics,
-                             category_id=forum_cat.id)
+                             topics=topics.items,
+                             pagination=topics,
+                             sort=topic_sort(),
+                             category_id=category_id)
                              
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in project forum: {str(e)}")
         abort(500)
@@ -89,22 +165,21 @@ def new_topic(project_name, category):
             abort(400, description="Invalid category")
             
         project = Project.query.get_or_404(project_name)
-        forum_cat = ForumCategory.query.filter_by(
-            project_name=project_name,
-            name=category
-        ).first_or_404()
+        category_id = project_category_or_404(project_name, category)
         
         if request.method == 'POST':
             # Create new topic
+            forum_cat = db.session.get(ForumCategory, category_id)
             topic = ForumTopic(
                 title=request.form['title'],
                 content=request.form['content'],
-                category_id=forum_cat.id,
+                category_id=category_id,
                 author_id=current_user.developer_tag,
                 project_name=project_name
             )
             
             db.session.add(topic)
+            forum_cat.record_topic(topic)
             db.session.commit()
             
             flash('Topic created successfully', 'success')
@@ -129,16 +204,20 @@ def view_topic(project_name, category, topic_id):
             abort(400, description="Invalid category")
             
         project = Project.query.get_or_404(project_name)
+        category_id = project_category_or_404(project_name, category)
         topic = ForumTopic.query.get_or_404(topic_id)
         
         # Verify this topic belongs to the correct category and project
-        if topic.category.project_name != project_name or topic.category.name != category:
+        if topic.category_id != category_id:
             abort(404)
         
+        replies, has_more = reply_page(topic.id, request.args.get('after', type=int))
         return render_template('topic.html',
                              project=project,
                              category=category,
-                             topic=topic)
+                             topic=topic,
+                             replies=replies,
+                             has_more=has_more)
                              
     except Exception as e:
         logger.error(f"Error viewing topic: {str(e)}")
@@ -153,10 +232,11 @@ def add_reply(project_name, category, topic_id):
         if category not in ['general', 'help']:
             abort(400, description="Invalid category")
             
-        topic = ForumTopic.query.get_or_404(topic_id)
+        category_id = project_category_or_404(project_name, category)
+        topic = load_topic(topic_id)
         
         # Verify this topic belongs to the correct category and project
-        if topic.category.project_name != project_name or topic.category.name != category:
+        if topic.category_id != category_id:
             abort(404)
             
         reply = ForumReply(
@@ -167,6 +247,8 @@ def add_reply(project_name, category, topic_id):
         )
         
         db.session.add(reply)
+        topic.record_reply(reply)
+        publish_reply(topic, reply)
         db.session.commit()
         
         flash('Reply added successfully', 'success')
@@ -192,21 +274,18 @@ def create_language_topic(language, category):
         if category not in ['general', 'help']:
             abort(400, description="Invalid category")
             
-        tag = LanguageTag.query.filter_by(name=language.lower()).first_or_404()
-        forum_cat = ForumCategory.query.filter_by(
-            language_tag_id=tag.id,
-            name=category,
-            project_name=None
-        ).first_or_404()
+        tag, category_id = language_forum_or_404(language, category)
+        forum_cat = db.session.get(ForumCategory, category_id)
         
         topic = ForumTopic(
             title=request.form['title'],
             content=request.form['content'],
-            category_id=forum_cat.id,
+            category_id=category_id,
             author_id=current_user.developer_tag
         )
         
         db.session.add(topic)
+        forum_cat.record_topic(topic)
         db.session.commit()
         
         flash('Topic created successfully', 'success')
@@ -226,19 +305,20 @@ def view_language_topic(language, category, topic_id):
         if category not in ['general', 'help']:
             abort(400, description="Invalid category")
             
-        tag = LanguageTag.query.filter_by(name=language.lower()).first_or_404()
+        tag, category_id = language_forum_or_404(language, category)
         topic = ForumTopic.query.get_or_404(topic_id)
         
         # Verify this topic belongs to the correct language category
-        if (topic.category.language_tag_id != tag.id or 
-            topic.category.name != category or 
-            topic.category.project_name is not None):
+        if topic.category_id != category_id:
             abort(404)
         
+        replies, has_more = reply_page(topic.id, request.args.get('after', type=int))
         return render_template('topic.html',
                              language_tag=tag,
                              category=category,
                              topic=topic,
+                             replies=replies,
+                             has_more=has_more,
                              is_language_forum=True)
                              
     except Exception as e:
@@ -254,13 +334,11 @@ def add_language_reply(language, category, topic_id):
         if category not in ['general', 'help']:
             abort(400, description="Invalid category")
             
-        tag = LanguageTag.query.filter_by(name=language.lower()).first_or_404()
-        topic = ForumTopic.query.get_or_404(topic_id)
+        tag, category_id = language_forum_or_404(language, category)
+        topic = load_topic(topic_id)
         
         # Verify this topic belongs to the correct language category
-        if (topic.category.language_tag_id != tag.id or 
-            topic.category.name != category or 
-            topic.category.project_name is not None):
+        if topic.category_id != category_id:
             abort(404)
         
         content = request.form.get('content', '').strip()
@@ -277,6 +355,8 @@ def add_language_reply(language, category, topic_id):
         )
         
         db.session.add(reply)
+        topic.record_reply(reply)
+        publish_reply(topic, reply)
         db.session.commit()
         
         flash('Reply posted successfully', 'success')
@@ -288,3 +368,24 @@ def add_language_reply(language, category, topic_id):
         flash('Error posting reply', 'error')
         return redirect(url_for('forums.view_language_topic', 
                               language=language, category=category, topic_id=topic_id))
+
+@forums_bp.route('/topics/<int:topic_id>/replies')
+@login_required
+def topic_replies(topic_id):
+    """next page of a topic's replies for "load more", as JSON"""
+    if not db.session.query(ForumTopic.query.filter_by(id=topic_id).exists()).scalar():
+        return jsonify({'error': 'Topic not found'}), 404
+
+    limit = min(max(request.args.get('limit', REPLIES_PER_PAGE, type=int), 1), 100)
+    replies, has_more = reply_page(topic_id, request.args.get('after', type=int), limit)
+    return jsonify({
+        'replies': [{
+            'id': reply.id,
+            'author_id': reply.author_id,
+            'created_at': reply.created_at.isoformat() if reply.created_at else None,
+            # rendered with the same partial as the page so both look identical
+            'html': render_template('partials/forum_reply.html', reply=reply)
+        } for reply in replies],
+        'has_more': has_more,
+        'next_after': replies[-1].id if replies else None
+    })
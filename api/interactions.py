@@ -1,6 +1,9 @@
 from flask import Blueprint, jsonify, request, current_app
 from flask_login import current_user, login_required
 from models import db, LogEntry, EntryReaction, Comment, ReactionType
+from .reaction_buffer import reaction_buffer
+from .event_hub import event_hub, entry_topic, inbox_topic
+from .conditional import comments_version, not_modified, with_validators
 
 interactions_bp = Blueprint('interactions', __name__)
 
@@ -13,15 +16,18 @@ def toggle_reaction(entry_id):
         if reaction_type not in ['like', 'dislike']:
             return jsonify({'error': 'Invalid reaction type'}), 400
             
-        entry = LogEntry.query.get_or_404(entry_id)
-        entry.toggle_reaction(current_user.developer_tag, reaction_type)
-        db.session.commit()
+        # upsert + recount (or buffered until the next flush in write-behind mode)
+        result = reaction_buffer.toggle(entry_id, current_user.developer_tag, reaction_type)
+        if result is None:
+            db.session.rollback()
+            return jsonify({'error': 'Entry not found'}), 404
         
-        return jsonify({
-            'likes_count': entry.reactions.filter_by(reaction_type=ReactionType.LIKE).count(),
-            'dislikes_count': entry.reactions.filter_by(reaction_type=ReactionType.DISLIKE).count(),
-            'user_reaction': entry.get_user_reaction(current_user.developer_tag)
+        event_hub.publish(entry_topic(entry_id), 'reactions', {
+            'entry_id': entry_id,
+            'likes_count': result['likes_count'],
+            'dislikes_count': result['dislikes_count']
         })
+        return jsonify(result)
         
     except Exception as e:
         current_app.logger.error(f"Error toggling reaction: {str(e)}")
@@ -33,9 +39,15 @@ def toggle_reaction(entry_id):
 def get_comments(entry_id):
     try:
         entry = LogEntry.query.get_or_404(entry_id)
+
+        version = comments_version(entry_id)
+        cached = not_modified(*version)
+        if cached:
+            return cached
+
         # Get only top-level comments (no parent_id)
         comments = Comment.query.filter_by(entry_id=entry_id, parent_id=None).all()
-        return jsonify([comment.to_dict() for comment in comments])
+        return with_validators(jsonify([comment.to_dict() for comment in comments]), *version)
         
     except Exception as e:
         current_app.logger.error(f"Error fetching comments: {str(e)}")
@@ -71,9 +83,22 @@ def add_comment(entry_id):
         )
         
         db.session.add(new_comment)
+        db.session.flush()
+        LogEntry.refresh_counts(entry_id)
+
+        comment_data = new_comment.to_dict()
+        event_hub.publish_on_commit(entry_topic(entry_id), 'comment', comment_data)
+        if entry.developer_tag != current_user.developer_tag:
+            event_hub.publish_on_commit(inbox_topic(entry.developer_tag), 'inbox', {
+                'kind': 'comment',
+                'entry_id': entry_id,
+                'entry_title': entry.title,
+                'comment_id': new_comment.id,
+                'user_id': current_user.developer_tag
+            })
         db.session.commit()
         
-        return jsonify(new_comment.to_dict()), 201
+        return jsonify(comment_data), 201
         
     except Exception as e:
         current_app.logger.error(f"Error adding comment: {str(e)}")
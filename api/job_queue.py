@@ -0,0 +1,271 @@
+from flask import jsonify, url_for
+from datetime import datetime, timedelta
+from models import db, Job
+from sqlalchemy import select, update, or_, and_
+import click
+import json
+import logging
+import threading
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class PermanentJobError(Exception):
+    """raised by a task when retrying can't help (e.g. the project is gone)"""
+
+
+def accepted(job):
+    """202 response for a handler that queued a job instead of doing the work"""
+    status_url = url_for('api.get_job', job_id=job.id)
+    response = jsonify(dict(job_queue.status(job), status_url=status_url))
+    response.status_code = 202
+    response.headers['Location'] = status_url
+    return response
+
+
+class JobQueue:
+    """
+    Durable background jobs in the database, no broker needed.
+
+    Tasks register with @job_queue.task(kind) and take the Job row; whatever
+    they return is stored as JSON in job.result. enqueue() only inserts a
+    row, so a request can hand slow work (GitHub, exports, bulk deletes) off
+    and answer straight away. Workers claim one due job at a time with a
+    single UPDATE, like the mail outbox, so worker threads in the web
+    process and `flask run-jobs` processes can all share the table. A failed
+    job is retried with exponential backoff until its max_attempts; a
+    worker that dies mid-job loses its claim after JOBS_CLAIM_TIMEOUT and
+    the job runs again.
+
+    Each worker thread has its own app context and therefore its own
+    database session.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.tasks = {}
+        self._threads = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.workers = app.config.get('JOBS_WORKERS', 2)
+        self.interval = app.config.get('JOBS_INTERVAL', 2)
+        self.max_attempts = app.config.get('JOBS_MAX_ATTEMPTS', 5)
+        self.backoff_base = app.config.get('JOBS_BACKOFF_BASE', 10)
+        self.backoff_max = app.config.get('JOBS_BACKOFF_MAX', 3600)
+        self.claim_timeout = timedelta(seconds=app.config.get('JOBS_CLAIM_TIMEOUT', 600))
+        app.extensions['job_queue'] = self
+
+        @app.cli.command('run-jobs')
+        @click.option('--workers', type=int, default=None, help='worker threads (default JOBS_WORKERS)')
+        @click.option('--once', is_flag=True, help='run every job that is due and exit')
+        def run_jobs_command(workers, once):
+            """Run background jobs (until interrupted unless --once)"""
+            if once:
+                with app.app_context():
+                    click.echo(f"Ran {self.drain()} job(s)")
+                return
+            # threads already started by init_app get replaced by the requested number
+            self.stop()
+            self.start(workers)
+            try:
+                while any(thread.is_alive() for thread in self._threads):
+                    self._stop.wait(1)
+            except KeyboardInterrupt:
+                self.stop()
+
+        if app.config.get('JOBS_WORKER', True):
+            self.start()
+
+    # tasks
+
+    def task(self, kind, max_attempts=None, describe=None):
+        """
+        register the function that runs jobs of this kind; describe(job, data)
+        may add fields to its status response, e.g. links that have to be
+        made in a request
+        """
+        def decorator(func):
+            self.tasks[kind] = (func, max_attempts, describe)
+            return func
+        return decorator
+
+    def status(self, job):
+        """job.to_dict() plus whatever the task's describe hook adds"""
+        data = job.to_dict()
+        task = self.tasks.get(job.kind)
+        if task is not None and task[2] is not None:
+            task[2](job, data)
+        return data
+
+    def enqueue(self, kind, params=None, key=None, created_by=None, delay=0, unique=False):
+        """
+        queue a job and commit; with unique, an unfinished job of the same kind
+        and key is returned instead of adding another
+        """
+        if kind not in self.tasks:
+            raise ValueError(f"No task registered for job kind {kind!r}")
+        if unique:
+            existing = Job.query.filter(Job.kind == kind, Job.key == key,
+                                        Job.status.in_(('queued', 'running'))).first()
+            if existing is not None:
+                return existing
+
+        _, max_attempts, _ = self.tasks[kind]
+        job = Job(
+            kind=kind,
+            key=key,
+            payload=json.dumps(params or {}),
+            created_by=created_by,
+            max_attempts=max_attempts or self.max_attempts,
+            run_at=datetime.utcnow() + timedelta(seconds=delay)
+        )
+        db.session.add(job)
+        db.session.commit()
+        self.wake()
+        return job
+
+    def latest(self, kind, key):
+        """the most recent successful job of this kind and key, or None"""
+        return Job.query.filter_by(kind=kind, key=key, status='succeeded')\
+                        .order_by(Job.finished_at.desc()).first()
+
+    def progress(self, job, done, total=None):
+        """record how far a running job is (percent, or done out of total); commits"""
+        job.progress = min(100, int(done * 100 / total)) if total else int(done)
+        # still working, keep the claim
+        job.locked_until = datetime.utcnow() + self.claim_timeout
+        db.session.commit()
+
+    # workers
+
+    def start(self, workers=None):
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        if self._threads:
+            return
+        self._stop.clear()
+        for number in range(workers or self.workers):
+            thread = threading.Thread(target=self._run, name=f'job-worker-{number}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        logger.info(f"{threading.current_thread().name} started")
+        while not self._stop.is_set():
+            # sleep until enqueue() wakes us or the poll interval passes
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    self.drain()
+            except Exception as e:
+                logger.error(f"Job worker error: {str(e)}", exc_info=True)
+
+    def drain(self):
+        """run jobs until none are due; returns the number run"""
+        self._fail_abandoned()
+        count = 0
+        while not self._stop.is_set() and self.run_one():
+            count += 1
+        return count
+
+    def _claim(self):
+        """atomically mark the next due job as ours"""
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        due = or_(
+            and_(Job.status == 'queued', Job.run_at <= now),
+            # a worker died holding it
+            and_(Job.status == 'running', Job.locked_until < now, Job.attempts < Job.max_attempts)
+        )
+        next_job = select(Job.id).where(due).order_by(Job.run_at, Job.id).limit(1)
+        db.session.execute(
+            update(Job)
+            # due is checked again in case another worker got there first
+            .where(Job.id.in_(next_job), due)
+            .values(status='running', claim_token=token, attempts=Job.attempts + 1,
+                    started_at=now, locked_until=now + self.claim_timeout)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return Job.query.filter_by(claim_token=token, status='running').first()
+
+    def _fail_abandoned(self):
+        """jobs whose worker died on their last attempt"""
+        now = datetime.utcnow()
+        db.session.execute(
+            update(Job)
+            .where(Job.status == 'running', Job.locked_until < now, Job.attempts >= Job.max_attempts)
+            .values(status='failed', claim_token=None, finished_at=now,
+                    last_error='Worker stopped before the job finished')
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+    def run_one(self):
+        """claim and run one job; False when nothing is due"""
+        job = self._claim()
+        if job is None:
+            return False
+
+        task = self.tasks.get(job.kind)
+        try:
+            if task is None:
+                raise PermanentJobError(f"No task registered for job kind {job.kind!r}")
+            result = task[0](job)
+        except Exception as e:
+            # whatever the task wrote goes, the job row is reloaded
+            db.session.rollback()
+            self._failed(job, e)
+            db.session.commit()
+            return True
+
+        job.status = 'succeeded'
+        job.result = json.dumps(result) if result is not None else None
+        job.progress = 100
+        job.claim_token = None
+        job.locked_until = None
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        logger.info(f"Job {job.id} ({job.kind}) succeeded")
+        return True
+
+    def _failed(self, job, error):
+        job.last_error = str(error)[:1000]
+        job.claim_token = None
+        job.locked_until = None
+        if isinstance(error, PermanentJobError) or job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+            logger.error(f"Job {job.id} ({job.kind}) failed after {job.attempts} attempt(s): {error}")
+        else:
+            delay = min(self.backoff_base * 2 ** (job.attempts - 1), self.backoff_max)
+            job.status = 'queued'
+            job.run_at = datetime.utcnow() + timedelta(seconds=delay)
+            logger.warning(f"Job {job.id} ({job.kind}) failed, retrying in {delay}s: {error}")
+
+    def stats(self):
+        counts = dict(db.session.query(Job.status, db.func.count(Job.id)).group_by(Job.status).all())
+        return {
+            'workers': sum(1 for thread in self._threads if thread.is_alive()),
+            'tasks': sorted(self.tasks),
+            'jobs': counts
+        }
+
+
+job_queue = JobQueue()
@@ -0,0 +1,36 @@
+from flask import jsonify, session
+from flask_login import login_required, current_user
+from models import db, Job
+from . import api
+from .job_queue import job_queue
+
+RECENT_JOBS = 20
+
+
+@api.route('/jobs', methods=['GET'])
+@login_required
+def list_jobs():
+    """the current user's most recent background jobs"""
+    jobs = Job.query.filter_by(created_by=current_user.developer_tag)\
+                    .order_by(Job.id.desc())\
+                    .limit(RECENT_JOBS).all()
+    return jsonify([job_queue.status(job) for job in jobs])
+
+
+def _visible(job):
+    if current_user.is_authenticated and job.created_by == current_user.developer_tag:
+        return True
+    # the account is gone (or going), the signed-out session remembers its deletion job
+    return session.get('deletion_job') == job.id
+
+
+@api.route('/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    """status of a job the current user started; poll until finished"""
+    job = db.session.get(Job, job_id)
+    if job is None or not _visible(job):
+        return jsonify({'error': 'Job not found'}), 404
+    response = jsonify(job_queue.status(job))
+    if not job.finished:
+        response.headers['Retry-After'] = '2'
+    return response
@@ -0,0 +1,167 @@
+from flask_mail import Message
+from datetime import datetime, timedelta
+from models import db, EmailOutbox
+from sqlalchemy import select, update, or_, and_
+import click
+import logging
+import smtplib
+import threading
+import uuid
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SENDER = 'noreply@devlog.com'
+
+
+def queue_email(recipient, subject, body, sender=DEFAULT_SENDER):
+    """store an email in the outbox and wake the sender - never touches SMTP"""
+    email = EmailOutbox(recipient=recipient, sender=sender, subject=subject, body=body)
+    db.session.add(email)
+    db.session.commit()
+    outbox_sender.wake()
+    return email
+
+
+class OutboxSender:
+    """
+    Background thread that drains the email outbox.
+
+    Rows are claimed with a single UPDATE (so several processes can run a
+    sender safely), sent in batches over one SMTP connection, and failures
+    are retried with exponential backoff until MAIL_OUTBOX_MAX_ATTEMPTS.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._thread = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.batch_size = app.config.get('MAIL_OUTBOX_BATCH_SIZE', 20)
+        self.interval = app.config.get('MAIL_OUTBOX_INTERVAL', 5)
+        self.max_attempts = app.config.get('MAIL_OUTBOX_MAX_ATTEMPTS', 5)
+        self.backoff_base = app.config.get('MAIL_OUTBOX_BACKOFF_BASE', 10)
+        self.backoff_max = app.config.get('MAIL_OUTBOX_BACKOFF_MAX', 3600)
+        self.claim_timeout = timedelta(seconds=app.config.get('MAIL_OUTBOX_CLAIM_TIMEOUT', 300))
+        app.extensions['mail_outbox'] = self
+
+        @app.cli.command('send-outbox')
+        @click.option('--once', is_flag=True, help='send what is due and exit')
+        def send_outbox_command(once):
+            """Send queued emails (runs until interrupted unless --once)"""
+            if once:
+                with app.app_context():
+                    click.echo(f"Sent {self.drain()} email(s)")
+            else:
+                self._run()
+
+        if app.config.get('MAIL_OUTBOX_WORKER', True):
+            self.start()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='mail-outbox', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        logger.info("Mail outbox sender started")
+        while not self._stop.is_set():
+            # sleep until queue_email() wakes us or the poll interval passes
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    self.drain()
+            except Exception as e:
+                logger.error(f"Mail outbox sender error: {str(e)}", exc_info=True)
+
+    def drain(self):
+        """send batches until nothing is due; returns the number handled"""
+        total = 0
+        while True:
+            handled = self.process_batch()
+            total += handled
+            if handled < self.batch_size:
+                return total
+
+    def _claim(self):
+        """atomically mark a batch of due rows as ours"""
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        due = select(EmailOutbox.id).where(or_(
+            and_(EmailOutbox.status == 'pending', EmailOutbox.next_attempt_at <= now),
+            and_(EmailOutbox.status == 'sending', EmailOutbox.locked_until < now)
+        )).order_by(EmailOutbox.id).limit(self.batch_size)
+        db.session.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(due))
+            .values(status='sending', claim_token=token, locked_until=now + self.claim_timeout)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return EmailOutbox.query.filter_by(claim_token=token, status='sending')\
+                                .order_by(EmailOutbox.id).all()
+
+    def _failed(self, email, error):
+        email.attempts += 1
+        email.last_error = str(error)[:1000]
+        email.claim_token = None
+        if email.attempts >= self.max_attempts:
+            email.status = 'failed'
+            logger.error(f"Giving up on email {email.id} after {email.attempts} attempts: {error}")
+        else:
+            delay = min(self.backoff_base * 2 ** (email.attempts - 1), self.backoff_max)
+            email.status = 'pending'
+            email.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+            logger.warning(f"Email {email.id} failed, retrying in {delay}s: {error}")
+
+    def process_batch(self):
+        """send one claimed batch over a single SMTP connection"""
+        emails = self._claim()
+        if not emails:
+            return 0
+
+        mail = self.app.extensions['mail']
+        try:
+            with mail.connect() as connection:
+                for email in emails:
+                    try:
+                        msg = Message(email.subject, sender=email.sender, recipients=[email.recipient])
+                        msg.body = email.body
+                        connection.send(msg)
+                        email.status = 'sent'
+                        email.sent_at = datetime.utcnow()
+                        email.body = ''
+                        email.claim_token = None
+                    except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused,
+                            smtplib.SMTPDataError) as e:
+                        # this message was rejected, the connection is still fine
+                        self._failed(email, e)
+        except Exception as e:
+            # couldn't connect (or lost the connection) - retry everything not sent
+            for email in emails:
+                if email.status == 'sending':
+                    self._failed(email, e)
+
+        db.session.commit()
+        sent = sum(1 for email in emails if email.status == 'sent')
+        logger.info(f"Mail outbox batch: {sent}/{len(emails)} sent")
+        return len(emails)
+
+
+outbox_sender = OutboxSender()
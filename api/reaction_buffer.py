@@ -0,0 +1,274 @@
+from datetime import datetime
+from functools import wraps
+from models import db, _upsert, LogEntry, EntryReaction, ReactionType
+import atexit
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+WRITE_MODES = ('sync', 'buffered')
+
+
+def _contribution(kind):
+    """(likes, dislikes) a reaction adds to an entry's counters"""
+    return (kind == ReactionType.LIKE, kind == ReactionType.DISLIKE)
+
+
+class _Pending:
+    __slots__ = ('base', 'current', 'project_name')
+
+    def __init__(self, base, project_name):
+        self.base = base
+        self.current = base
+        self.project_name = project_name
+
+
+class ReactionBuffer:
+    """
+    Optional write-behind buffer for reaction toggles (REACTION_WRITE_MODE).
+
+    In 'sync' mode (the default) every toggle is its own upsert + commit via
+    LogEntry.react(), so an acknowledged click is on disk. In 'buffered'
+    mode a toggle only reads the current row, updates an in-memory per
+    (entry, user) state and returns; a background thread writes all pending
+    toggles in one transaction every REACTION_FLUSH_INTERVAL_MS or as soon as
+    REACTION_FLUSH_MAX_OPS have piled up. Clicks that cancel out before a
+    flush never reach the database.
+
+    Reads that go through overlay() see pending toggles immediately; views
+    that count, sort or filter on reactions in SQL are wrapped in settled(),
+    which writes pending toggles before they run. Pending
+    toggles are flushed on shutdown; a crash loses at most one interval of
+    reactions, which is the durability traded for throughput. Each process
+    buffers on its own, the last flush wins for the same user and entry.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.mode = 'sync'
+        self.interval = 0.2
+        self.max_ops = 500
+        self._pending = {}
+        self._deltas = {}
+        self._ops = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.flushes = self.flushed_rows = self.toggles = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.mode = app.config.get('REACTION_WRITE_MODE', 'sync')
+        if self.mode not in WRITE_MODES:
+            raise ValueError(f"REACTION_WRITE_MODE must be one of {', '.join(WRITE_MODES)}, not {self.mode!r}")
+        self.interval = app.config.get('REACTION_FLUSH_INTERVAL_MS', 200) / 1000
+        self.max_ops = app.config.get('REACTION_FLUSH_MAX_OPS', 500)
+        app.extensions['reaction_buffer'] = self
+
+        if self.buffered:
+            self.start()
+            # interpreter exit (ctrl-c on the dev server, gunicorn worker shutdown)
+            atexit.register(self.stop)
+
+    @property
+    def buffered(self):
+        return self.mode == 'buffered'
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='reaction-buffer', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        """stop the flusher and write whatever is still pending"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._pending and self.app is not None:
+            with self.app.app_context():
+                self.flush()
+
+    def _run(self):
+        logger.info("Reaction write-behind buffer started")
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception as e:
+                logger.error(f"Reaction buffer flush error: {str(e)}", exc_info=True)
+
+    # toggles
+
+    def toggle(self, entry_id, user_id, reaction_type):
+        """
+        buffered equivalent of LogEntry.react(): same return value, but the
+        write happens on the next flush
+        """
+        if not self.buffered:
+            result = LogEntry.react(entry_id, user_id, reaction_type)
+            if result is not None:
+                db.session.commit()
+            return result
+
+        requested = ReactionType.from_string(reaction_type)
+        while True:
+            generation = self._generation
+            row = db.session.execute(db.select(
+                LogEntry.likes_count, LogEntry.dislikes_count, LogEntry.project_name,
+                db.select(EntryReaction.reaction_type).where(
+                    EntryReaction.entry_id == entry_id, EntryReaction.user_id == user_id
+                ).scalar_subquery().label('mine')
+            ).where(LogEntry.id == entry_id)).first()
+            if row is None:
+                return None
+
+            with self._lock:
+                # a flush landed between the read and the lock, the row is already old
+                if generation != self._generation:
+                    continue
+                key = (entry_id, user_id)
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = _Pending(row.mine or ReactionType.NONE, row.project_name)
+                new = ReactionType.NONE if pending.current == requested else requested
+                self._move(entry_id, pending.current, new)
+                pending.current = new
+                self._ops += 1
+                self.toggles += 1
+                likes, dislikes = self._deltas.get(entry_id, (0, 0))
+                if self._ops >= self.max_ops:
+                    self._wake.set()
+
+            return {
+                'likes_count': row.likes_count + likes,
+                'dislikes_count': row.dislikes_count + dislikes,
+                'user_reaction': ReactionType.to_string(new)
+            }
+
+    def _move(self, entry_id, old, new):
+        old_likes, old_dislikes = _contribution(old)
+        new_likes, new_dislikes = _contribution(new)
+        likes, dislikes = self._deltas.get(entry_id, (0, 0))
+        self._deltas[entry_id] = (likes + new_likes - old_likes, dislikes + new_dislikes - old_dislikes)
+
+    # reads
+
+    def pending_state(self, entry_id, user_id):
+        """(likes delta, dislikes delta, user's pending reaction or None) for etags"""
+        if not self._pending:
+            return None
+        with self._lock:
+            pending = self._pending.get((entry_id, user_id))
+            return self._deltas.get(entry_id, (0, 0)) + (pending.current if pending else None,)
+
+    def settle(self):
+        """write pending toggles now, for a read that needs them in the database"""
+        if not self._pending:
+            return
+        try:
+            self.flush()
+        except Exception as e:
+            # the read still works, from what's on disk
+            logger.error(f"Reaction buffer flush before read failed: {str(e)}", exc_info=True)
+
+    def settled(self, view):
+        """view decorator: settle() before the view reads reaction counts or rows"""
+        @wraps(view)
+        def decorated(*args, **kwargs):
+            self.settle()
+            return view(*args, **kwargs)
+        return decorated
+
+    def overlay(self, entry_data, entry_id, user_id):
+        """apply pending toggles to a dict with likes_count/dislikes_count/user_reaction"""
+        state = self.pending_state(entry_id, user_id)
+        if state is None:
+            return entry_data
+        likes, dislikes, mine = state
+        entry_data['likes_count'] = entry_data.get('likes_count', 0) + likes
+        entry_data['dislikes_count'] = entry_data.get('dislikes_count', 0) + dislikes
+        if mine is not None:
+            entry_data['user_reaction'] = ReactionType.to_string(mine)
+        return entry_data
+
+    def discard_user(self, user_id):
+        """drop a user's pending toggles, e.g. before deleting their account"""
+        with self._lock:
+            for key in [key for key in self._pending if key[1] == user_id]:
+                pending = self._pending.pop(key)
+                self._move(key[0], pending.current, pending.base)
+
+    # flushing
+
+    def flush(self):
+        """write every pending toggle in one transaction; returns the rows written"""
+        if not self._pending:
+            return 0
+        # check out a connection before taking the lock: request threads wait on
+        # the lock while holding theirs, so waiting on the pool under it can deadlock
+        db.session.connection()
+        with self._lock:
+            if not self._pending:
+                return 0
+            changed = {key: pending for key, pending in self._pending.items() if pending.current != pending.base}
+            entry_ids = {entry_id for entry_id, _ in changed}
+            try:
+                if changed:
+                    # entries deleted since the click would fail the foreign key
+                    existing = set(db.session.scalars(
+                        db.select(LogEntry.id).where(LogEntry.id.in_(entry_ids))
+                    ))
+                    now = datetime.utcnow()
+                    rows = [{
+                        'user_id': user_id,
+                        'entry_id': entry_id,
+                        'reaction_type': pending.current,
+                        'project_name': pending.project_name,
+                        'timestamp': now
+                    } for (entry_id, user_id), pending in changed.items() if entry_id in existing]
+                    if rows:
+                        statement = _upsert(EntryReaction.__table__)
+                        statement = statement.on_conflict_do_update(
+                            index_elements=['user_id', 'entry_id'],
+                            set_={'reaction_type': statement.excluded.reaction_type,
+                                  'timestamp': statement.excluded.timestamp}
+                        )
+                        db.session.execute(statement, rows)
+                        LogEntry.refresh_counts(*{row['entry_id'] for row in rows})
+                    db.session.commit()
+                    self.flushed_rows += len(rows)
+            except Exception:
+                # keep everything pending and try again next interval
+                db.session.rollback()
+                raise
+
+            self._pending.clear()
+            self._deltas.clear()
+            self._ops = 0
+            self._generation += 1
+            self.flushes += 1
+            return len(changed)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'mode': self.mode,
+                'pending': len(self._pending),
+                'toggles': self.toggles,
+                'flushes': self.flushes,
+                'flushed_rows': self.flushed_rows
+            }
+
+
+reaction_buffer = ReactionBuffer()
@@ -1,15 +1,26 @@
 from flask import jsonify, request
 from datetime import datetime
-from models import LogEntry, db, Project, User, LanguageTag, ForumTopic, ForumReply, ForumCategory, project_tags
+from models import LogEntry, db, Project, User, LanguageTag, ForumTopic, ForumReply, ForumCategory, project_tags, project_members
 from . import api
 from .data_manager import DataManager
 from .user_manager import UserManager
+from .conditional import search_metadata_version, not_modified, with_validators
+from .search_cache import search_cache, normalize_params
+from .suggest_index import suggest_index, KINDS as SUGGEST_KINDS
+from .reaction_buffer import reaction_buffer
+import base64
+import json
 import logging
-from sqlalchemy import or_, and_, func
+from sqlalchemy import or_, and_, func, select, literal, tuple_, union_all
+from sqlalchemy.orm import selectinload
 
 logger = logging.getLogger(__name__)
 
 @api.route('/entries/search', methods=['GET'])
+@reaction_buffer.settled
+@search_cache.cached('entries', defaults={'project': '', 'developer_tag': '', 'date': '',
+                                         'sort_field': 'date', 'sort_order': 'desc'},
+                     folded=('project', 'developer_tag'))
 def search_entries():
     logger.info("Search request received")
     
@@ -85,6 +96,11 @@ def get_search_metadata():
         return jsonify({'error': 'Authentication required'}), 401
     
     try:
+        version = search_metadata_version()
+        cached = not_modified(*version)
+        if cached:
+            return cached
+
         # get all projects with entry counts
         projects = db.session.query(
             Project.name,
@@ -112,17 +128,46 @@ def get_search_metadata():
         
         logger.info(f"Found {len(projects)} projects, {len(languages)} languages, {len(users)} users")
         
-        return jsonify({
+        return with_validators(jsonify({
             'projects': [{'name': p.name, 'description': p.description, 'entry_count': p.entry_count} for p in projects],
             'languages': [{'name': l.name, 'project_count': l.project_count} for l in languages],
             'users': [{'developer_tag': u.developer_tag, 'entry_count': u.entry_count} for u in users]
-        })
+        }), *version)
         
     except Exception as e:
         logger.error(f"Search metadata error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+# filters of advanced entry search, shared by the response cache and the count cache
+ENTRY_FILTER_LISTS = ('projects', 'users', 'languages')
+ENTRY_FILTER_DEFAULTS = {'text': '', 'date_from': '', 'date_to': ''}
+ENTRY_COUNT_STRATEGIES = ('exact', 'cached', 'has_more')
+
+@api.route('/search/suggest', methods=['GET'])
+def search_suggest():
+    """autocomplete projects, developers and languages from the in-memory prefix index"""
+    if not UserManager.check_session():
+        return jsonify({'error': 'Authentication required'}), 401
+
+    prefix = request.args.get('q', '').strip()
+    limit = min(max(request.args.get('limit', 8, type=int), 1), 50)
+    kinds = [k.strip() for k in request.args.get('kinds', ','.join(SUGGEST_KINDS)).split(',') if k.strip()]
+    unknown = set(kinds) - set(SUGGEST_KINDS)
+    if unknown:
+        return jsonify({'error': f"Unknown kinds: {', '.join(sorted(unknown))}"}), 400
+
+    try:
+        return jsonify({'query': prefix, **suggest_index.suggest(prefix, kinds, limit)})
+    except Exception as e:
+        logger.error(f"Suggest error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @api.route('/search/entries/advanced', methods=['GET'])
+@reaction_buffer.settled
+@search_cache.cached('entries_advanced', lists=ENTRY_FILTER_LISTS,
+                     defaults={**ENTRY_FILTER_DEFAULTS, 'sort_field': 'timestamp', 'sort_order': 'desc',
+                               'page': 1, 'per_page': 20, 'count': 'cached'},
+                     folded=('text',))
 def advanced_entry_search():
     """advanced search for entries with multiple filters"""
     logger.info("Advanced entry search request received")
@@ -175,32 +220,25 @@ def advanced_entry_search():
         # language filter (through project tags)
         languages = request.args.getlist('languages[]') or request.args.getlist('languages')
         if languages:
-            # join with projects that have these language tags
-            query = query.join(Project, LogEntry.project_name == Project.name)\
-                        .join(Project.tags)\
-                        .filter(LanguageTag.name.in_(languages))
+            # EXISTS rather than a join so an entry whose project has several of
+            # the languages still appears (and counts) once
+            query = query.filter(LogEntry.project.has(Project.tags.any(LanguageTag.name.in_(languages))))
             search_params.append(f"languages: {', '.join(languages)}")
 
+        # total rows for these filters; sort and page don't change it
+        filtered = query
+
         # sort options
         sort_field = request.args.get('sort_field', 'timestamp')
         sort_order = request.args.get('sort_order', 'desc')
         
-        if sort_field == 'likes':
-            # sort by like count
-            query = query.outerjoin(LogEntry.reactions)\
-                        .group_by(LogEntry.id)\
-                        .order_by(
-                            func.count(LogEntry.reactions).desc() if sort_order == 'desc'
-                            else func.count(LogEntry.reactions).asc()
-                        )
-        elif sort_field == 'comments':
-            # sort by comment count
-            query = query.outerjoin(LogEntry.comments)\
-                        .group_by(LogEntry.id)\
-                        .order_by(
-                            func.count(LogEntry.comments).desc() if sort_order == 'desc'
-                            else func.count(LogEntry.comments).asc()
-                        )
+        if sort_field in ('likes', 'comments'):
+            # maintained counters on log_entry, no join/group over every reaction or comment
+            column = LogEntry.likes_count if sort_field == 'likes' else LogEntry.comments_count
+            query = query.order_by(
+                column.desc() if sort_order == 'desc' else column.asc(),
+                LogEntry.id.desc() if sort_order == 'desc' else LogEntry.id.asc()
+            )
         elif sort_field == 'project':
             query = query.order_by(
                 LogEntry.project_name.desc() if sort_order == 'desc' 
@@ -213,27 +251,40 @@ def advanced_entry_search():
             )
 
         # pagination
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 20))
-        
-        entries = query.paginate(
-            page=page, 
-            per_page=per_page,
-            error_out=False
-        )
+        page = max(int(request.args.get('page', 1)), 1)
+        per_page = min(max(int(request.args.get('per_page', 20)), 1), 100)
+
+        # exact: COUNT(*) every time; cached: the same count remembered until the
+        # next write; has_more: no count at all, just peek one row past the page
+        count = request.args.get('count', 'cached')
+        if count not in ENTRY_COUNT_STRATEGIES:
+            return jsonify({'error': f"count must be one of: {', '.join(ENTRY_COUNT_STRATEGIES)}"}), 400
+
+        rows = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+        has_next = len(rows) > per_page
+        entries = rows[:per_page]
+
+        total = None
+        if count == 'exact':
+            total = filtered.order_by(None).count()
+        elif count == 'cached':
+            key = ('entries_advanced_count', normalize_params(request.args, ENTRY_FILTER_LISTS,
+                                                              ENTRY_FILTER_DEFAULTS, ('text',)))
+            total = search_cache.memo(key, lambda: filtered.order_by(None).count())
         
         logger.info(f"Advanced search completed with params: {', '.join(search_params) if search_params else 'none'}")
-        logger.info(f"Found {entries.total} matching entries, showing page {page}")
+        logger.info(f"Found {total if total is not None else 'uncounted'} matching entries, showing page {page}")
 
         return jsonify({
-            'entries': [entry.to_dict() for entry in entries.items],
+            'entries': [entry.to_dict() for entry in entries],
             'pagination': {
-                'page': entries.page,
-                'pages': entries.pages,
-                'per_page': entries.per_page,
-                'total': entries.total,
-                'has_next': entries.has_next,
-                'has_prev': entries.has_prev
+                'page': page,
+                'pages': -(-total // per_page) if total is not None else None,
+                'per_page': per_page,
+                'total': total,
+                'count': count,
+                'has_next': has_next,
+                'has_prev': page > 1
             },
             'search_params': search_params
         })
@@ -242,7 +293,15 @@ def advanced_entry_search():
         logger.error(f"Advanced search error: {str(e)}")
         return jsonify({'error': str(e)}), 400
 
+# fields a project search result can carry; ?fields= picks a subset
+PROJECT_SEARCH_FIELDS = ('name', 'description', 'repository_url', 'created_at', 'created_by',
+                         'team_members', 'entry_count', 'team_size', 'languages')
+
 @api.route('/search/projects/advanced', methods=['GET'])
+@search_cache.cached('projects_advanced', lists=('users', 'languages'),
+                     defaults={'text': '', 'sort_field': 'created_at', 'sort_order': 'desc',
+                               'page': 1, 'per_page': 20, 'fields': ''},
+                     folded=('text',))
 def advanced_project_search():
     """advanced search for projects"""
     logger.info("Advanced project search request received")
@@ -307,23 +366,69 @@ def advanced_project_search():
                 else Project.created_at.asc()
             )
 
-        # Get all matching projects
-        projects = query.all()
-        
-        # Add entry counts and other stats
+        # only do the work for fields the caller renders (default: everything)
+        fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()]
+        unknown = set(fields) - set(PROJECT_SEARCH_FIELDS)
+        if unknown:
+            return jsonify({'error': f"Unknown fields: {', '.join(sorted(unknown))}"}), 400
+        fields = fields or list(PROJECT_SEARCH_FIELDS)
+
+        # collections come in with one selectin query each instead of per project
+        if 'team_members' in fields:
+            query = query.options(selectinload(Project.team_members))
+        if 'languages' in fields:
+            query = query.options(selectinload(Project.tags))
+
+        # pagination
+        page = int(request.args.get('page', 1))
+        per_page = min(int(request.args.get('per_page', 20)), 100)
+        projects = query.paginate(page=page, per_page=per_page, error_out=False)
+        names = [project.name for project in projects.items]
+
+        # per-page counts as single grouped queries
+        entry_counts, team_sizes = {}, {}
+        if names and 'entry_count' in fields:
+            entry_counts = dict(db.session.query(LogEntry.project_name, func.count(LogEntry.id))
+                                  .filter(LogEntry.project_name.in_(names))
+                                  .group_by(LogEntry.project_name).all())
+        if names and 'team_size' in fields and 'team_members' not in fields:
+            team_sizes = dict(db.session.query(project_members.c.project_name, func.count())
+                                .filter(project_members.c.project_name.in_(names))
+                                .group_by(project_members.c.project_name).all())
+
         project_results = []
-        for project in projects:
-            project_dict = project.to_dict()
-            project_dict['entry_count'] = project.entries.count()
-            project_dict['team_size'] = len(project.team_members)
-            project_dict['languages'] = [tag.name for tag in project.tags]
-            project_results.append(project_dict)
+        for project in projects.items:
+            row = {
+                'name': project.name,
+                'description': project.description,
+                'repository_url': project.repository_url,
+                'created_at': project.created_at,
+                'created_by': project.created_by,
+                'entry_count': entry_counts.get(project.name, 0)
+            }
+            # relationship-backed fields only when asked for, so nothing lazy-loads
+            if 'team_members' in fields:
+                row['team_members'] = [member.developer_tag for member in project.team_members]
+            if 'team_size' in fields:
+                row['team_size'] = len(row['team_members']) if 'team_members' in fields \
+                                   else team_sizes.get(project.name, 0)
+            if 'languages' in fields:
+                row['languages'] = [tag.name for tag in project.tags]
+            project_results.append({field: row[field] for field in fields})
         
         logger.info(f"Project search completed with params: {', '.join(search_params) if search_params else 'none'}")
-        logger.info(f"Found {len(project_results)} matching projects")
+        logger.info(f"Found {projects.total} matching projects, showing page {page}")
 
         return jsonify({
             'projects': project_results,
+            'pagination': {
+                'page': projects.page,
+                'pages': projects.pages,
+                'per_page': projects.per_page,
+                'total': projects.total,
+                'has_next': projects.has_next,
+                'has_prev': projects.has_prev
+            },
             'search_params': search_params
         })
 
@@ -331,7 +436,23 @@ def advanced_project_search():
         logger.error(f"Project search error: {str(e)}")
         return jsonify({'error': str(e)}), 400
 
+FORUM_SEARCH_PREVIEW = 300
+
+def _encode_cursor(row):
+    """opaque keyset cursor for the last row of a page"""
+    raw = json.dumps([row.created_at.isoformat(), row.type, row.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor):
+    created_at, kind, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    if kind not in ('topic', 'reply'):
+        raise ValueError('Invalid cursor')
+    return datetime.fromisoformat(created_at), kind, int(item_id)
+
 @api.route('/search/forums/advanced', methods=['GET'])
+@search_cache.cached('forums_advanced', lists=('users', 'languages', 'projects'),
+                     defaults={'text': '', 'limit': 20, 'cursor': ''},
+                     folded=('text',))
 def advanced_forum_search():
     """advanced search for forum topics and replies"""
     logger.info("Advanced forum search request received")
@@ -341,9 +462,42 @@ def advanced_forum_search():
         return jsonify({'error': 'Authentication required'}), 401
     
     try:
-        # Search in both topics and replies
-        topic_query = ForumTopic.query
-        reply_query = ForumReply.query
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+        cursor = request.args.get('cursor')
+        after = _decode_cursor(cursor) if cursor else None
+
+        # topics and replies share one column layout so they can be UNION ALLed;
+        # category and language come from outer joins instead of lazy loads
+        topic_query = select(
+            literal('topic').label('type'),
+            ForumTopic.id.label('id'),
+            ForumTopic.title.label('title'),
+            func.substr(ForumTopic.content, 1, FORUM_SEARCH_PREVIEW).label('content'),
+            ForumTopic.author_id.label('author'),
+            ForumTopic.created_at.label('created_at'),
+            ForumTopic.id.label('topic_id'),
+            ForumCategory.name.label('category'),
+            LanguageTag.name.label('language'),
+            ForumTopic.project_name.label('project')
+        ).select_from(ForumTopic)\
+         .outerjoin(ForumCategory, ForumTopic.category_id == ForumCategory.id)\
+         .outerjoin(LanguageTag, ForumCategory.language_tag_id == LanguageTag.id)
+
+        reply_query = select(
+            literal('reply').label('type'),
+            ForumReply.id.label('id'),
+            ForumTopic.title.label('title'),
+            func.substr(ForumReply.content, 1, FORUM_SEARCH_PREVIEW).label('content'),
+            ForumReply.author_id.label('author'),
+            ForumReply.created_at.label('created_at'),
+            ForumReply.topic_id.label('topic_id'),
+            ForumCategory.name.label('category'),
+            LanguageTag.name.label('language'),
+            ForumReply.project_name.label('project')
+        ).select_from(ForumReply)\
+         .outerjoin(ForumTopic, ForumReply.topic_id == ForumTopic.id)\
+         .outerjoin(ForumCategory, ForumTopic.category_id == ForumCategory.id)\
+         .outerjoin(LanguageTag, ForumCategory.language_tag_id == LanguageTag.id)
         search_params = []
 
         # Text search in title and content
@@ -370,13 +524,8 @@ def advanced_forum_search():
         # Language filter
         languages = request.args.getlist('languages[]') or request.args.getlist('languages')
         if languages:
-            topic_query = topic_query.join(ForumCategory)\
-                                   .join(LanguageTag, ForumCategory.language_tag_id == LanguageTag.id)\
-                                   .filter(LanguageTag.name.in_(languages))
-            reply_query = reply_query.join(ForumTopic)\
-                                   .join(ForumCategory)\
-                                   .join(LanguageTag, ForumCategory.language_tag_id == LanguageTag.id)\
-                                   .filter(LanguageTag.name.in_(languages))
+            topic_query = topic_query.filter(LanguageTag.name.in_(languages))
+            reply_query = reply_query.filter(LanguageTag.name.in_(languages))
             search_params.append(f"languages: {', '.join(languages)}")
 
         # Project filter
@@ -386,51 +535,69 @@ def advanced_forum_search():
             reply_query = reply_query.filter(ForumReply.project_name.in_(projects))
             search_params.append(f"projects: {', '.join(projects)}")
 
-        # Execute queries
-        topics = topic_query.order_by(ForumTopic.created_at.desc()).all()
-        replies = reply_query.order_by(ForumReply.created_at.desc()).all()
-        
+        # newest first with (created_at, type, id) as the keyset; each side is cut
+        # to limit + 1 rows before the union so the database never sorts everything
+        def page_of(query, kind, model):
+            if after:
+                query = query.filter(tuple_(model.created_at, literal(kind), model.id) < tuple_(*after))
+            return select(query.order_by(model.created_at.desc(), model.id.desc())
+                               .limit(limit + 1).subquery())
+
+        combined = union_all(page_of(topic_query, 'topic', ForumTopic),
+                             page_of(reply_query, 'reply', ForumReply)).subquery()
+        rows = db.session.execute(
+            select(combined)
+            .order_by(combined.c.created_at.desc(), combined.c.type.desc(), combined.c.id.desc())
+            .limit(limit + 1)
+        ).all()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        # reply counts for the topics on this page in one grouped query
+        topic_ids = [row.id for row in rows if row.type == 'topic']
+        reply_counts = dict(db.session.query(ForumReply.topic_id, func.count(ForumReply.id))
+                              .filter(ForumReply.topic_id.in_(topic_ids))
+                              .group_by(ForumReply.topic_id).all()) if topic_ids else {}
+
         # Format results
         results = []
-        for topic in topics:
-            results.append({
-                'type': 'topic',
-                'id': topic.id,
-                'title': topic.title,
-                'content': topic.content,
-                'author': topic.author_id,
-                'created_at': topic.created_at.isoformat() if topic.created_at else None,
-                'category': topic.category.name if topic.category else None,
-                'language': topic.category.language_tag.name if topic.category and topic.category.language_tag else None,
-                'project': topic.project_name,
-                'reply_count': topic.replies.count()
-            })
-        
-        for reply in replies:
-            results.append({
-                'type': 'reply',
-                'id': reply.id,
-                'content': reply.content,
-                'author': reply.author_id,
-                'created_at': reply.created_at.isoformat() if reply.created_at else None,
-                'topic_title': reply.topic.title if reply.topic else None,
-                'topic_id': reply.topic_id,
-                'category': reply.topic.category.name if reply.topic and reply.topic.category else None,
-                'language': reply.topic.category.language_tag.name if reply.topic and reply.topic.category and reply.topic.category.language_tag else None,
-                'project': reply.project_name
-            })
-        
-        # Sort by created_at
-        results.sort(key=lambda x: x['created_at'] or '', reverse=True)
+        for row in rows:
+            result = {
+                'type': row.type,
+                'id': row.id,
+                'content': row.content,
+                'author': row.author,
+                'created_at': row.created_at.isoformat() if row.created_at else None,
+                'category': row.category,
+                'language': row.language,
+                'project': row.project
+            }
+            if row.type == 'topic':
+                result['title'] = row.title
+                result['reply_count'] = reply_counts.get(row.id, 0)
+            else:
+                result['topic_title'] = row.title
+                result['topic_id'] = row.topic_id
+            results.append(result)
         
         logger.info(f"Forum search completed with params: {', '.join(search_params) if search_params else 'none'}")
-        logger.info(f"Found {len(results)} matching forum items")
+        logger.info(f"Returning {len(results)} forum items (more: {has_more})")
 
         return jsonify({
             'results': results,
+            'has_more': has_more,
+            'next_cursor': _encode_cursor(rows[-1]) if has_more else None,
             'search_params': search_params
         })
 
     except Exception as e:
         logger.error(f"Forum search error: {str(e)}")
-        return jsonify({'error': str(e)}), 400
\ No newline at end of file
+        return jsonify({'error': str(e)}), 400
+
+@api.route('/search/cache/stats', methods=['GET'])
+def search_cache_stats():
+    """hit rate and memory use of the search result cache"""
+    if not UserManager.check_session():
+        return jsonify({'error': 'Authentication required'}), 401
+    return jsonify(search_cache.stats())
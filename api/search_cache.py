@@ -0,0 +1,242 @@
+from flask import request, make_response
+from functools import wraps
+from collections import OrderedDict
+from sqlalchemy import event
+from models import db, LogEntry, EntryReaction, Comment, ForumTopic, ForumReply, Project, LanguageTag, project_members, project_tags
+from .user_manager import UserManager
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# anything that can change a search result; a committed write to one of these
+# bumps the generation and every cached result from before it goes stale
+WATCHED_TABLES = frozenset(model.__tablename__ for model in
+                           (LogEntry, EntryReaction, Comment, ForumTopic, ForumReply, Project, LanguageTag)) \
+                 | {project_members.name, project_tags.name}
+
+# rough per-entry bookkeeping cost on top of the key and body
+ENTRY_OVERHEAD = 200
+
+
+def _int_or_raw(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def normalize_params(args, lists=(), defaults=None, folded=()):
+    """
+    Turn request args into a hashable, canonical key.
+
+    List filters accept both 'name[]' and 'name' like the views do, and are
+    sorted and de-duplicated since they only feed IN (...). Scalars fall back
+    to the view's default so '?page=1' and no page share an entry, and the
+    ones in folded (only used with ilike) are lowercased. Params the view
+    doesn't read (cache busters etc.) are dropped.
+    """
+    defaults = defaults or {}
+    key = []
+    for name in lists:
+        values = args.getlist(f'{name}[]') or args.getlist(name)
+        if values:
+            key.append((name, tuple(sorted(set(values)))))
+    for name, default in sorted(defaults.items()):
+        value = args.get(name, default)
+        # ilike is only case-insensitive for ascii on sqlite
+        if name in folded and value.isascii():
+            value = value.lower()
+        if isinstance(default, int):
+            value = _int_or_raw(value)
+        if value != default:
+            key.append((name, value))
+    return tuple(key)
+
+
+class _Entry:
+    __slots__ = ('generation', 'body', 'status', 'size')
+
+    def __init__(self, generation, body, status, size):
+        self.generation = generation
+        self.body = body
+        self.status = status
+        self.size = size
+
+
+class SearchCache:
+    """
+    In-process LRU of serialized search responses.
+
+    Results are stored against the write generation at the time the query
+    started; committing a change to any watched table bumps the generation,
+    so nothing computed before the write is ever served after it. Memory is
+    capped by response size, least recently used entries go first.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.max_bytes = 32 * 1024 * 1024
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.stale = self.evictions = 0
+        self.max_memos = 1024
+        self._memos = OrderedDict()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('SEARCH_CACHE_ENABLED', True)
+        self.max_bytes = app.config.get('SEARCH_CACHE_MAX_BYTES', 32 * 1024 * 1024)
+        self.max_memos = app.config.get('SEARCH_CACHE_MAX_MEMOS', 1024)
+        app.extensions['search_cache'] = self
+
+        if not event.contains(db.session, 'after_flush', _note_flush):
+            event.listen(db.session, 'after_flush', _note_flush)
+            event.listen(db.session, 'do_orm_execute', _note_bulk_write)
+            event.listen(db.session, 'after_commit', self._after_commit)
+            event.listen(db.session, 'after_rollback', _forget_writes)
+
+    # write generation
+
+    def bump(self):
+        with self._lock:
+            self.generation += 1
+
+    def _after_commit(self, session):
+        if session.info.pop('search_cache_dirty', False):
+            self.bump()
+
+    # storage
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.generation != self.generation:
+                self._remove(key)
+                self.stale += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, generation, body, status):
+        size = len(body) + len(repr(key)) + ENTRY_OVERHEAD
+        # one huge result shouldn't flush everything else
+        if size > self.max_bytes // 4:
+            return
+        with self._lock:
+            # a write landed while we were querying, this result may already be old
+            if generation != self.generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(generation, body, status, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def memo(self, key, compute):
+        """small derived values (e.g. result counts) kept until the next write"""
+        with self._lock:
+            found = self._memos.get(key)
+            if found is not None and found[0] == self.generation:
+                self._memos.move_to_end(key)
+                return found[1]
+            generation = self.generation
+
+        value = compute()
+        with self._lock:
+            if generation == self.generation:
+                self._memos[key] = (generation, value)
+                self._memos.move_to_end(key)
+                while len(self._memos) > self.max_memos:
+                    self._memos.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._memos.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'generation': self.generation,
+                'entries': len(self._entries),
+                'memos': len(self._memos),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    # view decorator
+
+    def cached(self, name, lists=(), defaults=None, folded=()):
+        """cache a search view's 200 responses under its normalized args"""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                # unauthenticated requests go through so the view answers 401
+                if not self.enabled or not UserManager.check_session():
+                    return view(*args, **kwargs)
+
+                key = (name, normalize_params(request.args, lists, defaults, folded))
+                entry = self.get(key)
+                if entry is not None:
+                    response = make_response(entry.body, entry.status)
+                    response.mimetype = 'application/json'
+                    response.headers['X-Search-Cache'] = 'hit'
+                    return response
+
+                generation = self.generation
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200:
+                    self.put(key, generation, response.get_data(), response.status_code)
+                response.headers['X-Search-Cache'] = 'miss'
+                return response
+            return wrapper
+        return decorator
+
+
+def _touches_watched(objects):
+    return any(getattr(obj, '__tablename__', None) in WATCHED_TABLES for obj in objects)
+
+
+def _note_flush(session, flush_context):
+    if _touches_watched(session.new) or _touches_watched(session.dirty) or _touches_watched(session.deleted):
+        session.info['search_cache_dirty'] = True
+
+
+def _note_bulk_write(orm_execute_state):
+    # insert()/update()/delete() statements skip the flush, e.g. bulk entry import
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None and table.name in WATCHED_TABLES:
+            orm_execute_state.session.info['search_cache_dirty'] = True
+
+
+def _forget_writes(session):
+    session.info.pop('search_cache_dirty', None)
+
+
+search_cache = SearchCache()
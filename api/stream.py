@@ -0,0 +1,70 @@
+from flask import Response, request, jsonify
+from flask_login import login_required, current_user
+from . import api
+from .event_hub import event_hub, entry_topic, forum_topic, inbox_topic, RESYNC
+
+# most ids a single stream may follow per kind
+MAX_SUBSCRIPTIONS = 50
+RECONNECT_MS = 5000
+
+
+def _id_list(name):
+    """'entries=1,2' or 'entries[]=1&entries[]=2' as a list of ints"""
+    values = request.args.getlist(f'{name}[]') or request.args.getlist(name)
+    ids = []
+    for value in values:
+        ids.extend(int(part) for part in value.split(',') if part.strip())
+    return ids
+
+
+@api.route('/stream')
+@login_required
+def stream():
+    """Server-Sent Events for the entries/topics a page shows plus the user's inbox"""
+    try:
+        entries = _id_list('entries')
+        topics = _id_list('topics')
+    except ValueError:
+        return jsonify({'error': 'entries and topics must be integer ids'}), 400
+    if len(entries) > MAX_SUBSCRIPTIONS or len(topics) > MAX_SUBSCRIPTIONS:
+        return jsonify({'error': f'At most {MAX_SUBSCRIPTIONS} entries and {MAX_SUBSCRIPTIONS} topics per stream'}), 400
+
+    subscriptions = [entry_topic(entry_id) for entry_id in entries] + \
+                    [forum_topic(topic_id) for topic_id in topics]
+    if request.args.get('inbox', 'false').lower() in ('1', 'true'):
+        subscriptions.append(inbox_topic(current_user.developer_tag))
+    if not subscriptions:
+        return jsonify({'error': 'Nothing to subscribe to'}), 400
+
+    subscriber = event_hub.subscribe(subscriptions)
+    if subscriber is None:
+        response = jsonify({'error': 'Too many live connections, try again later'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+
+    # events published while the client was away are gone, it has to refetch
+    reconnected = 'Last-Event-ID' in request.headers
+
+    def events():
+        try:
+            yield f"retry: {RECONNECT_MS}\n\n"
+            if reconnected:
+                yield f"event: {RESYNC}\ndata: {{}}\n\n"
+            while True:
+                item = subscriber.pop(event_hub.keepalive)
+                if item is None:
+                    # comment line; also how we notice a client that went away
+                    yield ": keepalive\n\n"
+                    continue
+                event_id, kind, payload = item
+                if event_id is not None:
+                    yield f"id: {event_id}\n"
+                yield f"event: {kind}\ndata: {payload}\n\n"
+        finally:
+            event_hub.unsubscribe(subscriber)
+
+    # no stream_with_context: the db session is released when this view returns
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
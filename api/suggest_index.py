@@ -0,0 +1,162 @@
+from bisect import bisect_left, insort
+from sqlalchemy import event, func, inspect
+from models import db, Project, User, LogEntry, LanguageTag, project_tags
+import heapq
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('projects', 'developers', 'languages')
+
+# columns whose change means a name was renamed
+NAME_ATTRS = {Project: ('name',), User: ('developer_tag',), LanguageTag: ('name',)}
+
+
+class PrefixIndex:
+    """
+    Names kept in a sorted array of (lowercased, original) so every prefix is
+    a contiguous slice found with two bisects; counts rank the matches.
+    """
+
+    def __init__(self, counts=None):
+        self.counts = dict(counts or {})
+        self.keys = sorted((name.lower(), name) for name in self.counts)
+
+    def add(self, name, delta=1):
+        if name not in self.counts:
+            self.counts[name] = 0
+            insort(self.keys, (name.lower(), name))
+        self.counts[name] = max(self.counts[name] + delta, 0)
+
+    def search(self, prefix, limit):
+        """the limit most popular names starting with prefix (case-insensitive)"""
+        prefix = prefix.lower()
+        lo = bisect_left(self.keys, (prefix,))
+        hi = bisect_left(self.keys, (prefix + '\uffff',))
+        matches = self.keys[lo:hi]
+        if len(matches) > limit:
+            matches = heapq.nsmallest(limit, matches, key=lambda k: (-self.counts[k[1]], k[0]))
+        else:
+            matches = sorted(matches, key=lambda k: (-self.counts[k[1]], k[0]))
+        return [{'name': name, 'count': self.counts[name]} for _, name in matches]
+
+    def __len__(self):
+        return len(self.counts)
+
+
+class SuggestIndex:
+    """
+    In-process autocomplete over project names, developer tags and language
+    tags, ranked by entry count (projects, developers) or project count
+    (languages).
+
+    rebuild() loads everything with three grouped queries. After that, ORM
+    writes are applied incrementally once their transaction commits; deletes
+    and bulk statements we can't see row by row mark the index stale and the
+    next lookup rebuilds it.
+    """
+
+    def __init__(self, app=None):
+        self.indexes = {kind: PrefixIndex() for kind in KINDS}
+        self.stale = True
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['suggest_index'] = self
+
+        if not event.contains(db.session, 'after_flush', _collect_changes):
+            event.listen(db.session, 'after_flush', _collect_changes)
+            event.listen(db.session, 'do_orm_execute', _note_bulk_write)
+            event.listen(db.session, 'after_commit', self._after_commit)
+            event.listen(db.session, 'after_rollback', _forget_changes)
+
+    def rebuild(self):
+        """reload every name and count from the database"""
+        projects = db.session.query(Project.name, func.count(LogEntry.id))\
+                             .outerjoin(LogEntry, LogEntry.project_name == Project.name)\
+                             .group_by(Project.name).all()
+        developers = db.session.query(User.developer_tag, func.count(LogEntry.id))\
+                               .outerjoin(LogEntry, LogEntry.developer_tag == User.developer_tag)\
+                               .group_by(User.developer_tag).all()
+        languages = db.session.query(LanguageTag.name, func.count(project_tags.c.project_name))\
+                              .outerjoin(project_tags, project_tags.c.tag_id == LanguageTag.id)\
+                              .group_by(LanguageTag.name).all()
+
+        indexes = {
+            'projects': PrefixIndex(dict(projects)),
+            'developers': PrefixIndex(dict(developers)),
+            'languages': PrefixIndex(dict(languages))
+        }
+        with self._lock:
+            self.indexes = indexes
+            self.stale = False
+        logger.info(f"Suggest index built: {', '.join(f'{len(v)} {k}' for k, v in indexes.items())}")
+
+    def suggest(self, prefix, kinds=KINDS, limit=8):
+        if self.stale:
+            self.rebuild()
+        with self._lock:
+            return {kind: self.indexes[kind].search(prefix, limit) for kind in kinds}
+
+    def _after_commit(self, session):
+        changes = session.info.pop('suggest_changes', None)
+        rebuild = session.info.pop('suggest_rebuild', False)
+        if rebuild:
+            self.stale = True
+        if not changes or self.stale:
+            return
+        with self._lock:
+            for kind, name, delta in changes:
+                self.indexes[kind].add(name, delta)
+
+
+def _collect_changes(session, flush_context):
+    changes = session.info.setdefault('suggest_changes', [])
+    for obj in session.new:
+        if isinstance(obj, LogEntry):
+            changes.append(('projects', obj.project_name, 1))
+            changes.append(('developers', obj.developer_tag, 1))
+        elif isinstance(obj, Project):
+            changes.append(('projects', obj.name, 0))
+            changes.extend(('languages', tag.name, 1) for tag in obj.tags)
+        elif isinstance(obj, User):
+            changes.append(('developers', obj.developer_tag, 0))
+        elif isinstance(obj, LanguageTag):
+            changes.append(('languages', obj.name, 0))
+
+    for obj in session.dirty:
+        if isinstance(obj, Project):
+            history = inspect(obj).attrs.tags.history
+            changes.extend(('languages', tag.name, 1) for tag in history.added)
+            changes.extend(('languages', tag.name, -1) for tag in history.deleted)
+        if isinstance(obj, LogEntry):
+            state = inspect(obj).attrs
+            if state.project_name.history.has_changes() or state.developer_tag.history.has_changes():
+                session.info['suggest_rebuild'] = True
+        for attr in NAME_ATTRS.get(type(obj), ()):
+            if inspect(obj).attrs[attr].history.has_changes():
+                session.info['suggest_rebuild'] = True
+
+    # renames and deletes are rare, just reload everything
+    if any(isinstance(obj, (LogEntry, Project, User, LanguageTag)) for obj in session.deleted):
+        session.info['suggest_rebuild'] = True
+
+
+def _note_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None and table.name in (LogEntry.__tablename__, Project.__tablename__,
+                                                User.__tablename__, LanguageTag.__tablename__,
+                                                project_tags.name):
+            orm_execute_state.session.info['suggest_rebuild'] = True
+
+
+def _forget_changes(session):
+    session.info.pop('suggest_changes', None)
+    session.info.pop('suggest_rebuild', None)
+
+
+suggest_index = SuggestIndex()
@@ -0,0 +1,152 @@
+from flask import jsonify, request
+from models import db, ChangeLog, LogEntry, EntryReaction, Comment, ForumTopic, ForumReply, ReactionType
+from . import api
+from .user_manager import UserManager
+from .change_log import change_tracker, DELETE
+from .reaction_buffer import reaction_buffer
+import logging
+
+logger = logging.getLogger(__name__)
+
+SYNC_PAGE_SIZE = 500
+MAX_SYNC_PAGE_SIZE = 2000
+
+# name of each synced table in the response
+SYNC_NAMES = {
+    LogEntry.__tablename__: 'entries',
+    Comment.__tablename__: 'comments',
+    ForumTopic.__tablename__: 'topics',
+    ForumReply.__tablename__: 'replies',
+}
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def _entry_rows(ids, user_id):
+    # same fields as LogEntry.to_dict() plus the caller's reaction, from the counter columns
+    mine = db.aliased(EntryReaction)
+    rows = db.session.query(LogEntry, mine.reaction_type)\
+                     .outerjoin(mine, (mine.entry_id == LogEntry.id) & (mine.user_id == user_id))\
+                     .filter(LogEntry.id.in_(ids))
+    return [{
+        'id': entry.id,
+        'title': entry.title,
+        'content': entry.content,
+        'project_name': entry.project_name,
+        'developer_tag': entry.developer_tag,
+        'timestamp': _isoformat(entry.timestamp),
+        'start_time': _isoformat(entry.start_time),
+        'end_time': _isoformat(entry.end_time),
+        'time_worked': entry.time_worked,
+        'commit_sha': entry.commit_sha,
+        'likes_count': entry.likes_count,
+        'dislikes_count': entry.dislikes_count,
+        'comments_count': entry.comments_count,
+        'user_reaction': ReactionType.to_string(reaction) if reaction else None
+    } for entry, reaction in rows]
+
+
+def _comment_rows(ids, user_id):
+    # flat; clients nest them by parent_id
+    return [{
+        'id': comment.id,
+        'entry_id': comment.entry_id,
+        'user_id': comment.user_id,
+        'content': comment.content,
+        'timestamp': _isoformat(comment.timestamp),
+        'parent_id': comment.parent_id
+    } for comment in Comment.query.filter(Comment.id.in_(ids))]
+
+
+def _topic_rows(ids, user_id):
+    return [{
+        'id': topic.id,
+        'category_id': topic.category_id,
+        'title': topic.title,
+        'content': topic.content,
+        'author_id': topic.author_id,
+        'created_at': _isoformat(topic.created_at),
+        'reply_count': topic.reply_count,
+        'last_activity_at': _isoformat(topic.last_activity_at)
+    } for topic in ForumTopic.query.filter(ForumTopic.id.in_(ids))]
+
+
+def _reply_rows(ids, user_id):
+    return [{
+        'id': reply.id,
+        'topic_id': reply.topic_id,
+        'author_id': reply.author_id,
+        'content': reply.content,
+        'created_at': _isoformat(reply.created_at)
+    } for reply in ForumReply.query.filter(ForumReply.id.in_(ids))]
+
+
+LOADERS = {
+    LogEntry.__tablename__: _entry_rows,
+    Comment.__tablename__: _comment_rows,
+    ForumTopic.__tablename__: _topic_rows,
+    ForumReply.__tablename__: _reply_rows,
+}
+
+
+@api.route('/sync', methods=['GET'])
+@reaction_buffer.settled
+def sync_changes():
+    """
+    Changes to entries, comments, forum topics and replies since a cursor.
+
+    Pass the cursor from the previous response as since (0 for everything).
+    Each page holds the current version of every changed record plus the ids
+    of deleted ones; keep asking while has_more is true. reset means the
+    cursor is from a different database and the client should start over,
+    as it should when user isn't who it synced for last time.
+    """
+    user = UserManager.get_current_user()
+    if not user:
+        return jsonify({'error': 'Authentication required'}), 401
+
+    try:
+        since = int(request.args.get('since', 0))
+        limit = int(request.args.get('limit', SYNC_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'since and limit must be integers'}), 400
+    if since < 0 or limit < 1:
+        return jsonify({'error': 'since must be 0 or more and limit at least 1'}), 400
+    limit = min(limit, MAX_SYNC_PAGE_SIZE)
+
+    try:
+        # one extra row tells us whether there is another page
+        log = db.session.query(ChangeLog.seq, ChangeLog.table_name, ChangeLog.row_id, ChangeLog.op)\
+                        .filter(ChangeLog.seq > since)\
+                        .order_by(ChangeLog.seq)\
+                        .limit(limit + 1).all()
+        has_more = len(log) > limit
+        log = log[:limit]
+
+        response = {name: [] for name in SYNC_NAMES.values()}
+        response['deleted'] = {name: [] for name in SYNC_NAMES.values()}
+        # user_reaction is per user, a replica filled for someone else is no good
+        response['user'] = user.developer_tag
+
+        if not log:
+            # a cursor past the end came from another (e.g. regenerated) database
+            if since and since > change_tracker.latest():
+                return jsonify(dict(response, cursor=0, has_more=False, reset=True))
+            return jsonify(dict(response, cursor=since, has_more=False, reset=False))
+
+        upserts = {}
+        for _, table_name, row_id, op in log:
+            if op == DELETE:
+                response['deleted'][SYNC_NAMES[table_name]].append(row_id)
+            else:
+                upserts.setdefault(table_name, []).append(row_id)
+        # one query per table; a record deleted since it was logged just isn't found
+        for table_name, ids in upserts.items():
+            response[SYNC_NAMES[table_name]] = LOADERS[table_name](ids, user.developer_tag)
+
+        return jsonify(dict(response, cursor=log[-1].seq, has_more=has_more, reset=False))
+    except Exception as e:
+        logger.error(f"Error reading change log: {str(e)}")
+        return jsonify({'error': 'Failed to load changes'}), 500
@@ -0,0 +1,123 @@
+from flask import current_app, url_for
+from datetime import datetime, timedelta
+from models import db, Project, LanguageTag
+from .account_deletion import AccountDeletion
+from .user_export import UserExport, export_dir, export_token
+from .job_queue import job_queue, PermanentJobError
+from .reaction_buffer import reaction_buffer
+import logging
+import os
+import secrets
+
+logger = logging.getLogger(__name__)
+
+
+def format_commit(commit):
+    """the fields the templates and the entry form use from a PyGithub commit"""
+    return {
+        'sha': commit.sha,
+        'message': commit.commit.message,
+        'author': commit.commit.author.name,
+        'date': commit.commit.author.date.isoformat(),
+        'url': commit.html_url
+    }
+
+
+@job_queue.task('project_languages')
+def detect_project_languages(job):
+    """tag a new project with its repository's languages"""
+    project = db.session.get(Project, job.params['project_name'])
+    if project is None:
+        raise PermanentJobError(f"Project {job.params['project_name']} no longer exists")
+
+    from .gogitter import GoGitter  # PyGithub is slow to import, only workers need it
+    languages = GoGitter().get_repository_languages(project.repository_url)
+    names = sorted({lang.lower() for lang in languages})
+    existing = {tag.name: tag for tag in LanguageTag.query.filter(LanguageTag.name.in_(names))} if names else {}
+    for name in names:
+        tag = existing.get(name)
+        if tag is None:
+            tag = LanguageTag(name=name)
+            db.session.add(tag)
+        if tag not in project.tags:
+            project.tags.append(tag)
+    db.session.commit()
+    return {'languages': names}
+
+
+@job_queue.task('project_commits')
+def fetch_project_commits(job):
+    """recent commits of a project's repository; the result is the cache"""
+    project = db.session.get(Project, job.key)
+    if project is None:
+        raise PermanentJobError(f"Project {job.key} no longer exists")
+
+    from .gogitter import GoGitter
+    commits = []
+    for commit in GoGitter().get_commit_history(project.repository_url):
+        try:
+            commits.append(format_commit(commit))
+        except AttributeError as e:
+            logger.warning(f"Error formatting commit {commit.sha}: {str(e)}")
+    return {'commits': commits}
+
+
+@job_queue.task('delete_account')
+def delete_account(job):
+    """delete a user and their content in batches (UserManager.request_account_deletion)"""
+    deletion = AccountDeletion(job.key, batch_size=current_app.config.get('ACCOUNT_DELETE_BATCH_SIZE', 500))
+    deletion.run(progress=lambda done, total: job_queue.progress(job, done, total))
+    return {'deleted_rows': deletion.done}
+
+
+def _describe_export(job, data):
+    # the link is signed per request, worker processes may not share the secret key
+    result = data['result']
+    if job.status == 'succeeded' and result and datetime.fromisoformat(result['expires_at']) > datetime.utcnow():
+        result['download_url'] = url_for('user_activity.download_user_export', token=export_token(job))
+
+
+@job_queue.task('export_user_data', describe=_describe_export)
+def export_user_data(job):
+    """zip of NDJSON files with everything stored about a user (GET /api/user/data?mode=archive)"""
+    config = current_app.config
+    # the archive has the entries' counters, include toggles still in memory
+    reaction_buffer.settle()
+    export = UserExport(job.key, batch_size=config.get('EXPORT_BATCH_SIZE', 1000))
+    export.count()
+    # unguessable on disk too, the download link only names the job
+    filename = f'{job.id}-{secrets.token_hex(8)}.zip'
+    export.write(os.path.join(export_dir(), filename),
+                 progress=lambda done, total: job_queue.progress(job, done, total))
+
+    ttl = config.get('EXPORT_TTL', 86400)
+    job_queue.enqueue('delete_export', {'file': filename}, key=job.key, delay=ttl)
+    return {
+        'file': filename,
+        'size': os.path.getsize(os.path.join(export_dir(), filename)),
+        'rows': export.counts,
+        'expires_at': (datetime.utcnow() + timedelta(seconds=ttl)).isoformat()
+    }
+
+
+@job_queue.task('delete_export')
+def delete_export(job):
+    """remove an export archive once it has expired"""
+    path = os.path.join(export_dir(), os.path.basename(job.params['file']))
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def project_commits(project_name, created_by=None):
+    """
+    (commits, job): the last fetched commits for a project, or None if they
+    were never fetched, and the job refreshing them if one is queued. A
+    refresh is queued when the cache is older than PROJECT_COMMITS_MAX_AGE.
+    """
+    cached = job_queue.latest('project_commits', project_name)
+    max_age = timedelta(seconds=current_app.config.get('PROJECT_COMMITS_MAX_AGE', 600))
+    if cached is not None and datetime.utcnow() - cached.finished_at < max_age:
+        return cached.result_data['commits'], None
+
+    job = job_queue.enqueue('project_commits', key=project_name, created_by=created_by, unique=True)
+    return (cached.result_data['commits'] if cached is not None else None), job
@@ -0,0 +1,182 @@
+from flask import current_app
+from itsdangerous import URLSafeTimedSerializer, BadData
+from models import db, User, Project, LogEntry, EntryReaction, Comment, ForumTopic, ForumReply, ReactionType, project_members
+from sqlalchemy import select, tuple_
+from datetime import datetime
+import json
+import logging
+import os
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+
+def export_dir():
+    path = current_app.config.get('EXPORT_DIR')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.secret_key, salt='user-data-export')
+
+
+def export_token(job):
+    """signed, expiring reference to a finished export job, for download links"""
+    return _serializer().dumps({'job': job.id, 'file': job.result_data['file']})
+
+
+def read_export_token(token):
+    """(job id, file name) from a download token, or None if it's forged or expired"""
+    try:
+        data = _serializer().loads(token, max_age=current_app.config.get('EXPORT_TTL', 86400))
+    except BadData:
+        return None
+    return data['job'], data['file']
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def _row(columns, values):
+    return {column.key: _isoformat(value) if isinstance(value, datetime) else value
+            for column, value in zip(columns, values)}
+
+
+class _Table:
+    """one NDJSON file: the user's rows of a table, read in keyset order"""
+
+    def __init__(self, filename, columns, where, key, transform=None):
+        self.filename = filename
+        self.columns = columns
+        self.where = where
+        self.key = key  # ordered columns, unique together; should match an index
+        self.transform = transform
+
+    def count(self):
+        return db.session.scalar(select(db.func.count()).select_from(self.columns[0].table).where(self.where))
+
+    def batches(self, size):
+        key_length = len(self.key)
+        query = select(*self.columns, *self.key).where(self.where).order_by(*self.key).limit(size)
+        last = None
+        while True:
+            page = query if last is None else query.where(tuple_(*self.key) > last)
+            rows = db.session.execute(page).all()
+            if not rows:
+                return
+            yield [row[:-key_length] for row in rows]
+            if len(rows) < size:
+                return
+            last = tuple(rows[-1][-key_length:])
+
+
+def _reaction(row):
+    row['reaction'] = ReactionType.to_string(row.pop('reaction_type'))
+    return row
+
+
+class UserExport:
+    """
+    Writes everything stored about a user to a zip of NDJSON files, one per
+    table, one JSON object per line.
+
+    Rows are read batch_size at a time with keyset queries on indexed
+    columns and written straight into the archive, so memory stays flat
+    whatever the account's size. Counters come from the stored columns
+    rather than being counted per entry.
+    """
+
+    def __init__(self, developer_tag, batch_size=1000):
+        self.developer_tag = developer_tag
+        self.batch_size = batch_size
+        self.done = 0
+        self.total = 0
+        self.counts = {}
+
+    def _tables(self):
+        tag = self.developer_tag
+        return (
+            _Table('entries.ndjson',
+                   (LogEntry.id, LogEntry.title, LogEntry.content, LogEntry.project_name, LogEntry.timestamp,
+                    LogEntry.start_time, LogEntry.end_time, LogEntry.time_worked, LogEntry.commit_sha,
+                    LogEntry.likes_count, LogEntry.dislikes_count, LogEntry.comments_count),
+                   LogEntry.developer_tag == tag, (LogEntry.id,)),
+            _Table('entry_comments.ndjson',
+                   (Comment.id, Comment.content, Comment.timestamp, Comment.entry_id, Comment.parent_id),
+                   Comment.user_id == tag, (Comment.timestamp, Comment.id)),
+            _Table('reactions.ndjson',
+                   (EntryReaction.entry_id, EntryReaction.reaction_type, EntryReaction.timestamp),
+                   EntryReaction.user_id == tag, (EntryReaction.entry_id,), _reaction),
+            _Table('forum_posts.ndjson',
+                   (ForumTopic.id, ForumTopic.title, ForumTopic.content, ForumTopic.created_at,
+                    ForumTopic.updated_at, ForumTopic.category_id, ForumTopic.project_name),
+                   ForumTopic.author_id == tag, (ForumTopic.created_at, ForumTopic.id)),
+            _Table('forum_replies.ndjson',
+                   (ForumReply.id, ForumReply.content, ForumReply.created_at, ForumReply.topic_id,
+                    ForumReply.project_name),
+                   ForumReply.author_id == tag, (ForumReply.created_at, ForumReply.id)),
+        )
+
+    def count(self):
+        """rows to write, for progress reporting"""
+        self.counts = {table.filename: table.count() for table in self._tables()}
+        self.total = sum(self.counts.values()) + 2  # account and projects
+        return self.total
+
+    def _account(self):
+        user = User.query.filter_by(developer_tag=self.developer_tag).first()
+        if user is None:
+            raise LookupError(f"User {self.developer_tag} not found")
+        return {
+            'email': user.get_email(),
+            'developer_tag': user.developer_tag,
+            'two_fa_enabled': user.two_fa_enabled,
+            'api_enabled': user.api_enabled,
+            'export_date': datetime.utcnow().isoformat()
+        }
+
+    def _projects(self):
+        mine = select(project_members.c.project_name).where(project_members.c.user_id == self.developer_tag)
+        members = {}
+        for project_name, member in db.session.execute(
+                select(project_members.c.project_name, project_members.c.user_id)
+                .where(project_members.c.project_name.in_(mine))):
+            members.setdefault(project_name, []).append(member)
+        columns = (Project.name, Project.description, Project.repository_url, Project.created_at, Project.created_by)
+        for values in db.session.execute(select(*columns).where(Project.name.in_(mine)).order_by(Project.name)):
+            yield dict(_row(columns, values), team_members=members.get(values[0], []))
+
+    def write(self, path, progress=None):
+        """build the archive at path (atomically); progress(done, total) is called after each batch"""
+        if not self.total:
+            self.count()
+        partial = f'{path}.part'
+        try:
+            with zipfile.ZipFile(partial, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                archive.writestr('account.json', json.dumps(self._account(), indent=2))
+                with archive.open('projects.ndjson', 'w') as out:
+                    for project in self._projects():
+                        out.write((json.dumps(project) + '\n').encode())
+                self.done += 2
+
+                for table in self._tables():
+                    with archive.open(table.filename, 'w') as out:
+                        for rows in table.batches(self.batch_size):
+                            lines = []
+                            for values in rows:
+                                row = _row(table.columns, values)
+                                if table.transform:
+                                    row = table.transform(row)
+                                lines.append(json.dumps(row))
+                            out.write(('\n'.join(lines) + '\n').encode())
+                            self.done += len(rows)
+                            if progress:
+                                progress(self.done, self.total)
+            os.replace(partial, path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        logger.info(f"Exported {self.done} rows for {self.developer_tag} to {path}")
+        return path
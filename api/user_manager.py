@@ -1,95 +1,199 @@
-from flask import session, Blueprint, jsonify, request
+from flask import session, Blueprint, jsonify, request, url_for, send_file
 from datetime import datetime, timedelta
-from models import User, LogEntry, ForumTopic, ForumReply, Comment, db
+from models import User, LogEntry, LanguageTag, ForumCategory, ForumTopic, ForumReply, Comment, Job, db
+from sqlalchemy import func, literal, null, tuple_, union_all
 from .data_manager import DataManager
-from flask_login import login_required, current_user
+from flask_login import login_required, current_user, logout_user
+from .job_queue import job_queue, accepted
+from .reaction_buffer import reaction_buffer
+from .user_export import export_dir, read_export_token
 import bcrypt
 import hashlib
 import logging
+import os
+from password_hasher import PasswordHasherBusy
 
 logger = logging.getLogger(__name__)
 
 # Create API blueprint for user activity
 user_activity_bp = Blueprint('user_activity', __name__)
 
+# profile activity lists are paged newest first with a (timestamp, id) cursor
+ACTIVITY_PAGE_SIZE = 20
+MAX_ACTIVITY_PAGE_SIZE = 100
+
+
+def _page_size():
+    return min(max(request.args.get('limit', ACTIVITY_PAGE_SIZE, type=int), 1), MAX_ACTIVITY_PAGE_SIZE)
+
+
+def _parse_cursor(parts):
+    """the 'cursor' arg as (timestamp, ..., id), or None for the first page; ValueError if malformed"""
+    raw = request.args.get('cursor')
+    if not raw:
+        return None
+    values = raw.split('|')
+    if len(values) != parts:
+        raise ValueError('bad cursor')
+    return (datetime.fromisoformat(values[0]), *values[1:-1], int(values[-1]))
+
+
+def _make_cursor(*values):
+    return '|'.join(value.isoformat() if isinstance(value, datetime) else str(value) for value in values)
+
+
+def _before(timestamp, row_id, cursor):
+    """keyset condition for rows after cursor in (timestamp desc, id desc) order"""
+    return tuple_(timestamp, row_id) < cursor
+
+
+def _preview(text, length):
+    text = text or ''
+    return text[:length] + ('...' if len(text) > length else '')
+
+
+def _forum_links(category, project_name, language_name, topic_id):
+    """(forum name, forum url, topic url) from a category row's columns"""
+    if project_name:
+        forum_name = f"{project_name} - {category.title()}"
+        forum_url = url_for('forums.project_forum', project_name=project_name, category=category)
+        topic_url = url_for('forums.view_topic', project_name=project_name, category=category, topic_id=topic_id)
+    else:
+        language_name = language_name or "General"
+        forum_name = f"{language_name.title()} - {category.title()}"
+        forum_url = url_for('forums.language_forum', language=language_name, category=category)
+        topic_url = url_for('forums.view_language_topic', language=language_name, category=category, topic_id=topic_id)
+    return forum_name, forum_url, topic_url
+
+
+def _forum_columns(query):
+    """join a query that has ForumTopic in it to the category/language columns the links need"""
+    return query.add_columns(ForumCategory.name.label('category'),
+                             ForumCategory.project_name.label('forum_project'),
+                             LanguageTag.name.label('language'))\
+                .join(ForumCategory, ForumTopic.category_id == ForumCategory.id)\
+                .outerjoin(LanguageTag, ForumCategory.language_tag_id == LanguageTag.id)
+
+
+def _page(rows, limit, cursor_of):
+    """(rows of this page, has_more, next cursor) from a query fetched with limit + 1"""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return rows, has_more, cursor_of(rows[-1]) if has_more else None
+
+
 @user_activity_bp.route('/forum-posts')
 @login_required
 def get_user_forum_posts():
-    """get current user's forum posts/topics"""
+    """current user's forum topics, newest first, a page at a time"""
     try:
-        # Get topics created by the current user
-        topics = ForumTopic.query.filter_by(author_id=current_user.developer_tag)\
-                                .order_by(ForumTopic.created_at.desc())\
-                                .all()
-        
-        result = []
-        for topic in topics:
-            # Determine forum type and URL
-            category = topic.category
-            if category.project_name:
-                # Project forum
-                forum_url = f"/projects/{category.project_name}#forum"
-                forum_name = f"{category.project_name} - {category.name.title()}"
-            else:
-                # Language forum
-                language_name = category.language_tag.name if category.language_tag else "General"
-                forum_url = f"/forums/{language_name}/{category.name}"
-                forum_name = f"{language_name.title()} - {category.name.title()}"
-            
-            result.append({
-                'id': topic.id,
-                'title': topic.title,
-                'content': topic.content[:200] + ('...' if len(topic.content) > 200 else ''),
-                'created_at': topic.created_at.isoformat(),
-                'updated_at': topic.updated_at.isoformat(),
-                'replies_count': topic.replies.count(),
+        limit = _page_size()
+        try:
+            cursor = _parse_cursor(2)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+        # only the columns the list shows, categories joined in: one query per page
+        query = _forum_columns(db.session.query(
+            ForumTopic.id,
+            ForumTopic.title,
+            func.substr(ForumTopic.content, 1, 201).label('preview'),
+            ForumTopic.created_at,
+            ForumTopic.updated_at,
+            ForumTopic.reply_count
+        )).filter(ForumTopic.author_id == current_user.developer_tag)
+        if cursor:
+            query = query.filter(_before(ForumTopic.created_at, ForumTopic.id, cursor))
+        rows = query.order_by(ForumTopic.created_at.desc(), ForumTopic.id.desc()).limit(limit + 1).all()
+        rows, has_more, next_cursor = _page(rows, limit, lambda row: _make_cursor(row.created_at, row.id))
+
+        posts = []
+        for row in rows:
+            forum_name, forum_url, topic_url = _forum_links(row.category, row.forum_project, row.language, row.id)
+            posts.append({
+                'id': row.id,
+                'title': row.title,
+                'content': _preview(row.preview, 200),
+                'created_at': row.created_at.isoformat(),
+                'updated_at': row.updated_at.isoformat() if row.updated_at else None,
+                'replies_count': row.reply_count,
                 'forum_name': forum_name,
                 'forum_url': forum_url,
-                'topic_url': f"{forum_url.split('#')[0]}/topic/{topic.id}"
+                'topic_url': topic_url
             })
-        
-        return jsonify(result)
+
+        return jsonify({'posts': posts, 'has_more': has_more, 'next_cursor': next_cursor})
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _forum_comment(row):
+    forum_name, _, topic_url = _forum_links(row.category, row.forum_project, row.language, row.topic_id)
+    return {
+        'type': 'forum',
+        'id': row.id,
+        'content': _preview(row.preview, 150),
+        'created_at': row.created_at.isoformat(),
+        'topic_id': row.topic_id,
+        'topic_title': row.topic_title,
+        'forum_name': forum_name,
+        'topic_url': f"{topic_url}#reply-{row.id}"
+    }
+
+def _entry_comment(row):
+    return {
+        'type': 'entry',
+        'id': row.id,
+        'content': _preview(row.preview, 150),
+        'timestamp': row.created_at.isoformat(),
+        'entry_id': row.entry_id,
+        'entry_title': row.entry_title,
+        'project_name': row.project_name,
+        'entry_url': f"/entry/{row.entry_id}#comment-{row.id}",
+        'parent_id': row.parent_id
+    }
+
+def _forum_comments_query():
+    return _forum_columns(db.session.query(
+        ForumReply.id,
+        func.substr(ForumReply.content, 1, 151).label('preview'),
+        ForumReply.created_at.label('created_at'),
+        ForumTopic.id.label('topic_id'),
+        ForumTopic.title.label('topic_title')
+    ).join(ForumTopic, ForumReply.topic_id == ForumTopic.id))\
+     .filter(ForumReply.author_id == current_user.developer_tag)
+
+def _entry_comments_query():
+    return db.session.query(
+        Comment.id,
+        func.substr(Comment.content, 1, 151).label('preview'),
+        Comment.timestamp.label('created_at'),
+        Comment.parent_id,
+        LogEntry.id.label('entry_id'),
+        LogEntry.title.label('entry_title'),
+        LogEntry.project_name
+    ).join(LogEntry, Comment.entry_id == LogEntry.id)\
+     .filter(Comment.user_id == current_user.developer_tag)
+
 @user_activity_bp.route('/forum-comments')
 @login_required
 def get_user_forum_comments():
-    """get current user's forum replies/comments"""
+    """current user's forum replies, newest first, a page at a time"""
     try:
-        # Get forum replies by the current user
-        replies = ForumReply.query.filter_by(author_id=current_user.developer_tag)\
-                                 .order_by(ForumReply.created_at.desc())\
-                                 .all()
-        
-        result = []
-        for reply in replies:
-            topic = reply.topic
-            category = topic.category
-            
-            # Determine forum type and URL
-            if category.project_name:
-                # Project forum
-                forum_url = f"/projects/{category.project_name}#forum"
-                forum_name = f"{category.project_name} - {category.name.title()}"
-            else:
-                # Language forum
-                language_name = category.language_tag.name if category.language_tag else "General"
-                forum_url = f"/forums/{language_name}/{category.name}"
-                forum_name = f"{language_name.title()} - {category.name.title()}"
-            
-            result.append({
-                'id': reply.id,
-                'content': reply.content[:150] + ('...' if len(reply.content) > 150 else ''),
-                'created_at': reply.created_at.isoformat(),
-                'topic_id': topic.id,
-                'topic_title': topic.title,
-                'forum_name': forum_name,
-                'topic_url': f"{forum_url.split('#')[0]}/topic/{topic.id}#{reply.id}"
-            })
-        
-        return jsonify(result)
+        limit = _page_size()
+        try:
+            cursor = _parse_cursor(2)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+        query = _forum_comments_query()
+        if cursor:
+            query = query.filter(_before(ForumReply.created_at, ForumReply.id, cursor))
+        rows = query.order_by(ForumReply.created_at.desc(), ForumReply.id.desc()).limit(limit + 1).all()
+        rows, has_more, next_cursor = _page(rows, limit, lambda row: _make_cursor(row.created_at, row.id))
+
+        return jsonify({'comments': [_forum_comment(row) for row in rows],
+                        'has_more': has_more, 'next_cursor': next_cursor})
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -97,32 +201,142 @@ def get_user_forum_comments():
 @user_activity_bp.route('/entry-comments')
 @login_required  
 def get_user_entry_comments():
-    """get current user's comments on log entries"""
+    """current user's comments on log entries, newest first, a page at a time"""
     try:
-        # Get comments by the current user
-        comments = Comment.query.filter_by(user_id=current_user.developer_tag)\
-                               .order_by(Comment.timestamp.desc())\
-                               .all()
-        
-        result = []
-        for comment in comments:
-            entry = comment.entry
-            result.append({
-                'id': comment.id,
-                'content': comment.content[:150] + ('...' if len(comment.content) > 150 else ''),
-                'timestamp': comment.timestamp.isoformat(),
-                'entry_id': entry.id,
-                'entry_title': entry.title,
-                'project_name': entry.project_name,
-                'entry_url': f"/entry/{entry.id}#comment-{comment.id}",
-                'parent_id': comment.parent_id
-            })
-        
-        return jsonify(result)
+        limit = _page_size()
+        try:
+            cursor = _parse_cursor(2)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+        query = _entry_comments_query()
+        if cursor:
+            query = query.filter(_before(Comment.timestamp, Comment.id, cursor))
+        rows = query.order_by(Comment.timestamp.desc(), Comment.id.desc()).limit(limit + 1).all()
+        rows, has_more, next_cursor = _page(rows, limit, lambda row: _make_cursor(row.created_at, row.id))
+
+        return jsonify({'comments': [_entry_comment(row) for row in rows],
+                        'has_more': has_more, 'next_cursor': next_cursor})
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@user_activity_bp.route('/activity')
+@login_required
+def get_user_activity():
+    """
+    current user's forum replies and entry comments as one list, newest first
+
+    Both sides are paged by their own index and merged with UNION ALL in the
+    database, so a page is one query however the two are interleaved. Ties
+    on the timestamp are broken by type, then id.
+    """
+    try:
+        limit = _page_size()
+        try:
+            cursor = _parse_cursor(3)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        if cursor and cursor[1] not in ('entry', 'forum'):
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+        def after_cursor(query, kind, timestamp, row_id):
+            # (timestamp, type, id) < cursor, with type fixed on each side
+            if not cursor:
+                return query
+            at, cursor_kind, cursor_id = cursor
+            if kind < cursor_kind:
+                return query.filter(timestamp <= at)
+            if kind == cursor_kind:
+                return query.filter(_before(timestamp, row_id, (at, cursor_id)))
+            return query.filter(timestamp < at)
+
+        forum = after_cursor(_forum_comments_query(), 'forum', ForumReply.created_at, ForumReply.id)
+        entry = after_cursor(_entry_comments_query(), 'entry', Comment.timestamp, Comment.id)
+        # newest limit + 1 from each side is all the merge can ever need
+        forum = forum.order_by(ForumReply.created_at.desc(), ForumReply.id.desc()).limit(limit + 1).subquery()
+        entry = entry.order_by(Comment.timestamp.desc(), Comment.id.desc()).limit(limit + 1).subquery()
+
+        null_int = null().cast(db.Integer)
+        null_text = null().cast(db.String)
+        merged = union_all(
+            db.select(literal('forum').label('kind'), forum.c.id, forum.c.preview, forum.c.created_at,
+                      forum.c.topic_id, forum.c.topic_title, forum.c.category, forum.c.forum_project, forum.c.language,
+                      null_int.label('entry_id'), null_text.label('entry_title'),
+                      null_text.label('project_name'), null_int.label('parent_id')),
+            db.select(literal('entry'), entry.c.id, entry.c.preview, entry.c.created_at,
+                      null_int, null_text, null_text, null_text, null_text,
+                      entry.c.entry_id, entry.c.entry_title, entry.c.project_name, entry.c.parent_id)
+        ).subquery()
+        rows = db.session.execute(
+            db.select(merged)
+              .order_by(merged.c.created_at.desc(), merged.c.kind.desc(), merged.c.id.desc())
+              .limit(limit + 1)
+        ).all()
+        rows, has_more, next_cursor = _page(rows, limit, lambda row: _make_cursor(row.created_at, row.kind, row.id))
+
+        return jsonify({
+            'activity': [_forum_comment(row) if row.kind == 'forum' else _entry_comment(row) for row in rows],
+            'has_more': has_more,
+            'next_cursor': next_cursor
+        })
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@user_activity_bp.route('/project-activity')
+@login_required
+def get_user_project_activity():
+    """current user's per-project entry count, time worked and latest entries"""
+    try:
+        recent = min(max(request.args.get('recent', 5, type=int), 1), 20)
+
+        # one pass over the user's entries: window aggregates give the per-project
+        # totals on every row and row_number keeps just the newest few per project
+        project = LogEntry.project_name
+        ranked = db.session.query(
+            LogEntry.id,
+            LogEntry.title,
+            func.substr(LogEntry.content, 1, 101).label('preview'),
+            LogEntry.timestamp,
+            LogEntry.time_worked,
+            project.label('project_name'),
+            func.count(LogEntry.id).over(partition_by=project).label('entry_count'),
+            func.sum(LogEntry.time_worked).over(partition_by=project).label('total_time'),
+            func.max(LogEntry.timestamp).over(partition_by=project).label('last_entry_at'),
+            func.row_number().over(partition_by=project,
+                                   order_by=(LogEntry.timestamp.desc(), LogEntry.id.desc())).label('rank')
+        ).filter(LogEntry.developer_tag == current_user.developer_tag).subquery()
+
+        rows = db.session.query(ranked)\
+                         .filter(ranked.c.rank <= recent)\
+                         .order_by(ranked.c.last_entry_at.desc(), ranked.c.project_name, ranked.c.rank)\
+                         .all()
+
+        projects = {}
+        for row in rows:
+            if row.project_name not in projects:
+                projects[row.project_name] = {
+                    'project_name': row.project_name,
+                    'entry_count': row.entry_count,
+                    'total_time_worked': row.total_time or 0,
+                    'last_entry_at': row.last_entry_at.isoformat() if row.last_entry_at else None,
+                    'recent_entries': []
+                }
+            preview = row.preview or ''
+            projects[row.project_name]['recent_entries'].append({
+                'id': row.id,
+                'title': row.title,
+                'content': preview[:100] + ('...' if len(preview) > 100 else ''),
+                'timestamp': row.timestamp.isoformat() if row.timestamp else None,
+                'time_worked': row.time_worked
+            })
+
+        return jsonify(list(projects.values()))
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # user authentication and session management
 
 class UserManager:
@@ -145,8 +359,19 @@ class UserManager:
             
         print(f"User found: {user}")
         
-        if user and user.check_password(password):
+        if user and user.deletion_requested_at is None and user.check_password(password):
             print("Password check passed")
+            # upgrade the hash when the configured bcrypt cost has changed
+            if user.password_needs_rehash():
+                try:
+                    user.set_password(password)
+                    db.session.commit()
+                    logger.info(f"Rehashed password for user {user.id} at new cost")
+                except PasswordHasherBusy:
+                    db.session.rollback()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Error rehashing password: {str(e)}")
             return user
 
         print("Authentication failed")
@@ -256,47 +481,38 @@ class UserManager:
         }
 
     @staticmethod
-    def delete_user_account(user):
-        try:
-            # Delete all user-related data in proper order (child records first)
-            
-            # Delete entry reactions
-            from models import EntryReaction
-            EntryReaction.query.filter_by(user_id=user.developer_tag).delete()
-            
-            # Delete comments on entries
-            Comment.query.filter_by(user_id=user.developer_tag).delete()
-            
-            # Delete forum replies
-            ForumReply.query.filter_by(author_id=user.developer_tag).delete()
-            
-            # Delete forum topics
-            ForumTopic.query.filter_by(author_id=user.developer_tag).delete()
-            
-            # Delete log entries
-            LogEntry.query.filter_by(developer_tag=user.developer_tag).delete()
-            
-            # Remove user from project memberships by deleting from association table
-            from models import project_members
-            db.session.execute(
-                project_members.delete().where(
-                    project_members.c.user_id == user.developer_tag
-                )
-            )
-            
-            # Delete the user account
-            db.session.delete(user)
-            db.session.commit()
-            return True
-        except Exception as e:
-            db.session.rollback()
-            logger.error(f"Error deleting user account: {str(e)}")
-            return False
+    def request_account_deletion(user):
+        """
+        lock the account and queue the delete_account job; returns the job.
+        The deletion itself runs in batches in the background (AccountDeletion)
+        """
+        # unflushed toggles would otherwise write the reactions back
+        reaction_buffer.discard_user(user.developer_tag)
+        user.deletion_requested_at = datetime.utcnow()
+        user.api_enabled = False
+        user.api_key_hash = None
+        # committed together with the job
+        return job_queue.enqueue('delete_account', key=user.developer_tag,
+                                 created_by=user.developer_tag, unique=True)
 
 @user_activity_bp.route('/data', methods=['GET'])
 @login_required
+@reaction_buffer.settled
 def download_user_data():
-    """Download all user data as JSON"""
+    """
+    Download all user data as JSON. With mode=archive the export is built in
+    the background instead: 202 with the job, whose result has a signed
+    download_url for a zip of NDJSON files once it has finished
+    """
+    if request.args.get('mode') == 'archive':
+        try:
+            job = job_queue.enqueue('export_user_data', key=current_user.developer_tag,
+                                    created_by=current_user.developer_tag, unique=True)
+            return accepted(job)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error queueing user data export: {str(e)}")
+            return jsonify({'error': 'Failed to start export'}), 500
     try:
         user_data = UserManager.download_user_data(current_user)
         return jsonify(user_data)
@@ -304,17 +520,39 @@ def download_user_data():
         logger.error(f"Error downloading user data: {str(e)}")
         return jsonify({'error': 'Failed to download user data'}), 500
 
+@user_activity_bp.route('/data/export/<token>', methods=['GET'])
+def download_user_export(token):
+    """Serve a finished export archive; the signed token is the authorization"""
+    reference = read_export_token(token)
+    if reference is None:
+        return jsonify({'error': 'Download link is invalid or has expired'}), 404
+    job_id, filename = reference
+    job = db.session.get(Job, job_id)
+    if job is None or job.status != 'succeeded' or job.result_data.get('file') != filename:
+        return jsonify({'error': 'Download link is invalid or has expired'}), 404
+    path = os.path.join(export_dir(), os.path.basename(filename))
+    if not os.path.exists(path):
+        return jsonify({'error': 'Download link is invalid or has expired'}), 404
+    # conditional=True answers Range requests, so interrupted downloads can resume
+    return send_file(path, mimetype='application/zip', as_attachment=True,
+                     download_name=f"devlog_data_{job.finished_at:%Y-%m-%d}.zip",
+                     conditional=True, max_age=0)
+
 @user_activity_bp.route('/data', methods=['DELETE'])
 @login_required
 def delete_user_account():
-    """Delete user account and all associated data"""
+    """
+    Delete the user account and all associated data. Answers 202 with the
+    deletion job; poll its status_url for progress (the session is signed
+    out but can still read that job)
+    """
     try:
-        if UserManager.delete_user_account(current_user):
-            # Clear the session
-            session.clear()
-            return jsonify({'message': 'Account deleted successfully'}), 200
-        else:
-            return jsonify({'error': 'Failed to delete account'}), 500
+        job = UserManager.request_account_deletion(current_user)
+        logout_user()
+        session.clear()
+        session['deletion_job'] = job.id
+        return accepted(job)
     except Exception as e:
+        db.session.rollback()
         logger.error(f"Error deleting user account: {str(e)}")
         return jsonify({'error': 'Failed to delete account'}), 500
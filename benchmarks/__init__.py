@@ -0,0 +1,3 @@
+# synthetic data + benchmark scripts, run from the repo root:
+#   python -m benchmarks.generate_data --db /tmp/bench.db
+#   python -m benchmarks.run_benchmarks --db /tmp/bench.db --output results.json
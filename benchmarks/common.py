@@ -0,0 +1,94 @@
+"""
+Shared helpers for the benchmark scripts
+"""
+
+import os
+import sys
+import hashlib
+import time
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+DEFAULT_PASSWORD = 'Password1'
+
+
+def load_app(db_path):
+    """import the flask app pointed at db_path (must run before main is imported)"""
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.abspath(db_path)}'
+    # normally comes from .env; templates need it for csrf_token()
+    os.environ.setdefault('SECRET_KEY', 'benchmark-secret-key')
+    # background pollers would show up in the query counts
+    os.environ.setdefault('MAIL_OUTBOX_WORKER', 'false')
+    os.environ.setdefault('JOBS_WORKER', 'false')
+    # the warm-up request would fill the search cache and every run would be a hit;
+    # SEARCH_CACHE_ENABLED=true measures the cached responses instead
+    os.environ.setdefault('SEARCH_CACHE_ENABLED', 'false')
+    if 'main' in sys.modules:
+        raise RuntimeError("main was imported before load_app(), the database can't be switched")
+    import main
+    # bring databases generated by an older version up to date, as main.py does at startup
+    from migrations.ensure_columns import ensure_columns
+    from migrations.ensure_indexes import ensure_indexes
+    from api.change_log import change_tracker
+    with main.app.app_context():
+        main.db.create_all()
+        change_tracker.seed()
+        ensure_columns()
+        ensure_indexes()
+    return main.app
+
+
+def fake_commit_sha(project_name, index):
+    """deterministic commit sha shared by the generator and the github stub"""
+    return hashlib.sha1(f"{project_name}:{index}".encode()).hexdigest()
+
+
+def zipf_weights(n, s=1.1):
+    """weights for n items following a zipf-like popularity curve"""
+    return [1.0 / ((i + 1) ** s) for i in range(n)]
+
+
+class QueryCounter:
+    """counts statements sent to the database through an sqlalchemy engine"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        self.engine = engine
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    @contextmanager
+    def measure(self):
+        start_count = self.count
+        start = time.perf_counter()
+        result = {}
+        yield result
+        result['seconds'] = time.perf_counter() - start
+        result['queries'] = self.count - start_count
+
+
+def percentile(values, pct):
+    """nearest-rank percentile of an already sorted list"""
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, int(round(pct / 100.0 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def summarize(samples):
+    """latency summary in milliseconds"""
+    ordered = sorted(s * 1000 for s in samples)
+    return {
+        'runs': len(ordered),
+        'min_ms': round(ordered[0], 3),
+        'median_ms': round(percentile(ordered, 50), 3),
+        'p95_ms': round(percentile(ordered, 95), 3),
+        'max_ms': round(ordered[-1], 3),
+        'mean_ms': round(sum(ordered) / len(ordered), 3),
+    }
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Fill a fresh SQLite database with synthetic, seeded data for benchmarking.
+
+Activity is skewed the way a real class looks: a few users write most of the
+entries, a few projects and entries collect most of the reactions/comments,
+and a handful of help threads get very long.
+
+    python -m benchmarks.generate_data --db /tmp/bench.db --seed 42 --scale 2
+"""
+
+import argparse
+import itertools
+import os
+import random
+from datetime import datetime, timedelta
+
+import bcrypt
+
+from benchmarks.common import load_app, fake_commit_sha, zipf_weights, DEFAULT_PASSWORD
+
+# baseline sizes, multiplied by --scale
+DEFAULT_COUNTS = {
+    'users': 200,
+    'projects': 60,
+    'entries': 5000,
+    'reactions': 20000,
+    'comments': 8000,
+    'topics': 600,
+    'replies': 6000,
+}
+
+EXTRA_LANGUAGES = ['kotlin', 'swift', 'csharp', 'bash', 'sql', 'lua']
+
+WORDS = (
+    'refactor fix bug feature api database schema migration test deploy login '
+    'session cache query index search forum reply comment reaction donut homer '
+    'flask template route blueprint model commit branch merge review docs css '
+    'layout mobile performance memory latency timeout error logging github'
+).split()
+
+BASE_TIME = datetime(2025, 1, 1)
+
+
+def sentence(rng, low, high):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+def weighted_picker(rng, items, weights):
+    """pick from items by weight, with the cumulative weights computed once"""
+    cum_weights = list(itertools.accumulate(weights))
+    return lambda: rng.choices(items, cum_weights=cum_weights)[0]
+
+
+def random_time(rng, days=365):
+    return BASE_TIME + timedelta(seconds=rng.randint(0, days * 24 * 3600))
+
+
+def generate(db, counts, seed):
+    """generate every table in dependency order, using bulk inserts"""
+    from sqlalchemy import insert
+    from models import (User, Project, LogEntry, EntryReaction, Comment, LanguageTag,
+                        ForumCategory, ForumTopic, ForumReply, ReactionType,
+                        project_members, project_tags)
+    from migrations.create_default_forums import create_default_forums
+
+    rng = random.Random(seed)
+
+    # one hash for everybody - bcrypt per row would dominate generation time
+    password_hash = bcrypt.hashpw(DEFAULT_PASSWORD.encode('utf-8'), bcrypt.gensalt())
+
+    # users, in order of how active they are
+    user_rows = []
+    for i in range(counts['users']):
+        user = User(developer_tag=f'dev{i:04d}')
+        user.set_email(f'dev{i:04d}@example.com')
+        user_rows.append({
+            'id': i + 1,
+            'developer_tag': user.developer_tag,
+            'email_hash': user.email_hash,
+            '_temp_email': user._temp_email,
+            'password_hash': password_hash,
+            'two_fa_enabled': False,
+            'two_fa_verified': False,
+            'api_enabled': False,
+        })
+    db.session.execute(insert(User), user_rows)
+    tags = [row['developer_tag'] for row in user_rows]
+    pick_user = weighted_picker(rng, tags, zipf_weights(len(tags)))
+
+    # language tags + default language forums
+    create_default_forums()
+    for name in EXTRA_LANGUAGES:
+        if not LanguageTag.query.filter_by(name=name).first():
+            db.session.add(LanguageTag(name=name))
+    db.session.flush()
+    languages = [tag.id for tag in LanguageTag.query.order_by(LanguageTag.id).all()]
+    language_weights = zipf_weights(len(languages), s=0.9)
+    pick_language = weighted_picker(rng, languages, language_weights)
+
+    # projects with teams, language tags and their own forums
+    project_rows, member_rows, tag_rows = [], [], []
+    category_rows = []
+    for i in range(counts['projects']):
+        name = f'project-{i:03d}'
+        creator = pick_user()
+        project_rows.append({
+            'name': name,
+            'description': sentence(rng, 8, 30),
+            'repository_url': f'https://github.com/example/{name}',
+            'created_at': random_time(rng),
+            'created_by': creator,
+        })
+        team = {creator} | set(rng.sample(tags, rng.randint(0, 5)))
+        member_rows.extend({'project_name': name, 'user_id': tag} for tag in sorted(team))
+        project_langs = {pick_language() for _ in range(rng.randint(1, 4))}
+        tag_rows.extend({'project_name': name, 'tag_id': tag_id} for tag_id in sorted(project_langs))
+        for category in ['general', 'help']:
+            category_rows.append({'name': category, 'project_name': name, 'created_at': BASE_TIME})
+    db.session.execute(insert(Project), project_rows)
+    db.session.execute(project_members.insert(), member_rows)
+    db.session.execute(project_tags.insert(), tag_rows)
+    db.session.execute(insert(ForumCategory), category_rows)
+
+    project_names = [row['name'] for row in project_rows]
+    project_weights = zipf_weights(len(project_names))
+    pick_project = weighted_picker(rng, project_names, project_weights)
+    teams = {}
+    for row in member_rows:
+        teams.setdefault(row['project_name'], []).append(row['user_id'])
+
+    # log entries - mostly written by team members of popular projects
+    entry_rows = []
+    for i in range(counts['entries']):
+        project_name = pick_project()
+        if rng.random() < 0.9:
+            developer = rng.choice(teams[project_name])
+        else:
+            developer = pick_user()
+        start = random_time(rng)
+        minutes = rng.randint(10, 240)
+        entry_rows.append({
+            'id': i + 1,
+            'title': sentence(rng, 3, 8)[:200],
+            'content': sentence(rng, 20, 200),
+            'project_name': project_name,
+            'developer_tag': developer,
+            'timestamp': start + timedelta(minutes=minutes),
+            'start_time': start,
+            'end_time': start + timedelta(minutes=minutes),
+            'time_worked': minutes,
+            'commit_sha': fake_commit_sha(project_name, rng.randint(0, 9)) if rng.random() < 0.3 else None,
+        })
+    db.session.execute(insert(LogEntry), entry_rows)
+
+    # popularity of entries is independent of their id
+    entry_order = list(range(len(entry_rows)))
+    rng.shuffle(entry_order)
+    entry_weights = [0.0] * len(entry_rows)
+    for rank, weight in zip(entry_order, zipf_weights(len(entry_rows))):
+        entry_weights[rank] = weight
+    pick_entry = weighted_picker(rng, entry_rows, entry_weights)
+
+    # reactions - one per (user, entry), mostly likes
+    reaction_rows, seen = [], set()
+    attempts = 0
+    while len(reaction_rows) < counts['reactions'] and attempts < counts['reactions'] * 5:
+        attempts += 1
+        entry = pick_entry()
+        user = pick_user()
+        if (user, entry['id']) in seen:
+            continue
+        seen.add((user, entry['id']))
+        reaction_rows.append({
+            'user_id': user,
+            'entry_id': entry['id'],
+            'reaction_type': ReactionType.LIKE if rng.random() < 0.8 else ReactionType.DISLIKE,
+            'timestamp': entry['timestamp'] + timedelta(minutes=rng.randint(1, 10000)),
+            'project_name': entry['project_name'],
+        })
+    db.session.execute(insert(EntryReaction), reaction_rows)
+
+    # comments - about a third are replies to an earlier comment on the same entry
+    comment_rows, comments_by_entry = [], {}
+    for i in range(counts['comments']):
+        entry = pick_entry()
+        siblings = comments_by_entry.setdefault(entry['id'], [])
+        parent_id = rng.choice(siblings) if siblings and rng.random() < 0.35 else None
+        comment_id = i + 1
+        comment_rows.append({
+            'id': comment_id,
+            'entry_id': entry['id'],
+            'user_id': pick_user(),
+            'content': sentence(rng, 3, 60),
+            'timestamp': entry['timestamp'] + timedelta(minutes=rng.randint(1, 10000) + i),
+            'parent_id': parent_id,
+        })
+        siblings.append(comment_id)
+    db.session.execute(insert(Comment), comment_rows)
+
+    # forum topics, weighted toward popular languages and projects
+    categories = ForumCategory.query.order_by(ForumCategory.id).all()
+    language_rank = {tag_id: weight for tag_id, weight in zip(languages, language_weights)}
+    project_rank = {name: weight for name, weight in zip(project_names, project_weights)}
+    category_weights = [
+        language_rank.get(c.language_tag_id, 0.01) if c.project_name is None
+        else project_rank.get(c.project_name, 0.01) * 0.5
+        for c in categories
+    ]
+    pick_category = weighted_picker(rng, categories, category_weights)
+    topic_rows = []
+    for i in range(counts['topics']):
+        category = pick_category()
+        created = random_time(rng)
+        topic_rows.append({
+            'id': i + 1,
+            'title': sentence(rng, 3, 10)[:200],
+            'content': sentence(rng, 10, 120),
+            'created_at': created,
+            'updated_at': created,
+            'category_id': category.id,
+            'author_id': pick_user(),
+            'project_name': category.project_name,
+        })
+    db.session.execute(insert(ForumTopic), topic_rows)
+
+    # replies - a few help threads get very long
+    pick_topic = weighted_picker(rng, topic_rows, zipf_weights(len(topic_rows), s=1.2))
+    reply_rows = []
+    for i in range(counts['replies']):
+        topic = pick_topic()
+        reply_rows.append({
+            'content': sentence(rng, 5, 80),
+            'created_at': topic['created_at'] + timedelta(minutes=rng.randint(1, 20000) + i),
+            'topic_id': topic['id'],
+            'author_id': pick_user(),
+            'project_name': topic['project_name'],
+        })
+    db.session.execute(insert(ForumReply), reply_rows)
+
+    # core inserts skip the app's write paths, so fill the maintained counters in one go
+    LogEntry.refresh_counts()
+    ForumTopic.refresh_reply_stats()
+    ForumCategory.refresh_stats()
+
+    # likewise the change log gets one row per record (this commits)
+    from api.change_log import change_tracker
+    change_tracker.rebuild()
+
+    return {
+        'users': len(user_rows),
+        'projects': len(project_rows),
+        'languages': len(languages),
+        'entries': len(entry_rows),
+        'reactions': len(reaction_rows),
+        'comments': len(comment_rows),
+        'topics': len(topic_rows),
+        'replies': len(reply_rows),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', required=True, help='path of the sqlite file to create')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplier for every default count')
+    parser.add_argument('--force', action='store_true', help='overwrite an existing database file')
+    for name, value in DEFAULT_COUNTS.items():
+        parser.add_argument(f'--{name}', type=int, default=None, help=f'number of {name} (default {value} x scale)')
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        if not args.force:
+            parser.error(f"{args.db} already exists, pass --force to overwrite it")
+        os.remove(args.db)
+
+    counts = {
+        name: getattr(args, name) if getattr(args, name) is not None else int(value * args.scale)
+        for name, value in DEFAULT_COUNTS.items()
+    }
+
+    app = load_app(args.db)
+    from models import db
+    with app.app_context():
+        db.create_all()
+        created = generate(db, counts, args.seed)
+
+    print(f"Generated {args.db} with seed {args.seed}:")
+    for name, value in created.items():
+        print(f"  {name}: {value}")
+    print(f"Every user's password is {DEFAULT_PASSWORD!r}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Concurrent login benchmark: N threads log in repeatedly through the test client.
+
+Shows throughput, latency percentiles and how many requests were shed with
+503 by the bcrypt pool.
+
+    python -m benchmarks.login_throughput --db /tmp/bench.db --threads 32 --logins 8
+    python -m benchmarks.login_throughput --db /tmp/bench.db --workers 2 --queue-depth 4
+"""
+
+import argparse
+import json
+import logging
+import threading
+import time
+
+from benchmarks.common import load_app, summarize, DEFAULT_PASSWORD
+
+
+def worker(app, email, logins, samples, statuses, lock, start_event):
+    client = app.test_client()
+    start_event.wait()
+    for _ in range(logins):
+        start = time.perf_counter()
+        response = client.post('/api/auth/login', json={'email': email, 'password': DEFAULT_PASSWORD})
+        elapsed = time.perf_counter() - start
+        with lock:
+            samples.append(elapsed)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', required=True, help='database created by benchmarks.generate_data')
+    parser.add_argument('--threads', type=int, default=16, help='concurrent clients')
+    parser.add_argument('--logins', type=int, default=5, help='logins per client')
+    parser.add_argument('--rounds', type=int, help='override BCRYPT_LOG_ROUNDS')
+    parser.add_argument('--workers', type=int, help='override PASSWORD_HASH_WORKERS')
+    parser.add_argument('--queue-depth', type=int, help='override PASSWORD_HASH_QUEUE_DEPTH')
+    parser.add_argument('--output', help='write the JSON results here')
+    args = parser.parse_args()
+
+    app = load_app(args.db)
+    logging.disable(logging.WARNING)
+
+    for option, key in [('rounds', 'BCRYPT_LOG_ROUNDS'), ('workers', 'PASSWORD_HASH_WORKERS'),
+                        ('queue_depth', 'PASSWORD_HASH_QUEUE_DEPTH')]:
+        if getattr(args, option) is not None:
+            app.config[key] = getattr(args, option)
+    from password_hasher import password_hasher
+    password_hasher.init_app(app)
+
+    from models import User
+    with app.app_context():
+        emails = [u.get_email() for u in User.query.order_by(User.id).limit(args.threads).all()]
+
+    samples, statuses, lock = [], {}, threading.Lock()
+    start_event = threading.Event()
+    threads = [
+        threading.Thread(target=worker, args=(app, emails[i % len(emails)], args.logins,
+                                              samples, statuses, lock, start_event))
+        for i in range(args.threads)
+    ]
+    for t in threads:
+        t.start()
+    started = time.perf_counter()
+    start_event.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    result = summarize(samples)
+    result.update({
+        'threads': args.threads,
+        'logins_per_thread': args.logins,
+        'rounds': app.config.get('BCRYPT_LOG_ROUNDS'),
+        'pool_workers': app.config.get('PASSWORD_HASH_WORKERS'),
+        'queue_depth': app.config.get('PASSWORD_HASH_QUEUE_DEPTH'),
+        'wall_seconds': round(elapsed, 3),
+        'requests_per_second': round(len(samples) / elapsed, 2),
+        'successful_per_second': round(statuses.get(200, 0) / elapsed, 2),
+        'statuses': {str(k): v for k, v in sorted(statuses.items())},
+    })
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Concurrent reaction benchmark: N threads toggle like/dislike on the same entry
+as fast as they can. With --clients-per-user above 1 several threads share a
+login, like a user double-clicking, which is what used to race on the
+unique (user, entry) constraint.
+
+Shows throughput and latency, any non-200 responses, and checks afterwards
+that the entry's stored counters match the reaction rows and (with one client
+per user) that every user's final reaction is the one their last response
+reported. Exits non-zero if any of those checks fail, so it can gate a change.
+
+    python -m benchmarks.reaction_concurrency --db /tmp/bench.db --threads 16 --toggles 50
+    python -m benchmarks.reaction_concurrency --db /tmp/bench.db --threads 16 --clients-per-user 4
+    python -m benchmarks.reaction_concurrency --db /tmp/bench.db --threads 32 --write-mode buffered
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+
+from benchmarks.common import load_app, summarize, DEFAULT_PASSWORD
+
+
+def worker(app, email, entry_id, toggles, seed, samples, statuses, last_state, lock, start_event):
+    client = app.test_client()
+    client.post('/api/auth/login', json={'email': email, 'password': DEFAULT_PASSWORD})
+    rng = random.Random(seed)
+    start_event.wait()
+    state = None
+    for _ in range(toggles):
+        start = time.perf_counter()
+        response = client.post(f'/api/entries/{entry_id}/react',
+                               json={'reaction_type': rng.choice(['like', 'dislike'])})
+        elapsed = time.perf_counter() - start
+        if response.status_code == 200:
+            state = response.get_json()['user_reaction']
+        with lock:
+            samples.append(elapsed)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    with lock:
+        last_state.setdefault(email, []).append(state)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', required=True, help='database created by benchmarks.generate_data')
+    parser.add_argument('--threads', type=int, default=16, help='concurrent clients')
+    parser.add_argument('--clients-per-user', type=int, default=1, help='threads sharing each login')
+    parser.add_argument('--toggles', type=int, default=50, help='reactions sent per client')
+    parser.add_argument('--entry', type=int, help='entry to hammer (default: the first one)')
+    parser.add_argument('--write-mode', choices=['sync', 'buffered'], help='override REACTION_WRITE_MODE')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the JSON results here')
+    args = parser.parse_args()
+
+    if args.write_mode:
+        os.environ['REACTION_WRITE_MODE'] = args.write_mode
+    app = load_app(args.db)
+    logging.disable(logging.WARNING)
+
+    from models import db, User, LogEntry, EntryReaction, ReactionType
+    with app.app_context():
+        per_user = max(args.clients_per_user, 1)
+        users = User.query.order_by(User.id).limit(-(-args.threads // per_user)).all()
+        emails = {user.get_email(): user.developer_tag for user in users}
+        entry_id = args.entry or db.session.query(db.func.min(LogEntry.id)).scalar()
+
+    samples, statuses, last_state, lock = [], {}, {}, threading.Lock()
+    start_event = threading.Event()
+    threads = [
+        threading.Thread(target=worker, args=(app, list(emails)[i // per_user], entry_id, args.toggles,
+                                              args.seed + i, samples, statuses, last_state, lock, start_event))
+        for i in range(args.threads)
+    ]
+    for t in threads:
+        t.start()
+    started = time.perf_counter()
+    start_event.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    # write out anything still buffered, as shutdown would
+    from api.reaction_buffer import reaction_buffer
+    reaction_buffer.stop()
+
+    with app.app_context():
+        entry = db.session.get(LogEntry, entry_id)
+        rows = dict(db.session.query(EntryReaction.user_id, EntryReaction.reaction_type)
+                              .filter_by(entry_id=entry_id).all())
+        likes = sum(1 for kind in rows.values() if kind == ReactionType.LIKE)
+        dislikes = sum(1 for kind in rows.values() if kind == ReactionType.DISLIKE)
+        consistency = {
+            'stored_counts': [entry.likes_count, entry.dislikes_count],
+            'actual_counts': [likes, dislikes],
+            'counts_match': (entry.likes_count, entry.dislikes_count) == (likes, dislikes),
+        }
+        # which of a shared login's threads finished last isn't known, so only check single clients
+        if per_user == 1:
+            mismatched_users = [
+                email for email, (state,) in last_state.items()
+                if ReactionType.to_string(rows.get(emails[email], ReactionType.NONE)) != state
+            ]
+            consistency['users_matching_last_response'] = len(last_state) - len(mismatched_users)
+            consistency['users_mismatched'] = len(mismatched_users)
+
+    result = summarize(samples)
+    result.update({
+        'entry_id': entry_id,
+        'threads': len(threads),
+        'clients_per_user': per_user,
+        'toggles_per_thread': args.toggles,
+        'wall_seconds': round(elapsed, 3),
+        'requests_per_second': round(len(samples) / elapsed, 2),
+        'statuses': {str(k): v for k, v in sorted(statuses.items())},
+        'buffer': reaction_buffer.stats(),
+        'consistency': consistency,
+    })
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+    failures = []
+    errors = sum(count for status, count in statuses.items() if status != 200)
+    if errors:
+        failures.append(f"{errors} non-200 response(s)")
+    if not consistency['counts_match']:
+        failures.append(f"stored counts {consistency['stored_counts']} != actual {consistency['actual_counts']}")
+    if consistency.get('users_mismatched'):
+        failures.append(f"{consistency['users_mismatched']} user(s) don't have the reaction their last response reported")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
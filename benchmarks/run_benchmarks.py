@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Measure latency and query counts of the hot endpoints through the Flask test client.
+
+Generate a database first with benchmarks.generate_data, then:
+
+    python -m benchmarks.run_benchmarks --db /tmp/bench.db --output before.json
+    python -m benchmarks.run_benchmarks --db /tmp/bench.db --output after.json --compare before.json
+
+GitHub is stubbed so the project page can be measured offline.
+"""
+
+import argparse
+import json
+import logging
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from types import SimpleNamespace
+
+from benchmarks.common import (ROOT, DEFAULT_PASSWORD, QueryCounter, load_app,
+                               fake_commit_sha, summarize)
+
+
+class StubGoGitter:
+    """offline stand-in for api.gogitter.GoGitter"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def get_commit_history(self, repo_url, limit=10):
+        project_name = repo_url.rstrip('/').split('/')[-1]
+        return [
+            SimpleNamespace(
+                sha=fake_commit_sha(project_name, i),
+                html_url=f'{repo_url}/commit/{fake_commit_sha(project_name, i)}',
+                commit=SimpleNamespace(
+                    message=f'commit {i}',
+                    author=SimpleNamespace(name='stub', date=datetime(2025, 1, 1))
+                )
+            )
+            for i in range(limit)
+        ]
+
+    def get_repository_languages(self, repo_url):
+        return ['python']
+
+
+def install_github_stub():
+    # the job tasks import GoGitter when they run
+    import api.gogitter
+    api.gogitter.GoGitter = StubGoGitter
+
+
+def pick_targets(db):
+    """choose representative (busy) rows to hit"""
+    from sqlalchemy import func
+    from models import (User, LogEntry, EntryReaction, ForumTopic, ForumReply,
+                        ForumCategory, LanguageTag, Project)
+
+    busiest_user = db.session.query(LogEntry.developer_tag, func.count(LogEntry.id).label('n'))\
+        .group_by(LogEntry.developer_tag).order_by(func.count(LogEntry.id).desc()).first()[0]
+    user = User.query.filter_by(developer_tag=busiest_user).first()
+
+    hot_entry = db.session.query(EntryReaction.entry_id)\
+        .group_by(EntryReaction.entry_id).order_by(func.count(EntryReaction.id).desc()).first()[0]
+    hot_project = db.session.query(LogEntry.project_name)\
+        .group_by(LogEntry.project_name).order_by(func.count(LogEntry.id).desc()).first()[0]
+
+    def longest_topic(language_forum):
+        query = db.session.query(ForumTopic, ForumCategory)\
+            .join(ForumCategory, ForumTopic.category_id == ForumCategory.id)\
+            .outerjoin(ForumReply, ForumReply.topic_id == ForumTopic.id)
+        if language_forum:
+            query = query.filter(ForumCategory.project_name.is_(None))
+        else:
+            query = query.filter(ForumCategory.project_name.isnot(None))
+        return query.group_by(ForumTopic.id).order_by(func.count(ForumReply.id).desc()).first()
+
+    language_topic, language_category = longest_topic(True)
+    language = db.session.get(LanguageTag, language_category.language_tag_id).name
+    project_topic, project_category = longest_topic(False)
+
+    return {
+        'email': user.get_email(),
+        'developer_tag': user.developer_tag,
+        'entry_id': hot_entry,
+        'project_name': hot_project,
+        'language': language,
+        'language_category': language_category.name,
+        'language_topic_id': language_topic.id,
+        'topic_project': project_category.project_name,
+        'project_category': project_category.name,
+        'project_topic_id': project_topic.id,
+        'search_project': Project.query.order_by(Project.name).first().name,
+    }
+
+
+def build_endpoints(t):
+    """(name, url) pairs for every benchmarked GET"""
+    return [
+        ('dashboard_feed', '/api/feed/dashboard'),
+        ('search_entries', f"/api/entries/search?project={t['search_project']}"),
+        ('search_metadata', '/api/search/metadata'),
+        ('search_entries_advanced', '/api/search/entries/advanced?text=cache'),
+        ('search_entries_advanced_likes', '/api/search/entries/advanced?sort_field=likes&page=5'),
+        ('search_entries_advanced_languages', '/api/search/entries/advanced?languages[]=python&page=3'),
+        ('search_projects_advanced', '/api/search/projects/advanced'),
+        ('search_forums_advanced', '/api/search/forums/advanced?text=help'),
+        ('project_activity', '/api/user/project-activity'),
+        ('entry_view', f"/entry/{t['entry_id']}"),
+        ('entry_api', f"/api/entries/{t['entry_id']}"),
+        ('entry_comments', f"/api/entries/{t['entry_id']}/comments"),
+        ('project_view', f"/projects/{t['project_name']}"),
+        ('forum_index', '/forums/'),
+        ('language_forum', f"/forums/{t['language']}/{t['language_category']}"),
+        ('language_topic', f"/forums/{t['language']}/{t['language_category']}/topics/{t['language_topic_id']}"),
+        ('project_forum', f"/forums/projects/{t['topic_project']}/{t['project_category']}"),
+        ('project_topic', f"/forums/projects/{t['topic_project']}/{t['project_category']}/topics/{t['project_topic_id']}"),
+    ]
+
+
+def login(client, email):
+    response = client.post('/api/auth/login', json={'email': email, 'password': DEFAULT_PASSWORD})
+    if response.status_code != 200 or 'redirect' not in (response.get_json() or {}):
+        raise RuntimeError(f"Benchmark login failed: {response.status_code} {response.get_data(as_text=True)}")
+
+
+def run_endpoint(client, counter, url, runs, warmup):
+    for _ in range(warmup):
+        client.get(url)
+
+    samples, queries, statuses, sizes = [], [], set(), set()
+    for _ in range(runs):
+        with counter.measure() as measured:
+            response = client.get(url)
+            body = response.get_data()
+        samples.append(measured['seconds'])
+        queries.append(measured['queries'])
+        statuses.add(response.status_code)
+        sizes.add(len(body))
+
+    result = summarize(samples)
+    result.update({
+        'url': url,
+        'queries': max(queries),
+        'status': sorted(statuses),
+        'bytes': max(sizes),
+    })
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def table_counts(db):
+    from models import User, Project, LogEntry, EntryReaction, Comment, ForumTopic, ForumReply
+    return {model.__tablename__: model.query.count()
+            for model in [User, Project, LogEntry, EntryReaction, Comment, ForumTopic, ForumReply]}
+
+
+def print_report(results, baseline=None):
+    header = f"{'endpoint':36} {'median ms':>10} {'p95 ms':>10} {'queries':>8} {'status':>8}"
+    if baseline:
+        header += f" {'median Δ':>10} {'queries Δ':>10}"
+    print(header)
+    for name, r in results.items():
+        line = f"{name:36} {r['median_ms']:>10.2f} {r['p95_ms']:>10.2f} {r['queries']:>8} {','.join(map(str, r['status'])):>8}"
+        old = (baseline or {}).get(name)
+        if old:
+            change = (r['median_ms'] - old['median_ms']) / old['median_ms'] * 100 if old['median_ms'] else 0
+            line += f" {change:>+9.1f}% {r['queries'] - old['queries']:>+10}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', required=True, help='database created by benchmarks.generate_data')
+    parser.add_argument('--output', default='bench_results.json', help='where to write the JSON results')
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--only', action='append', help='only run the named endpoint(s)')
+    parser.add_argument('--compare', help='previous results file to diff against')
+    parser.add_argument('--verbose', action='store_true', help="keep the app's request logging on")
+    args = parser.parse_args()
+
+    app = load_app(args.db)
+    if not args.verbose:
+        # per-request INFO logging is noise here and would dominate small endpoints
+        logging.disable(logging.INFO)
+    install_github_stub()
+
+    from models import db
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+        targets = pick_targets(db)
+        counts = table_counts(db)
+        # the project page reads commits from the last fetch job, run it up front
+        from api.job_queue import job_queue
+        job_queue.enqueue('project_commits', key=targets['project_name'], unique=True)
+        job_queue.drain()
+
+    client = app.test_client()
+    login(client, targets['email'])
+
+    results = {}
+    for name, url in build_endpoints(targets):
+        if args.only and name not in args.only:
+            continue
+        results[name] = run_endpoint(client, counter, url, args.runs, args.warmup)
+
+    report = {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(),
+            'git_revision': git_revision(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'database': args.db,
+            'runs': args.runs,
+            'warmup': args.warmup,
+            'tables': counts,
+            'targets': targets,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+    print_report(results, baseline)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Cold start benchmark: how long a fresh worker process takes to import the
+app and answer its first request.
+
+Each run is a new interpreter started with `python -X importtime`, so
+nothing is shared between runs. Prints the time to import main (which
+builds the app), the time to the first response, the modules that cost
+the most to import, and any module on the lazy list that got imported
+at startup anyway.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 10 --top 20 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import ROOT, summarize
+
+# only needed on specific routes or commands, so they shouldn't load at startup
+LAZY_MODULES = ('github', 'bleach', 'flask_migrate', 'alembic')
+
+CHILD = """
+import json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.app.test_client().get('/login')
+print(json.dumps({'import': imported - start, 'first_request': time.perf_counter() - start}))
+"""
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$')
+
+
+def run_once(env):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            # (name, nesting depth, cumulative microseconds)
+            modules.append((match.group(4), len(match.group(3)), int(match.group(2))))
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return timings, modules
+
+
+def heaviest(modules, top):
+    """direct imports of main, by cumulative import time"""
+    # importtime lists a module's imports before the module itself
+    children = []
+    for name, depth, cumulative in modules:
+        if depth == 1:
+            if name == 'main':
+                break
+            children = []
+        elif depth == 3:
+            children.append((name, cumulative))
+    return sorted(children, key=lambda item: item[1], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters to time')
+    parser.add_argument('--top', type=int, default=15, help='heaviest imports to list')
+    parser.add_argument('--db', help='sqlite file to point the app at (default: an empty temporary one)')
+    parser.add_argument('--output', help='write the JSON results here')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ,
+                   DATABASE_URL=f"sqlite:///{os.path.abspath(args.db or os.path.join(tmp, 'startup.db'))}",
+                   SECRET_KEY=os.environ.get('SECRET_KEY', 'benchmark-secret-key'),
+                   MAIL_OUTBOX_WORKER='false',
+                   JOBS_WORKER='false')
+        # the first run writes the .pyc files, it isn't counted
+        run_once(env)
+        runs = [run_once(env) for _ in range(args.runs)]
+
+    imports = summarize([timings['import'] for timings, _ in runs])
+    first_request = summarize([timings['first_request'] for timings, _ in runs])
+    _, modules = runs[-1]
+    loaded = {name for name, _, _ in modules}
+    eager = sorted(name for name in LAZY_MODULES if name in loaded)
+    top = heaviest(modules, args.top)
+
+    print(f"import main:        median {imports['median_ms']:.0f} ms (min {imports['min_ms']:.0f}, "
+          f"max {imports['max_ms']:.0f}) over {args.runs} runs")
+    print(f"first response:     median {first_request['median_ms']:.0f} ms")
+    print(f"modules imported:   {len(loaded)}")
+    print(f"lazy modules found: {', '.join(eager) if eager else 'none'}")
+    print(f"\n{'heaviest imports of main':<36} {'ms':>8}")
+    for name, cumulative in top:
+        print(f"{name:<36} {cumulative / 1000:>8.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'import': imports,
+                'first_request': first_request,
+                'modules_imported': len(loaded),
+                'eager_lazy_modules': eager,
+                'heaviest': [{'module': name, 'ms': round(cumulative / 1000, 1)} for name, cumulative in top]
+            }, f, indent=2)
+    # non-zero when something meant to load lazily crept back into startup
+    return 1 if eager else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the DataManager validators, no database needed.
+
+Times each validator per call next to the way it used to be done (bleach.clean
+with a fresh tag list, re.match with a pattern string, entries parsed twice),
+then validates a bulk-import sized batch of entries.
+
+    python -m benchmarks.validation
+    python -m benchmarks.validation --number 20000 --batch 1000 --output validation.json
+"""
+
+import argparse
+import json
+import logging
+import re
+import timeit
+from datetime import datetime
+
+import bleach
+
+from benchmarks.common import ROOT  # noqa: F401 (puts the app on sys.path)
+from api.data_manager import DataManager
+
+PLAIN = "Worked on the search index today and fixed the latency regression in the mobile sync path. " * 4
+HTML = "Fixed <b>two</b> bugs in <code>sync.py</code> &amp; added a test<script>alert(1)</script>. " * 4
+
+
+def entry(index):
+    return {
+        'title': f'Entry {index}',
+        'content': PLAIN if index % 4 else HTML,
+        'project_name': 'project-000',
+        'start_time': '2025-01-01T09:00:00',
+        'end_time': '2025-01-01T10:30:00',
+        'time_worked': '90',
+        'commit_sha': None
+    }
+
+
+def old_entry(data):
+    """validate_entry_data before the schema: per-call bleach and a second parse in the handler"""
+    tags = ['b', 'i', 'u', 'p', 'br', 'code']
+    cleaned = {
+        'title': bleach.clean(str(data['title']), tags=tags, strip=True),
+        'content': bleach.clean(str(data['content']), tags=tags, strip=True),
+        'project_name': bleach.clean(str(data['project_name']), tags=tags, strip=True),
+        'start_time': datetime.fromisoformat(data['start_time']),
+        'end_time': datetime.fromisoformat(data['end_time']),
+        'time_worked': int(data['time_worked'])
+    }
+    # create_entry parsed the raw values again
+    datetime.fromisoformat(data['start_time'])
+    datetime.fromisoformat(data['end_time'])
+    int(data['time_worked'])
+    return cleaned
+
+
+def cases():
+    tags = ['b', 'i', 'u', 'p', 'br', 'code']
+    email = ' Dev.Person+log@Example.com '
+    project = 'project 000_alpha'
+    url = 'https://github.com/example/project-000'
+    return [
+        ('sanitize_text plain', lambda: DataManager.sanitize_text(PLAIN),
+         lambda: bleach.clean(PLAIN, tags=tags, strip=True)),
+        ('sanitize_text html', lambda: DataManager.sanitize_text(HTML),
+         lambda: bleach.clean(HTML, tags=tags, strip=True)),
+        ('sanitize_input', lambda: DataManager.sanitize_input(PLAIN),
+         lambda: bleach.clean(PLAIN.strip(), tags=[], strip=True)),
+        ('sanitize_email', lambda: DataManager.sanitize_email(email),
+         lambda: re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', email.strip().lower())),
+        ('sanitize_project', lambda: DataManager.sanitize_project(project),
+         lambda: re.match(r'^[a-zA-Z0-9][a-zA-Z0-9\s_-]*$', project.strip())),
+        ('sanitize_repository_url', lambda: DataManager.sanitize_repository_url(url),
+         lambda: re.match(r'^https?:\/\/github\.com\/[\w\-\.\/]+', url.strip())),
+        ('validate_timestamp', lambda: DataManager.validate_timestamp('2025-01-01T09:00:00'), None),
+        ('validate_time_worked', lambda: DataManager.validate_time_worked('90'), None),
+        ('validate_entry_data', lambda: DataManager.validate_entry_data(entry(1)), lambda: old_entry(entry(1))),
+    ]
+
+
+def per_call(func, number):
+    # best of 3 repeats, in microseconds
+    return min(timeit.repeat(func, number=number, repeat=3)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=5000, help='calls per measurement')
+    parser.add_argument('--batch', type=int, default=1000, help='entries in the batch measurement')
+    parser.add_argument('--output', help='write the JSON results here')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    results = {}
+    print(f"{'validator':<26} {'us/call':>9} {'before':>9} {'speedup':>8}")
+    for name, func, baseline in cases():
+        now = per_call(func, args.number)
+        before = per_call(baseline, args.number) if baseline else None
+        results[name] = {'us_per_call': round(now, 3), 'before_us_per_call': round(before, 3) if before else None}
+        if before:
+            print(f"{name:<26} {now:>9.2f} {before:>9.2f} {before / now:>7.1f}x")
+        else:
+            print(f"{name:<26} {now:>9.2f} {'-':>9} {'-':>8}")
+
+    items = [entry(i) for i in range(args.batch)]
+    seconds = min(timeit.repeat(lambda: DataManager.validate_entry_batch(items), number=1, repeat=3))
+    before = min(timeit.repeat(lambda: [old_entry(item) for item in items], number=1, repeat=3))
+    results['validate_entry_batch'] = {
+        'entries': args.batch,
+        'entries_per_second': round(args.batch / seconds),
+        'before_entries_per_second': round(args.batch / before)
+    }
+    print(f"\nvalidate_entry_batch: {args.batch / seconds:,.0f} entries/s (before {args.batch / before:,.0f})")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -53,12 +53,27 @@ class Config:
     }
     
     # email Configuration
-    MAIL_SERVER = 'smtp.gmail.com'
-    MAIL_PORT = 587
-    MAIL_USE_TLS = True
+    MAIL_SERVER = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
+    MAIL_PORT = int(os.getenv('MAIL_PORT', 587))
+    MAIL_USE_TLS = os.getenv('MAIL_USE_TLS', 'true').lower() == 'true'
     MAIL_USERNAME = os.getenv('MAIL_USERNAME')
     MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
+
+    # email outbox - requests only enqueue, a background thread talks SMTP
+    MAIL_OUTBOX_WORKER = os.getenv('MAIL_OUTBOX_WORKER', 'true').lower() == 'true'
+    MAIL_OUTBOX_BATCH_SIZE = 20
+    MAIL_OUTBOX_INTERVAL = 5  # seconds between polls when idle
+    MAIL_OUTBOX_MAX_ATTEMPTS = 5
+    MAIL_OUTBOX_BACKOFF_BASE = 10  # seconds, doubled per failed attempt
+    MAIL_OUTBOX_BACKOFF_MAX = 3600
     
+    # password hashing (bcrypt runs on its own bounded pool)
+    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+    PASSWORD_HASH_WORKERS = 4
+    PASSWORD_HASH_QUEUE_DEPTH = 16
+    PASSWORD_HASH_TIMEOUT = 10  # seconds to wait for a slot before giving up
+    PASSWORD_HASH_RETRY_AFTER = 1
+
     # rate Limiting
     RATELIMIT_DEFAULT = "100/hour"
     RATELIMIT_STORAGE_URL = "memory://"
@@ -71,10 +86,45 @@ class Config:
     CACHE_TYPE = "simple"
     CACHE_DEFAULT_TIMEOUT = 300
 
+    # search result cache (in-process LRU, invalidated on every relevant write)
+    SEARCH_CACHE_ENABLED = os.getenv('SEARCH_CACHE_ENABLED', 'true').lower() == 'true'
+    SEARCH_CACHE_MAX_BYTES = 32 * 1024 * 1024
+    SEARCH_CACHE_MAX_MEMOS = 1024  # cached result counts
+
+    # reactions: 'sync' commits every click, 'buffered' batches them (a crash
+    # can lose up to one flush interval of reactions). Buffered toggles show up
+    # in every read: entry reads overlay them, reads that query counts in SQL
+    # flush them first (ReactionBuffer.settled)
+    REACTION_WRITE_MODE = os.getenv('REACTION_WRITE_MODE', 'sync').lower()
+    REACTION_FLUSH_INTERVAL_MS = int(os.getenv('REACTION_FLUSH_INTERVAL_MS', 200))
+    REACTION_FLUSH_MAX_OPS = 500  # flush early once this many toggles are pending
+
+    # live updates over /api/stream (each open stream holds a server thread)
+    STREAM_QUEUE_SIZE = 100  # events a slow client may fall behind before it gets "resync"
+    STREAM_MAX_CLIENTS = 200
+    STREAM_KEEPALIVE = 15  # seconds between keepalive comments
+
+    # background jobs (GitHub fetches, ...) - a table in the app database, run
+    # by worker threads here or by `flask run-jobs` with JOBS_WORKER=false
+    JOBS_WORKER = os.getenv('JOBS_WORKER', 'true').lower() == 'true'
+    JOBS_WORKERS = int(os.getenv('JOBS_WORKERS', 2))
+    JOBS_INTERVAL = 2  # seconds between polls when idle
+    JOBS_MAX_ATTEMPTS = 5
+    JOBS_BACKOFF_BASE = 10  # seconds, doubled per failed attempt
+    JOBS_BACKOFF_MAX = 3600
+    JOBS_CLAIM_TIMEOUT = 600  # seconds before a silent worker's job is run again
+    PROJECT_COMMITS_MAX_AGE = 600  # seconds before a project's commits are fetched again
+    ACCOUNT_DELETE_BATCH_SIZE = 500  # rows per transaction when deleting an account
+    EXPORT_DIR = os.getenv('EXPORT_DIR', os.path.join(tempfile.gettempdir(), 'devlog_exports'))
+    EXPORT_TTL = 24 * 3600  # seconds an export archive can be downloaded
+    EXPORT_BATCH_SIZE = 1000  # rows read per query while exporting
+
     # API config
     API_VERSION = 'v1'
     API_RATE_LIMIT = "100 per hour"
     API_KEY_LENGTH = 32
     API_KEY_PREFIX = "dvlg_"
+    BULK_ENTRY_MAX_ITEMS = 1000
+    BULK_ENTRY_MAX_BYTES = 2 * 1024 * 1024  # 2MB per bulk request
 
     GITHUB_ACCESS_TOKEN = os.getenv('GITHUB_ACCESS_TOKEN')
\ No newline at end of file
@@ -7,15 +7,24 @@ from models import db, User, Project, LogEntry, LanguageTag, ForumCategory, Reac
 from api.data_manager import DataManager
 from api.user_manager import UserManager, user_activity_bp
 from api import api
+from api.outbox import outbox_sender
+from api.search_cache import search_cache
+from api.suggest_index import suggest_index
+from api.forum_registry import forum_registry
+from api.reaction_buffer import reaction_buffer
+from api.event_hub import event_hub
+from api.change_log import change_tracker
+from api.job_queue import job_queue
+from api.tasks import project_commits
 import os
 from config import Config
 from flask_mail import Mail
-from flask_migrate import Migrate
-from api.gogitter import GoGitter 
+from password_hasher import password_hasher
 from datetime import datetime
 from flask_session import Session 
 from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.exceptions import HTTPException  
+from markupsafe import Markup
 import tempfile
 from datetime import timedelta
 from api.forums import forums_bp
@@ -38,71 +47,129 @@ Request Details:
   JSON: {request.get_json(silent=True)}
 """)
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.urandom(24)
-app.config.from_object(Config)
-app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
-app.config['SESSION_COOKIE_SECURE'] = False  # Set to True in production
-app.config['SESSION_TYPE'] = 'filesystem'
-
-# update session configuration
-app.config.update(
-    SESSION_FILE_DIR=os.path.join(tempfile.gettempdir(), 'flask_session'),
-    SESSION_FILE_THRESHOLD=500,  # Number of files before cleanup
-    SESSION_PERMANENT=True,  # Make sessions permanent
-    PERMANENT_SESSION_LIFETIME=timedelta(hours=24)  # Session lifetime
-)
-
-Session(app)  # Initialize Flask-Session
-
-# add this after app creation in main.py
-app.wsgi_app = ProxyFix(
-    app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_prefix=1
-)
-
 # initialize mail
 mail = Mail()
-mail.init_app(app)
 
 # initialize CSRF protection
 csrf = CSRFProtect()
-csrf.init_app(app)
 
 # initialize LoginManager
 login_manager = LoginManager()
-login_manager.init_app(app)
 login_manager.login_view = 'login'
 
-# database setup
-basedir = os.path.abspath(os.path.dirname(__file__))
-os.makedirs('.databaseFiles', exist_ok=True)
-db_path = os.path.join(basedir, '.databaseFiles', 'devlog.db')
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# page views, added to each app by create_app()
+pages = []
+
+
+def page(rule, **options):
+    """register a page view on the apps create_app() builds (endpoint is the function name)"""
+    def decorator(view):
+        pages.append((rule, view, options))
+        return view
+    return decorator
+
+
+def create_app(config_class=Config):
+    """
+    Build and configure the Flask app.
+
+    Modules only a few routes or commands need are imported where they're
+    used (PyGithub in the job tasks, bleach when text actually has markup,
+    Flask-Migrate for the flask CLI only), so a new worker process is ready
+    sooner.
+    """
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = os.urandom(24)
+    app.config.from_object(config_class)
+    app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+    app.config['SESSION_COOKIE_SECURE'] = False  # Set to True in production
+    app.config['SESSION_TYPE'] = 'filesystem'
+
+    # update session configuration
+    app.config.update(
+        SESSION_FILE_DIR=os.path.join(tempfile.gettempdir(), 'flask_session'),
+        SESSION_FILE_THRESHOLD=500,  # Number of files before cleanup
+        SESSION_PERMANENT=True,  # Make sessions permanent
+        PERMANENT_SESSION_LIFETIME=timedelta(hours=24)  # Session lifetime
+    )
+
+    Session(app)  # Initialize Flask-Session
+
+    app.wsgi_app = ProxyFix(
+        app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_prefix=1
+    )
+
+    mail.init_app(app)
+
+    # 2FA/notification emails go through the outbox, sent in the background
+    outbox_sender.init_app(app)
+
+    # bcrypt runs on a bounded pool so login bursts can't starve the workers
+    password_hasher.init_app(app)
+
+    csrf.init_app(app)
+    login_manager.init_app(app)
+
+    # database setup
+    basedir = os.path.abspath(os.path.dirname(__file__))
+    os.makedirs('.databaseFiles', exist_ok=True)
+    db_path = os.path.join(basedir, '.databaseFiles', 'devlog.db')
+    # DATABASE_URL (see config.py) wins so scripts can point the app at another db
+    app.config['SQLALCHEMY_DATABASE_URI'] = app.config.get('SQLALCHEMY_DATABASE_URI') or f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    # cSRF Configuration
+    app.config['WTF_CSRF_CHECK_DEFAULT'] = False
+    app.config['WTF_CSRF_HEADERS'] = ['X-CSRF-TOKEN']
+    app.config['WTF_CSRF_SSL_STRICT'] = True
+
+    db.init_app(app)
+
+    # search results are cached until the next entry/forum/reaction write
+    search_cache.init_app(app)
+
+    # autocomplete names live in memory and follow writes
+    suggest_index.init_app(app)
+
+    # forum urls resolve to category ids from memory
+    forum_registry.init_app(app)
 
-# cSRF Configuration
-app.config['WTF_CSRF_CHECK_DEFAULT'] = False
-app.config['WTF_CSRF_HEADERS'] = ['X-CSRF-TOKEN']
-app.config['WTF_CSRF_SSL_STRICT'] = True  
+    # reactions are written per click, or batched when REACTION_WRITE_MODE=buffered
+    reaction_buffer.init_app(app)
 
-db.init_app(app)
+    # comments, reactions and forum replies are pushed to /api/stream clients
+    event_hub.init_app(app)
 
-# register blueprints
-app.register_blueprint(api, url_prefix='/api')
-app.register_blueprint(user_activity_bp, url_prefix='/api/user')
-app.register_blueprint(forums_bp, url_prefix='/forums')
+    # entry/comment/forum writes are logged for delta sync (/api/sync)
+    change_tracker.init_app(app)
 
-# initialize migrations
-migrate = Migrate(app, db)
+    # slow work (GitHub calls) runs on background job workers
+    job_queue.init_app(app)
 
-print("Available routes:", [str(rule) for rule in app.url_map.iter_rules()])
+    # register blueprints
+    app.register_blueprint(api, url_prefix='/api')
+    app.register_blueprint(user_activity_bp, url_prefix='/api/user')
+    app.register_blueprint(forums_bp, url_prefix='/forums')
+    for rule, view, options in pages:
+        app.add_url_rule(rule, view.__name__, view, **options)
+
+    app.add_template_filter(format_date, 'format_date')
+    app.add_template_filter(format_datetime, 'datetime')
+    app.add_template_filter(sanitize_html, 'sanitize')
+
+    # more logging
+    app.before_request(log_request_info)
+    app.register_error_handler(Exception, handle_error)
+
+    # `flask db ...` is the only thing that needs alembic
+    if os.environ.get('FLASK_RUN_FROM_CLI'):
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+    logger.debug(f"Available routes: {[str(rule) for rule in app.url_map.iter_rules()]}")
+    return app
 
-# more logging
-@app.before_request
-def log_request():
-    log_request_info()
 
-@app.errorhandler(Exception)
 def handle_error(error):
     logger.error(f"Error occurred: {str(error)}", exc_info=True)
     
@@ -114,28 +181,28 @@ def handle_error(error):
 def check_auth():
     return 'user_id' in session
 
-@app.route('/')
+@page('/')
 @login_required  # Add login requirement
 def index():
     # Redirect to home page instead of showing entry form
     return redirect(url_for('home'))
 
-@app.route('/newentry')
+@page('/newentry')
 @login_required
 def new_entry_form():
     project_name = request.args.get('project_name')
     projects = current_user.projects.all()
     return render_template('newentry.html', projects=projects, project_name=project_name)
 
-@app.route('/signup')
+@page('/signup')
 def signup():
     return render_template('signup.html', hide_nav=True)
 
-@app.route('/login')
+@page('/login')
 def login():
     return render_template('login.html', hide_nav=True)
 
-@app.route('/search')
+@page('/search')
 def search():
     if not check_auth():
         return redirect(url_for('login'))
@@ -143,16 +210,20 @@ def search():
 
 @login_manager.user_loader
 def load_user(user_id):
-    return db.session.get(User, int(user_id))
+    user = db.session.get(User, int(user_id))
+    # accounts being deleted are signed out everywhere
+    if user is None or user.deletion_requested_at is not None:
+        return None
+    return user
 
 
-@app.route('/privacy')
+@page('/privacy')
 def privacy():
     if not check_auth():
         return redirect(url_for('login'))
     return render_template('privacy.html')
 
-@app.route('/home')
+@page('/home')
 def home():
     if not check_auth():
         return redirect(url_for('login'))
@@ -160,7 +231,7 @@ def home():
     projects = current_user.projects.all() if current_user.is_authenticated else []
     return render_template('home.html', projects=projects)
 
-@app.route('/entry/<int:entry_id>')
+@page('/entry/<int:entry_id>')
 @login_required
 def view_entry(entry_id):
     try:
@@ -169,31 +240,33 @@ def view_entry(entry_id):
         entry_data['user_reaction'] = entry.get_user_reaction(current_user.developer_tag)
         entry_data['likes_count'] = entry.reactions.filter_by(reaction_type=ReactionType.LIKE).count()
         entry_data['dislikes_count'] = entry.reactions.filter_by(reaction_type=ReactionType.DISLIKE).count()
+        reaction_buffer.overlay(entry_data, entry_id, current_user.developer_tag)
         
-        app.logger.debug(f"Entry data: {entry_data}")
+        current_app.logger.debug(f"Entry data: {entry_data}")
         return render_template('entry_veiw.html',
                             entry=entry_data,
                             show_message_box=True)
     except Exception as e:
-        app.logger.error(f"Error viewing entry: {str(e)}", exc_info=True)
+        current_app.logger.error(f"Error viewing entry: {str(e)}", exc_info=True)
         flash('Error loading entry', 'error')
         return redirect(url_for('index'))
 
-@app.route('/profile')
+@page('/profile')
 def profile():
     if not check_auth():
         return redirect(url_for('login'))
     return render_template('profile.html')
 
 
-@app.route('/projects')
+@page('/projects')
 @login_required
 def projects():
     projects = Project.query.all()
     return render_template('projects.html', projects=projects)
 
-@app.route('/projects/<string:project_name>')
+@page('/projects/<string:project_name>')
 @login_required
+@reaction_buffer.settled
 def view_project(project_name):
     try:
         project = Project.query.get_or_404(project_name)
@@ -204,27 +277,19 @@ def view_project(project_name):
         # Get forum categories for this project
         forums = ForumCategory.query.filter_by(project_name=project_name).all()
         
-        # Get commits from GitHub
-        gogitter = GoGitter()
-        commits_data = gogitter.get_commit_history(project.repository_url)
+        # Commits come from the last GitHub fetch; the first view of a project
+        # queues the fetch and the page reloads when it's done
+        commits_data, commits_job = project_commits(project_name, created_by=current_user.developer_tag)
         
         # Format commits for template with related entries
         commits = []
-        for commit in commits_data:
-            # Find entries related to this commit
-            related_entries = LogEntry.query.filter_by(
-                project_name=project_name, 
-                commit_sha=commit.sha
-            ).all()
-            
-            commits.append({
-                'sha': commit.sha,
-                'message': commit.commit.message,
-                'author': commit.commit.author.name,
-                'date': commit.commit.author.date,
-                'url': commit.html_url,
-                'related_entries': [{'id': entry.id, 'title': entry.title} for entry in related_entries]
-            })
+        if commits_data:
+            # Find entries related to these commits in one go
+            related = {}
+            for entry in entries:
+                if entry.commit_sha:
+                    related.setdefault(entry.commit_sha, []).append({'id': entry.id, 'title': entry.title})
+            commits = [dict(commit, related_entries=related.get(commit['sha'], [])) for commit in commits_data]
         
         entries_json = [entry.to_dict() for entry in entries]
         logger.info(f"Entries JSON: {entries_json}")
@@ -235,6 +300,7 @@ def view_project(project_name):
                              entries=entries,
                              entries_json=entries_json,
                              commits=commits,
+                             commits_job=commits_job if commits_data is None else None,
                              forums=forums)
                              
     except Exception as e:
@@ -242,7 +308,7 @@ def view_project(project_name):
         flash('Error loading project', 'error')
         return redirect(url_for('projects'))
 
-@app.route('/projects/new', methods=['GET', 'POST'])
+@page('/projects/new', methods=['GET', 'POST'])
 @login_required
 def new_project():
     logger.info("New project creation attempt")
@@ -282,18 +348,6 @@ def new_project():
             if current_user not in project.team_members:
                 project.team_members.append(current_user)
             
-            # Get languages from GitHub and create tags
-            gogitter = GoGitter()
-            languages = gogitter.get_repository_languages(repository_url)
-            
-            for lang in languages:
-                # Check if tag exists, create if not
-                tag = LanguageTag.query.filter_by(name=lang.lower()).first()
-                if not tag:
-                    tag = LanguageTag(name=lang.lower())
-                    db.session.add(tag)
-                project.tags.append(tag)
-            
             # Create forum categories for the project
             for category in ['general', 'help']:
                 forum = ForumCategory(
@@ -305,8 +359,14 @@ def new_project():
             db.session.add(project)
             db.session.commit()
             
+            # Language tags come from GitHub, in the background
+            job_queue.enqueue('project_languages', {'project_name': project.name},
+                              key=project.name, created_by=current_user.developer_tag)
+            job_queue.enqueue('project_commits', key=project.name,
+                              created_by=current_user.developer_tag, unique=True)
+            
             logger.info(f"Successfully created project: {name}")
-            flash(f'Project {name} created successfully', 'success')
+            flash(f'Project {name} created successfully, language tags are being added from GitHub', 'success')
             return redirect(url_for('view_project', project_name=project.name))
             
     except ValueError as e:
@@ -321,7 +381,7 @@ def new_project():
     users = User.query.all()
     return render_template('new_project.html', users=users)
 
-@app.route('/entry/new/<string:project_name>', methods=['GET', 'POST'])
+@page('/entry/new/<string:project_name>', methods=['GET', 'POST'])
 @login_required
 def new_entry(project_name):
     try:
@@ -354,19 +414,6 @@ def new_entry(project_name):
         
     return render_template('form.html', project_name=project_name)
 
-@app.route('/api/projects/<string:project_name>/commits', methods=['GET'])
-@login_required
-def get_project_commits(project_name):
-    try:
-        project = Project.query.filter_by(name=project_name).first_or_404()
-        github = GoGitter()
-        commits = github.get_commit_history(project.repository_url)
-        return jsonify(commits)
-    except Exception as e:
-        logger.error(f"Error fetching commits: {str(e)}")
-        return jsonify({'error': str(e)}), 500
-
-@app.template_filter('format_date')
 def format_date(value, format='%Y-%m-%d %H:%M'):
     if not value:
         return ''
@@ -379,16 +426,38 @@ def format_date(value, format='%Y-%m-%d %H:%M'):
         return value.strftime(format)
     return str(value)
 
-@app.template_filter('datetime')
 def format_datetime(value):
     if isinstance(value, str):
         value = datetime.fromisoformat(value.replace('Z', '+00:00'))
     return value.strftime('%Y-%m-%d %H:%M:%S')
 
+def sanitize_html(value):
+    """stored user html for the page, with only the basic formatting tags left"""
+    return Markup(DataManager.sanitize_text(value)) if value else ''
+
+
+app = create_app()
+
 #HAVE THIS AT THE END!!!!
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
+        # databases from before the change log get one row per existing record,
+        # before the column backfills below start logging changes of their own
+        change_tracker.seed()
+        
+        # add columns/indexes that create_all skips on existing tables
+        try:
+            from migrations.ensure_columns import ensure_columns
+            ensure_columns()
+        except Exception as e:
+            logger.error(f"Error adding columns: {e}")
+        
+        try:
+            from migrations.ensure_indexes import ensure_indexes
+            ensure_indexes()
+        except Exception as e:
+            logger.error(f"Error creating indexes: {e}")
         
         # ensure default forums are created
         try:
@@ -396,6 +465,10 @@ if __name__ == '__main__':
             create_default_forums()
         except Exception as e:
             logger.error(f"Error creating default forums: {e}")
+        
+        # load autocomplete names up front instead of on the first request
+        suggest_index.rebuild()
+        forum_registry.rebuild()
             
     app.run(debug=True) 
     #turn to True for logs
\ No newline at end of file
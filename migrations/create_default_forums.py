@@ -2,85 +2,61 @@
 """
 Migration script to create default language forums
 Run this after updating your database schema
+Safe to run on every startup: existing tags and forums are left alone
 """
 
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from models import db, LanguageTag, ForumCategory
+from models import db, LanguageTag, ForumCategory, _upsert
+from datetime import datetime
+
+# default supported languages
+DEFAULT_LANGUAGES = (
+    'python',
+    'javascript',
+    'html',
+    'css',
+    'c',
+    'c++',
+    'java',
+    'typescript',
+    'php',
+    'go',
+    'rust',
+    'ruby'
+)
+
+# every language gets one of each
+DEFAULT_CATEGORIES = ('general', 'help')
 
 def create_default_forums():
-    """create default language forums for supported languages"""
-    
-    # default supported languages
-    default_languages = [
-        'python',
-        'javascript', 
-        'html',
-        'css',
-        'c',
-        'c++',
-        'java',
-        'typescript',
-        'php',
-        'go',
-        'rust',
-        'ruby'
-    ]
-    
-    print("Creating default language forums...")
-    
-    for lang_name in default_languages:
-        # create or get language tag
-        tag = LanguageTag.query.filter_by(name=lang_name).first()
-        if not tag:
-            tag = LanguageTag(name=lang_name)
-            db.session.add(tag)
-            db.session.flush()  # flush to get the ID
-            print(f"Created language tag: {lang_name}")
-        else:
-            print(f"Language tag already exists: {lang_name}")
-        
-        # create general forum category
-        general_forum = ForumCategory.query.filter_by(
-            language_tag_id=tag.id,
-            name='general',
-            project_name=None
-        ).first()
-        
-        if not general_forum:
-            general_forum = ForumCategory(
-                name='general',
-                language_tag_id=tag.id,
-                project_name=None
-            )
-            db.session.add(general_forum)
-            print(f"Created general forum for {lang_name}")
-        else:
-            print(f"General forum already exists for {lang_name}")
-        
-        # create help forum category
-        help_forum = ForumCategory.query.filter_by(
-            language_tag_id=tag.id,
-            name='help',
-            project_name=None
-        ).first()
-        
-        if not help_forum:
-            help_forum = ForumCategory(
-                name='help',
-                language_tag_id=tag.id,
-                project_name=None
-            )
-            db.session.add(help_forum)
-            print(f"Created help forum for {lang_name}")
-        else:
-            print(f"Help forum already exists for {lang_name}")
-    
+    """create default language forums for supported languages, two statements whatever the count"""
     try:
+        # language names are unique, so the database skips the ones we have
+        tags = _upsert(LanguageTag.__table__)\
+            .values([{'name': name} for name in DEFAULT_LANGUAGES])\
+            .on_conflict_do_nothing(index_elements=['name'])
+        created_tags = db.session.execute(tags).rowcount
+
+        # forum categories have no unique key, so insert the (language, category)
+        # pairs that don't exist yet in one INSERT ... SELECT
+        categories = db.union_all(*[db.select(db.literal(name).label('name'))
+                                    for name in DEFAULT_CATEGORIES]).subquery('default_categories')
+        existing = db.select(ForumCategory.id).where(
+            ForumCategory.language_tag_id == LanguageTag.id,
+            ForumCategory.name == categories.c.name,
+            ForumCategory.project_name.is_(None)
+        )
+        missing = db.select(categories.c.name, LanguageTag.id, db.literal(datetime.utcnow()))\
+                    .select_from(categories).join(LanguageTag, db.true())\
+                    .where(LanguageTag.name.in_(DEFAULT_LANGUAGES), ~existing.exists())
+        forums = db.insert(ForumCategory).from_select(['name', 'language_tag_id', 'created_at'], missing)
+        created_forums = db.session.execute(forums).rowcount
+
         db.session.commit()
-        print("Default forums created successfully!")
+        print(f"Default forums: added {created_tags} language tags and {created_forums} forums")
         return True
     except Exception as e:
         print(f"Error creating forums: {e}")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Migration script to add columns declared in models.py to existing tables
+db.create_all() never alters a table that already exists, so new columns are
+added here with ALTER TABLE and, where they hold derived data, backfilled
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, LogEntry, ForumCategory, ForumTopic
+from sqlalchemy import inspect, text
+
+def _backfill(added):
+    """fill in derived columns that were just created"""
+    if {'likes_count', 'dislikes_count', 'comments_count'} & set(added.get(LogEntry.__tablename__, ())):
+        print("Backfilling entry reaction/comment counters...")
+        LogEntry.refresh_counts()
+    if 'reply_count' in added.get(ForumTopic.__tablename__, ()):
+        print("Backfilling forum topic reply stats...")
+        ForumTopic.refresh_reply_stats()
+    # after the topics, category stats are summed from their reply counts
+    if 'topic_count' in added.get(ForumCategory.__tablename__, ()):
+        print("Backfilling forum category stats...")
+        ForumCategory.refresh_stats()
+
+def ensure_columns():
+    """add any model column the database is missing; returns {table: [columns]}"""
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    added = {}
+
+    for table in db.metadata.sorted_tables:
+        # brand new tables are created whole by db.create_all()
+        if table.name not in existing_tables:
+            continue
+        present = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in present:
+                continue
+            ddl = f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column.type.compile(dialect=db.engine.dialect)}'
+            if column.server_default is not None:
+                ddl += f" DEFAULT {column.server_default.arg}"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+            db.session.execute(text(ddl))
+            added.setdefault(table.name, []).append(column.name)
+
+    db.session.commit()
+    if added:
+        # backfills use the foreign key indexes, make sure they exist first
+        from migrations.ensure_indexes import ensure_indexes
+        ensure_indexes()
+        _backfill(added)
+        db.session.commit()
+    print(f"Added {sum(len(cols) for cols in added.values())} columns")
+    return added
+
+if __name__ == '__main__':
+    # when run directly, create app context
+    from main import app
+    with app.app_context():
+        ensure_columns()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Migration script to add indexes declared in models.py to an existing database
+db.create_all() only creates indexes for brand new tables, so run this (or just
+start main.py) after pulling changes that add index=True / db.Index
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db
+from sqlalchemy import inspect
+
+def ensure_indexes():
+    """create any index from the models that the database is missing"""
+    created = []
+    existing = set(inspect(db.engine).get_table_names())
+    for table in db.metadata.sorted_tables:
+        # brand new tables get their indexes from db.create_all()
+        if table.name not in existing:
+            continue
+        for index in table.indexes:
+            # checkfirst makes this safe to run on every startup
+            index.create(db.engine, checkfirst=True)
+            created.append(index.name)
+    print(f"Checked {len(created)} indexes")
+    return created
+
+if __name__ == '__main__':
+    # when run directly, create app context
+    from main import app
+    with app.app_context():
+        ensure_indexes()
@@ -1,12 +1,22 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from flask_login import UserMixin
-import bcrypt
+from password_hasher import password_hasher
 import secrets
 import hashlib
+import json
 
 db = SQLAlchemy()
 
+
+def _upsert(table):
+    """INSERT with on_conflict_do_update() for the database in use (sqlite or postgres)"""
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
 # Reaction type constants for optimization
 class ReactionType:
     NONE = 0
@@ -36,7 +46,7 @@ class ReactionType:
 # Updated association table to use project name instead of id
 project_members = db.Table('project_members',
     db.Column('project_name', db.String(100), db.ForeignKey('project.name')),
-    db.Column('user_id', db.String(50), db.ForeignKey('user.developer_tag'))
+    db.Column('user_id', db.String(50), db.ForeignKey('user.developer_tag'), index=True)
 )
 
 class User(UserMixin, db.Model):
@@ -48,6 +58,7 @@ class User(UserMixin, db.Model):
     two_fa_verified = db.Column(db.Boolean, default=False)
     api_key_hash = db.Column(db.String(64), unique=True)  # SHA-256 hash of API key
     api_enabled = db.Column(db.Boolean, default=False)
+    deletion_requested_at = db.Column(db.DateTime)  # locked out while the delete_account job runs
     
     # Store original email temporarily for login (will be removed in production)
     _temp_email = db.Column(db.String(120))  # Temporary field for migration
@@ -67,11 +78,14 @@ class User(UserMixin, db.Model):
         return self._temp_email
 
     def set_password(self, password):
-        salt = bcrypt.gensalt()
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), salt)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash)
+        return password_hasher.check(password, self.password_hash)
+
+    def password_needs_rehash(self):
+        """True when the stored hash uses a different bcrypt cost than configured"""
+        return password_hasher.needs_rehash(self.password_hash)
 
     def generate_api_key(self):
         """Generate API key and store its hash"""
@@ -116,12 +130,17 @@ class LogEntry(db.Model):
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
     project_name = db.Column(db.String(100), db.ForeignKey('project.name'), nullable=False)
-    developer_tag = db.Column(db.String(50), db.ForeignKey('user.developer_tag'), nullable=False)
+    developer_tag = db.Column(db.String(50), db.ForeignKey('user.developer_tag'), nullable=False, index=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     start_time = db.Column(db.DateTime, nullable=False)
     end_time = db.Column(db.DateTime, nullable=False)
     time_worked = db.Column(db.Integer, nullable=False)  
     commit_sha = db.Column(db.String(40))  
+    # denormalized counters so searches can sort without grouping every reaction/comment;
+    # kept current by refresh_counts() on every reaction/comment write
+    likes_count = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)
+    dislikes_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    comments_count = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)
     
     # Add relationships for reactions and comments
     reactions = db.relationship('EntryReaction', backref='entry', lazy='dynamic',
@@ -146,6 +165,88 @@ class LogEntry(db.Model):
             'comments_count': self.comments.count()
         }
 
+    @staticmethod
+    def refresh_counts(*entry_ids):
+        """recount likes/dislikes/comments in one UPDATE (every entry if no ids given)"""
+        comments = db.select(db.func.count(Comment.id)).where(Comment.entry_id == LogEntry.id).scalar_subquery()
+
+        statement = db.update(LogEntry).values(
+            likes_count=LogEntry._reaction_count(ReactionType.LIKE),
+            dislikes_count=LogEntry._reaction_count(ReactionType.DISLIKE),
+            comments_count=comments
+        ).execution_options(synchronize_session=False)
+        if entry_ids:
+            # the change log notes these without selecting them again
+            statement = statement.where(LogEntry.id.in_(entry_ids)).execution_options(changed_ids=entry_ids)
+        db.session.execute(statement)
+        LogEntry._expire_counts(entry_ids)
+
+    @staticmethod
+    def _reaction_count(kind):
+        return db.select(db.func.count(EntryReaction.id))\
+                 .where(EntryReaction.entry_id == LogEntry.id, EntryReaction.reaction_type == kind)\
+                 .scalar_subquery()
+
+    @staticmethod
+    def _expire_counts(entry_ids):
+        # loaded entries would otherwise keep their old counts
+        for key, obj in list(db.session.identity_map.items()):
+            if isinstance(obj, LogEntry) and (not entry_ids or key[1][0] in entry_ids):
+                db.session.expire(obj, ['likes_count', 'dislikes_count', 'comments_count'])
+
+    @staticmethod
+    def react(entry_id, user_id, reaction_type):
+        """
+        toggle a user's like/dislike on an entry in two statements: an upsert
+        that flips the reaction (same type again sets it back to NONE), then a
+        recount that returns the new totals. Safe against concurrent clicks
+        since the unique constraint resolves the race instead of raising.
+        Returns a dict of likes_count, dislikes_count and user_reaction, or
+        None if the entry doesn't exist.
+        """
+        reaction_int = ReactionType.from_string(reaction_type)
+        reactions = EntryReaction.__table__
+
+        # INSERT ... SELECT so the entry's project comes along and a missing entry inserts nothing
+        source = db.select(
+            db.literal(user_id, db.String), LogEntry.id, db.literal(reaction_int, db.Integer),
+            LogEntry.project_name, db.literal(datetime.utcnow(), db.DateTime)
+        ).where(LogEntry.id == entry_id)
+        statement = _upsert(reactions).from_select(
+            ['user_id', 'entry_id', 'reaction_type', 'project_name', 'timestamp'], source
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=['user_id', 'entry_id'],
+            set_={
+                'reaction_type': db.case(
+                    (reactions.c.reaction_type == statement.excluded.reaction_type, ReactionType.NONE),
+                    else_=statement.excluded.reaction_type
+                ),
+                'timestamp': statement.excluded.timestamp
+            }
+        ).returning(reactions.c.reaction_type)
+        mine = db.session.execute(statement).scalar()
+        if mine is None:
+            return None
+
+        counts = db.session.execute(
+            db.update(LogEntry).where(LogEntry.id == entry_id).values(
+                likes_count=LogEntry._reaction_count(ReactionType.LIKE),
+                dislikes_count=LogEntry._reaction_count(ReactionType.DISLIKE)
+            ).returning(LogEntry.likes_count, LogEntry.dislikes_count)
+            .execution_options(synchronize_session=False, changed_ids=(entry_id,))
+        ).one()
+        LogEntry._expire_counts((entry_id,))
+        for obj in list(db.session.identity_map.values()):
+            if isinstance(obj, EntryReaction) and obj.entry_id == entry_id and obj.user_id == user_id:
+                db.session.expire(obj)
+
+        return {
+            'likes_count': counts.likes_count,
+            'dislikes_count': counts.dislikes_count,
+            'user_reaction': ReactionType.to_string(mine)
+        }
+
     def get_user_reaction(self, user_id):
         """get the reaction of a specific user for this entry"""
         reaction = self.reactions.filter_by(user_id=user_id).first()
@@ -153,42 +254,13 @@ class LogEntry(db.Model):
 
     def toggle_reaction(self, user_id, reaction_type):
         """toggle a user's reaction (like/dislike) for this entry"""
-        # Convert string reaction to integer
-        reaction_int = ReactionType.from_string(reaction_type)
-        
-        existing_reaction = self.reactions.filter_by(user_id=user_id).first()
-        
-        if existing_reaction:
-            # If same type, just remove it
-            if existing_reaction.reaction_type == reaction_int:
-                db.session.delete(existing_reaction)
-                db.session.flush()  # Flush to ensure the unique constraint is cleared
-            # If different type, remove old one and add new one
-            else:
-                db.session.delete(existing_reaction)
-                db.session.flush()  # Flush to ensure the unique constraint is cleared
-                new_reaction = EntryReaction(
-                    entry_id=self.id,
-                    user_id=user_id,
-                    reaction_type=reaction_int,
-                    project_name=self.project_name
-                )
-                db.session.add(new_reaction)
-        else:
-            # No existing reaction, just add the new one
-            new_reaction = EntryReaction(
-                entry_id=self.id,
-                user_id=user_id,
-                reaction_type=reaction_int,
-                project_name=self.project_name
-            )
-            db.session.add(new_reaction)
+        return LogEntry.react(self.id, user_id, reaction_type)
 
 class EntryReaction(db.Model):
     __tablename__ = 'entry_reaction'
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.String(50), db.ForeignKey('user.developer_tag'), nullable=False)
-    entry_id = db.Column(db.Integer, db.ForeignKey('log_entry.id', ondelete='CASCADE'), nullable=False)
+    entry_id = db.Column(db.Integer, db.ForeignKey('log_entry.id', ondelete='CASCADE'), nullable=False, index=True)
     reaction_type = db.Column(db.Integer, nullable=False, default=ReactionType.NONE)  # 0=none, 1=like, 2=dislike
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     project_name = db.Column(db.String(100), db.ForeignKey('project.name'), nullable=False)
@@ -209,7 +281,7 @@ class EntryReaction(db.Model):
 class Comment(db.Model):
     __tablename__ = 'comment'
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    entry_id = db.Column(db.Integer, db.ForeignKey('log_entry.id'), nullable=False)
+    entry_id = db.Column(db.Integer, db.ForeignKey('log_entry.id'), nullable=False, index=True)
     user_id = db.Column(db.String(50), db.ForeignKey('user.developer_tag'), nullable=False)
     content = db.Column(db.Text, nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
@@ -220,6 +292,11 @@ class Comment(db.Model):
                             cascade='all, delete-orphan')
     author = db.relationship('User', backref='comments')
 
+    # a user's comments newest first, for the profile page
+    __table_args__ = (
+        db.Index('ix_comment_user_timestamp', 'user_id', 'timestamp'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -274,8 +351,37 @@ class ForumCategory(db.Model):
     language_tag_id = db.Column(db.Integer, db.ForeignKey('language_tags.id'), nullable=True)
     project_name = db.Column(db.String(100), db.ForeignKey('project.name'), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # maintained by record_topic()/ForumTopic.record_reply()/refresh_stats() for the forum index
+    topic_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    reply_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_activity_at = db.Column(db.DateTime)
     topics = db.relationship('ForumTopic', backref='category', lazy='dynamic', cascade='all, delete-orphan')
     
+    def record_topic(self, topic):
+        """update the denormalized stats for a topic being added to this category"""
+        posted = topic.created_at or datetime.utcnow()
+        topic.created_at = topic.last_activity_at = posted
+        self.topic_count = ForumCategory.topic_count + 1
+        self.last_activity_at = posted
+
+    @staticmethod
+    def refresh_stats(*category_ids):
+        """recompute category stats from forum_topics in one UPDATE (every category if no ids given)"""
+        topics = db.select(ForumTopic).where(ForumTopic.category_id == ForumCategory.id)
+        statement = db.update(ForumCategory).values(
+            topic_count=topics.with_only_columns(db.func.count(ForumTopic.id)).scalar_subquery(),
+            reply_count=topics.with_only_columns(
+                db.func.coalesce(db.func.sum(ForumTopic.reply_count), 0)).scalar_subquery(),
+            last_activity_at=topics.with_only_columns(db.func.max(ForumTopic.last_activity_at)).scalar_subquery()
+        ).execution_options(synchronize_session=False)
+        if category_ids:
+            statement = statement.where(ForumCategory.id.in_(category_ids))
+        db.session.execute(statement)
+
+        for key, obj in list(db.session.identity_map.items()):
+            if isinstance(obj, ForumCategory) and (not category_ids or key[1][0] in category_ids):
+                db.session.expire(obj, ['topic_count', 'reply_count', 'last_activity_at'])
+
     def is_project_forum(self):
         """check if this is a project-specific forum"""
         return self.project_name is not None
@@ -289,23 +395,171 @@ class ForumTopic(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     category_id = db.Column(db.Integer, db.ForeignKey('forum_categories.id'))
-    author_id = db.Column(db.String(50), db.ForeignKey('user.developer_tag'))
+    author_id = db.Column(db.String(50), db.ForeignKey('user.developer_tag'), index=True)
     project_name = db.Column(db.String(100), db.ForeignKey('project.name'), nullable=True)
+    # maintained by record_reply()/refresh_reply_stats() so topic lists never touch forum_replies
+    reply_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_reply_at = db.Column(db.DateTime)
+    last_reply_author = db.Column(db.String(50))
+    last_activity_at = db.Column(db.DateTime, default=datetime.utcnow)  # created_at, then bumped by replies
     
     replies = db.relationship('ForumReply', backref='topic', lazy='dynamic', cascade='all, delete-orphan')
     author = db.relationship('User', backref='topics')
 
+    # topic lists are "bumped" by latest activity within a category;
+    # profile pages page through a user's topics newest first
+    __table_args__ = (
+        db.Index('ix_forum_topics_category_activity', 'category_id', 'last_activity_at'),
+        db.Index('ix_forum_topics_author_created', 'author_id', 'created_at'),
+    )
+
+    def record_reply(self, reply):
+        """update the denormalized reply stats for a reply being added to this topic"""
+        posted = reply.created_at or datetime.utcnow()
+        reply.created_at = posted
+        # SQL-side increment so concurrent replies don't lose a count
+        self.reply_count = ForumTopic.reply_count + 1
+        self.last_reply_at = posted
+        self.last_reply_author = reply.author_id
+        self.last_activity_at = posted
+        if self.category is not None:
+            self.category.reply_count = ForumCategory.reply_count + 1
+            self.category.last_activity_at = posted
+
+    @staticmethod
+    def refresh_reply_stats(*topic_ids):
+        """recompute reply stats from forum_replies in one UPDATE (every topic if no ids given)"""
+        replies = db.select(ForumReply).where(ForumReply.topic_id == ForumTopic.id)
+        latest = replies.with_only_columns(ForumReply.created_at)\
+                        .order_by(ForumReply.created_at.desc(), ForumReply.id.desc()).limit(1)
+        latest_author = replies.with_only_columns(ForumReply.author_id)\
+                               .order_by(ForumReply.created_at.desc(), ForumReply.id.desc()).limit(1)
+
+        statement = db.update(ForumTopic).values(
+            reply_count=replies.with_only_columns(db.func.count(ForumReply.id)).scalar_subquery(),
+            last_reply_at=latest.scalar_subquery(),
+            last_reply_author=latest_author.scalar_subquery(),
+            last_activity_at=db.func.coalesce(latest.scalar_subquery(), ForumTopic.created_at)
+        ).execution_options(synchronize_session=False)
+        if topic_ids:
+            statement = statement.where(ForumTopic.id.in_(topic_ids)).execution_options(changed_ids=topic_ids)
+        db.session.execute(statement)
+
+        for key, obj in list(db.session.identity_map.items()):
+            if isinstance(obj, ForumTopic) and (not topic_ids or key[1][0] in topic_ids):
+                db.session.expire(obj, ['reply_count', 'last_reply_at', 'last_reply_author', 'last_activity_at'])
+
 class ForumReply(db.Model):
     __tablename__ = 'forum_replies'
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    topic_id = db.Column(db.Integer, db.ForeignKey('forum_topics.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    topic_id = db.Column(db.Integer, db.ForeignKey('forum_topics.id'), index=True)
     author_id = db.Column(db.String(50), db.ForeignKey('user.developer_tag'))
     project_name = db.Column(db.String(100), db.ForeignKey('project.name'), nullable=True)
     
     author = db.relationship('User', backref='replies')
 
+    # a user's replies newest first, for the profile page
+    __table_args__ = (
+        db.Index('ix_forum_replies_author_created', 'author_id', 'created_at'),
+    )
+
+
+class EmailOutbox(db.Model):
+    """emails waiting to be sent by the background outbox sender"""
+    __tablename__ = 'email_outbox'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    recipient = db.Column(db.String(120), nullable=False)
+    sender = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=False)  # cleared once sent so codes don't linger
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    locked_until = db.Column(db.DateTime)  # a crashed sender's claim expires after this
+    claim_token = db.Column(db.String(32), index=True)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+
+class Job(db.Model):
+    """background work queued by requests and run by the api.job_queue workers"""
+    __tablename__ = 'jobs'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    kind = db.Column(db.String(50), nullable=False)
+    key = db.Column(db.String(200))  # what the job is about (e.g. a project name), for de-duplication and lookups
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON arguments
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, default=datetime.utcnow)  # not picked up before this (retry backoff)
+    locked_until = db.Column(db.DateTime)  # a crashed worker's claim expires after this
+    claim_token = db.Column(db.String(32), index=True)
+    progress = db.Column(db.Integer)  # percent, for jobs that report it
+    result = db.Column(db.Text)  # JSON returned by the task
+    last_error = db.Column(db.Text)
+    created_by = db.Column(db.String(50), index=True)  # no foreign key: jobs outlive deleted accounts
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+        db.Index('ix_jobs_kind_key', 'kind', 'key', 'finished_at'),
+    )
+
+    @property
+    def params(self):
+        return json.loads(self.payload or '{}')
+
+    @property
+    def result_data(self):
+        return json.loads(self.result) if self.result else None
+
+    @property
+    def finished(self):
+        return self.status in ('succeeded', 'failed')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'progress': self.progress,
+            'result': self.result_data,
+            'error': self.last_error if self.status == 'failed' else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class ChangeLog(db.Model):
+    """
+    one row per changed entry/comment/topic/reply, newest change only, for
+    delta sync; seq only ever goes up so clients can resume from the last one
+    they saw
+    """
+    __tablename__ = 'change_log'
+    seq = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(50), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(10), nullable=False)  # upsert or delete
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_change_log_row', 'table_name', 'row_id'),
+        # never reuse the seq of a superseded row
+        {'sqlite_autoincrement': True},
+    )
@@ -0,0 +1,104 @@
+import bcrypt
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusy(Exception):
+    """raised when the bcrypt pool is saturated; callers should answer 503"""
+
+    def __init__(self, retry_after=1):
+        super().__init__("Password hashing pool is saturated")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a small dedicated thread pool instead of the request thread.
+
+    bcrypt releases the GIL, so a few threads give real parallelism, while the
+    bounded queue means a login burst gets fast 503s instead of every web
+    worker sitting in a 250ms hash.
+    """
+
+    def __init__(self, app=None):
+        self.rounds = 12
+        self.timeout = 10
+        self.retry_after = 1
+        self.executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        workers = app.config.get('PASSWORD_HASH_WORKERS', 4)
+        queue_depth = app.config.get('PASSWORD_HASH_QUEUE_DEPTH', 16)
+        self.rounds = app.config.get('BCRYPT_LOG_ROUNDS', 12)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', 10)
+        self.retry_after = app.config.get('PASSWORD_HASH_RETRY_AFTER', 1)
+
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(workers + queue_depth)
+        app.extensions['password_hasher'] = self
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def _run(self, fn, *args):
+        # no app configured (scripts, migrations) - just hash inline
+        if self.executor is None:
+            return fn(*args)
+
+        if not self._slots.acquire(blocking=False):
+            logger.warning("Password hashing pool saturated, rejecting request")
+            raise PasswordHasherBusy(self.retry_after)
+        with self._lock:
+            self._pending += 1
+        try:
+            future = self.executor.submit(fn, *args)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            logger.warning("Password hashing timed out waiting for the pool")
+            raise PasswordHasherBusy(self.retry_after)
+
+    def hash(self, password):
+        """hash a str/bytes password at the configured cost"""
+        if isinstance(password, str):
+            password = password.encode('utf-8')
+        return self._run(lambda: bcrypt.hashpw(password, bcrypt.gensalt(self.rounds)))
+
+    def check(self, password, hashed):
+        if not hashed:
+            return False
+        if isinstance(password, str):
+            password = password.encode('utf-8')
+        return self._run(bcrypt.checkpw, password, hashed)
+
+    def needs_rehash(self, hashed):
+        """true when hashed was made with a different cost than configured"""
+        try:
+            return int(hashed.split(b'$')[2]) != self.rounds
+        except (AttributeError, IndexError, ValueError):
+            return True
+
+    @property
+    def pending(self):
+        """hashes running or queued right now"""
+        return self._pending
+
+
+password_hasher = PasswordHasher()
@@ -19,6 +19,8 @@ class AdvancedSearchManager {
         };
         this.currentPage = 1;
         this.resultsPerPage = 20;
+        this.forumResults = [];
+        this.forumCursor = null;
         
         this.init();
     }
@@ -40,7 +42,7 @@ class AdvancedSearchManager {
 
     async loadMetadata() {
         try {
-            const response = await fetch('/api/search/metadata');
+            const response = await (window.fetchWithETag || fetch)('/api/search/metadata');
             if (!response.ok) throw new Error('Failed to fetch metadata');
             
             this.metadata = await response.json();
@@ -421,7 +423,7 @@ class AdvancedSearchManager {
         return parts.join('<br>') + '<span class="sql-semicolon">;</span>';
     }
 
-    async performSearch() {
+    async performSearch(append = false) {
         this.collectFilterValues();
         console.log('DEBUG: Collected search filters:', this.searchFilters);
         
@@ -449,8 +451,15 @@ class AdvancedSearchManager {
                 params.append('per_page', this.resultsPerPage);
             } else if (this.currentMode === 'projects') {
                 endpoint = '/api/search/projects/advanced';
+                params.append('page', this.currentPage);
+                params.append('per_page', this.resultsPerPage);
+                // only the fields displayProjectResults renders
+                params.append('fields', 'name,description,created_by,created_at,languages,entry_count,team_size');
             } else if (this.currentMode === 'forums') {
                 endpoint = '/api/search/forums/advanced';
+                params.append('limit', this.resultsPerPage);
+                // forum results are keyset paginated: "load more" continues from the last cursor
+                if (append && this.forumCursor) params.append('cursor', this.forumCursor);
             }
             
             console.log(`DEBUG: Final URL: ${endpoint}?${params}`);
@@ -458,7 +467,7 @@ class AdvancedSearchManager {
             if (!response.ok) throw new Error('Search failed');
             
             const data = await response.json();
-            this.displayResults(data);
+            this.displayResults(data, append);
             
         } catch (error) {
             console.error('Search error:', error);
@@ -468,7 +477,7 @@ class AdvancedSearchManager {
         }
     }
 
-    displayResults(data) {
+    displayResults(data, append = false) {
         const resultsContainer = document.getElementById('searchResults');
         const resultsCount = document.getElementById('resultsCount');
         const resultsTitle = document.getElementById('resultsTitle');
@@ -482,13 +491,18 @@ class AdvancedSearchManager {
             this.displayEntryResults(data.entries, resultsContainer);
             if (data.pagination) this.displayPagination(data.pagination);
         } else if (this.currentMode === 'projects') {
+            const total = data.pagination ? data.pagination.total : data.projects.length;
             resultsTitle.innerHTML = '<i class="bi bi-folder"></i> Search Results - Projects';
-            resultsCount.textContent = data.projects.length;
+            resultsCount.textContent = total;
             this.displayProjectResults(data.projects, resultsContainer);
+            if (data.pagination) this.displayPagination(data.pagination);
         } else if (this.currentMode === 'forums') {
+            this.forumResults = append ? this.forumResults.concat(data.results) : data.results;
+            this.forumCursor = data.next_cursor;
             resultsTitle.innerHTML = '<i class="bi bi-chat-dots"></i> Search Results - Forums';
-            resultsCount.textContent = data.results.length;
-            this.displayForumResults(data.results, resultsContainer);
+            resultsCount.textContent = `${this.forumResults.length}${data.has_more ? '+' : ''}`;
+            this.displayForumResults(this.forumResults, resultsContainer);
+            this.displayLoadMore(data.has_more);
         }
     }
 
@@ -672,6 +686,27 @@ class AdvancedSearchManager {
         }
     }
 
+    displayLoadMore(hasMore) {
+        const paginationContainer = document.getElementById('searchPagination');
+        if (!paginationContainer) return;
+        
+        const paginationList = paginationContainer.querySelector('.pagination');
+        if (!hasMore || !paginationList) {
+            paginationContainer.style.display = 'none';
+            return;
+        }
+        
+        paginationList.innerHTML = `<li class="page-item">
+            <a class="page-link" href="#" id="loadMoreResults">Load more</a>
+        </li>`;
+        paginationContainer.style.display = 'block';
+        
+        document.getElementById('loadMoreResults').addEventListener('click', (e) => {
+            e.preventDefault();
+            this.performSearch(true);
+        });
+    }
+
     toggleFilterPanel(targetId) {
         const panel = document.getElementById(targetId);
         const button = document.querySelector(`[data-target="${targetId}"]`);
@@ -728,6 +763,8 @@ class AdvancedSearchManager {
         if (paginationContainer) paginationContainer.style.display = 'none';
         
         this.currentPage = 1;
+        this.forumResults = [];
+        this.forumCursor = null;
     }
 
     toggleSQLPreview() {
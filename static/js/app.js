@@ -1,4 +1,4 @@
-import { LogEntry } from './logEntry.js';
+import { LogEntry, pollJob } from './logEntry.js';
 import { ReactionManager } from './entryViewer.js';
 
 // Loading Animation Class
@@ -536,6 +536,29 @@ class HomeManager {
     constructor() {
         this.bindTabEvents();
         this.loadDashboardData();
+        this.connectInbox();
+    }
+
+    connectInbox() {
+        // comments on our entries and replies to our topics arrive live
+        if (!window.EventSource) return;
+        this.inbox = new EventSource('/api/stream?inbox=1');
+        const refresh = () => {
+            // a burst of events becomes one dashboard fetch
+            clearTimeout(this.inboxRefresh);
+            this.inboxRefresh = setTimeout(() => this.refreshDashboard(), 1000);
+        };
+        this.inbox.addEventListener('inbox', refresh);
+        this.inbox.addEventListener('resync', refresh);
+        window.addEventListener('pagehide', () => this.inbox.close());
+    }
+
+    async refreshDashboard() {
+        await this.loadDashboardData();
+        const activeTab = document.querySelector('.dashboard-tab-btn.active')?.getAttribute('data-tab');
+        if (activeTab && activeTab !== 'recent-entries') {
+            this.loadTabContent(activeTab);
+        }
     }
 
     bindTabEvents() {
@@ -569,7 +592,7 @@ class HomeManager {
 
     async loadDashboardData() {
         try {
-            const response = await fetch('/api/feed/dashboard');
+            const response = await fetchWithETag('/api/feed/dashboard');
             const data = await response.json();
             
             if (!response.ok) throw new Error(data.error || 'Failed to load dashboard data');
@@ -768,7 +791,7 @@ class EntryViewer {
 
     async loadEntry(entryId) {
         try {
-            const response = await fetch(`/api/entries/${entryId}`);
+            const response = await fetchWithETag(`/api/entries/${entryId}`);
             if (!response.ok) throw new Error('Failed to load entry');
             
             const entry = await response.json();
@@ -815,34 +838,38 @@ class PrivacyManager {
     }
 
     async handleDownload() {
+        const downloadBtn = document.getElementById('downloadData');
+        const label = downloadBtn.textContent;
         try {
-            LoadingAnimation.showLoading();
-            const response = await fetch('/api/user/data');
-            
-            if (!response.ok) {
+            downloadBtn.disabled = true;
+            // the archive is built in the background, then downloaded from a signed link
+            const response = await fetch('/api/user/data?mode=archive');
+            if (response.status !== 202) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
+            const job = await response.json();
+            const finished = await pollJob(job.status_url, {
+                onProgress: (update) => {
+                    downloadBtn.textContent = `preparing... ${update.progress || 0}%`;
+                }
+            });
+            if (finished.status !== 'succeeded' || !finished.result?.download_url) {
+                throw new Error(finished.error || 'Export did not finish');
+            }
             
-            const userData = await response.json();
-            
-            // Create and download the JSON file
-            const dataStr = JSON.stringify(userData, null, 2);
-            const blob = new Blob([dataStr], { type: 'application/json' });
-            const url = window.URL.createObjectURL(blob);
             const a = document.createElement('a');
-            a.href = url;
-            a.download = `devlog_data_${new Date().toISOString().split('T')[0]}.json`;
+            a.href = finished.result.download_url;
             document.body.appendChild(a);
             a.click();
             document.body.removeChild(a);
-            window.URL.revokeObjectURL(url);
             
             showNotification('Data downloaded successfully', 'success');
         } catch (error) {
             console.error('Download error:', error);
             showNotification('Failed to download data', 'danger');
         } finally {
-            LoadingAnimation.hideLoading();
+            downloadBtn.disabled = false;
+            downloadBtn.textContent = label;
         }
     }
 
@@ -870,7 +897,19 @@ class PrivacyManager {
                 }
             });
             
-            if (response.ok) {
+            if (response.status === 202) {
+                // deletion runs in the background, follow it until it's done
+                const job = await response.json();
+                const deleteBtn = document.getElementById('deleteAccount');
+                deleteBtn.disabled = true;
+                const finished = await pollJob(job.status_url, {
+                    onProgress: (update) => {
+                        deleteBtn.textContent = `deleting... ${update.progress || 0}%`;
+                    }
+                });
+                if (finished.status !== 'succeeded') {
+                    throw new Error(finished.error || 'Deletion did not finish');
+                }
                 showNotification('Account deleted successfully. Redirecting...', 'success');
                 setTimeout(() => {
                     window.location.href = '/login';
@@ -1009,62 +1048,70 @@ class ProfileManager {
         if (!container) return;
 
         try {
-            const response = await fetch('/api/entries');
-            if (!response.ok) throw new Error('Failed to fetch entries');
+            const response = await fetch('/api/user/project-activity');
+            if (!response.ok) throw new Error('Failed to fetch project activity');
             
-            const entries = await response.json();
-            this.displayProjectsActivity(entries, container);
+            const projects = await response.json();
+            this.displayProjectsActivity(projects, container);
         } catch (error) {
             container.innerHTML = '<div class="alert alert-danger">Failed to load project activity</div>';
             throw error;
         }
     }
 
-    async loadForumPostsActivity() {
+    async loadForumPostsActivity(cursor = null) {
         const container = document.getElementById('forumPostsContainer');
         if (!container) return;
 
         try {
-            const response = await fetch('/api/user/forum-posts');
-            if (!response.ok) throw new Error('Failed to fetch forum posts');
-            
-            const posts = await response.json();
-            this.displayForumPostsActivity(posts, container);
+            const page = await this.fetchActivityPage('/api/user/forum-posts', cursor);
+            this.displayForumPostsActivity(page.posts, container, Boolean(cursor));
+            this.showLoadMore(container, page, next => this.loadForumPostsActivity(next));
         } catch (error) {
             container.innerHTML = '<div class="alert alert-danger">Failed to load forum posts</div>';
             throw error;
         }
     }
 
-    async loadCommentsActivity() {
+    async loadCommentsActivity(cursor = null) {
         const container = document.getElementById('commentsContainer');
         if (!container) return;
 
         try {
-            // Fetch both forum comments and entry comments
-            const [forumResponse, entryResponse] = await Promise.all([
-                fetch('/api/user/forum-comments'),
-                fetch('/api/user/entry-comments')
-            ]);
-            
-            if (!forumResponse.ok || !entryResponse.ok) {
-                throw new Error('Failed to fetch comments');
-            }
-            
-            const forumComments = await forumResponse.json();
-            const entryComments = await entryResponse.json();
-            
-            this.displayCommentsActivity(forumComments, entryComments, container);
+            // forum replies and entry comments come merged and sorted by the server
+            const page = await this.fetchActivityPage('/api/user/activity', cursor);
+            this.displayCommentsActivity(page.activity, container, Boolean(cursor));
+            this.showLoadMore(container, page, next => this.loadCommentsActivity(next));
         } catch (error) {
             container.innerHTML = '<div class="alert alert-danger">Failed to load comments</div>';
             throw error;
         }
     }
 
-    displayProjectsActivity(entries, container) {
-        const projectGroups = this.groupEntriesByProject(entries);
-        
-        if (Object.keys(projectGroups).length === 0) {
+    async fetchActivityPage(url, cursor) {
+        const response = await fetch(cursor ? `${url}?cursor=${encodeURIComponent(cursor)}` : url);
+        if (!response.ok) throw new Error(`Failed to fetch ${url}`);
+        return response.json();
+    }
+
+    showLoadMore(container, page, loadNext) {
+        container.querySelector('.load-more-activity')?.remove();
+        if (!page.has_more) return;
+
+        container.insertAdjacentHTML('beforeend', `
+            <div class="text-center load-more-activity">
+                <button class="btn btn-outline-secondary btn-sm" type="button">Load more</button>
+            </div>
+        `);
+        const button = container.querySelector('.load-more-activity button');
+        button.addEventListener('click', () => {
+            button.disabled = true;
+            loadNext(page.next_cursor).catch(error => this.logError(error, 'Loading more activity'));
+        });
+    }
+
+    displayProjectsActivity(projects, container) {
+        if (projects.length === 0) {
             container.innerHTML = `
                 <div class="alert alert-info">
                     <i class="bi bi-folder-plus"></i> 
@@ -1075,16 +1122,21 @@ class ProfileManager {
         }
 
         let html = '';
-        Object.entries(projectGroups).forEach(([projectName, projectEntries]) => {
+        projects.forEach(project => {
+            const projectEntries = project.recent_entries;
             const visibleEntries = projectEntries.slice(0, 2);
             const hasMore = projectEntries.length > 2;
+            const lastEntry = project.last_entry_at ? new Date(project.last_entry_at).toLocaleDateString() : null;
             
             html += `
-                <div class="project-activity-card card mb-3" data-project="${escapeHtml(projectName)}">
+                <div class="project-activity-card card mb-3" data-project="${escapeHtml(project.project_name)}">
                     <div class="card-header d-flex justify-content-between align-items-center">
                         <div>
-                            <h6 class="mb-0 text-yellow">${escapeHtml(projectName)}</h6>
-                            <small class="text-muted">${projectEntries.length} total entries</small>
+                            <h6 class="mb-0 text-yellow">${escapeHtml(project.project_name)}</h6>
+                            <small class="text-muted">
+                                ${project.entry_count} total entries &middot; ${project.total_time_worked} min
+                                ${lastEntry ? `&middot; last ${lastEntry}` : ''}
+                            </small>
                         </div>
                         ${hasMore ? `
                             <button class="expand-toggle" type="button" title="Show all entries">
@@ -1158,16 +1210,6 @@ class ProfileManager {
         });
     }
 
-    groupEntriesByProject(entries) {
-        return entries.reduce((groups, entry) => {
-            const project = entry.project_name || entry.project || 'Uncategorized';
-            if (!groups[project]) {
-                groups[project] = [];
-            }
-            groups[project].push(entry);
-            return groups;
-        }, {});
-    }
 
     async handleGenerateKey() {
         try {
@@ -1225,8 +1267,8 @@ class ProfileManager {
         recentEntries.innerHTML = entries.map(entry => createEntryCard(entry)).join('');
     }
 
-    displayForumPostsActivity(posts, container) {
-        if (!posts || posts.length === 0) {
+    displayForumPostsActivity(posts, container, append = false) {
+        if (!append && (!posts || posts.length === 0)) {
             container.innerHTML = `
                 <div class="alert alert-info">
                     <i class="bi bi-chat-square-text"></i> 
@@ -1262,42 +1304,27 @@ class ProfileManager {
             `;
         });
 
-        container.innerHTML = html;
+        if (append) {
+            container.querySelector('.load-more-activity')?.insertAdjacentHTML('beforebegin', html);
+        } else {
+            container.innerHTML = html;
+        }
     }
 
-    displayCommentsActivity(forumComments, entryComments, container) {
-        const allComments = [];
-        
-        // Process forum comments
-        forumComments.forEach(comment => {
-            allComments.push({
-                ...comment,
-                type: 'forum',
-                title: comment.topic_title,
-                url: comment.topic_url,
-                context: comment.forum_name
-            });
-        });
-        
-        // Process entry comments
-        entryComments.forEach(comment => {
-            allComments.push({
-                ...comment,
-                type: 'entry',
-                title: comment.entry_title,
-                url: comment.entry_url,
-                context: `${comment.project_name} Project`
-            });
-        });
-        
-        // Sort by date (most recent first)
-        allComments.sort((a, b) => {
-            const dateA = new Date(a.created_at || a.timestamp);
-            const dateB = new Date(b.created_at || b.timestamp);
-            return dateB - dateA;
+    displayCommentsActivity(items, container, append = false) {
+        const allComments = items.map(comment => comment.type === 'forum' ? {
+            ...comment,
+            title: comment.topic_title,
+            url: comment.topic_url,
+            context: comment.forum_name
+        } : {
+            ...comment,
+            title: comment.entry_title,
+            url: comment.entry_url,
+            context: `${comment.project_name} Project`
         });
 
-        if (allComments.length === 0) {
+        if (!append && allComments.length === 0) {
             container.innerHTML = `
                 <div class="alert alert-info">
                     <i class="bi bi-chat-dots"></i> 
@@ -1334,7 +1361,11 @@ class ProfileManager {
             `;
         });
 
-        container.innerHTML = html;
+        if (append) {
+            container.querySelector('.load-more-activity')?.insertAdjacentHTML('beforebegin', html);
+        } else {
+            container.innerHTML = html;
+        }
     }
 }
 
@@ -1474,6 +1505,45 @@ function escapeHtml(unsafe) { // prevents xss in dynamic stuff
         .replace(/'/g, "&#039;");
 }
 
+// Conditional GET for polled JSON endpoints: remember the last ETag/body per url
+// and send If-None-Match, so unchanged data comes back as an empty 304
+const etagCache = new Map();
+const ETAG_CACHE_LIMIT = 50;
+
+export async function fetchWithETag(url, options = {}) {
+    const cached = etagCache.get(url);
+    const headers = new Headers(options.headers || {});
+    if (cached) {
+        headers.set('If-None-Match', cached.etag);
+    }
+
+    // no-cache so the browser revalidates with us instead of answering from its own cache
+    const response = await fetch(url, { ...options, headers, cache: 'no-cache' });
+
+    if (response.status === 304 && cached) {
+        // refresh the LRU position and hand back the stored body as a normal 200
+        etagCache.delete(url);
+        etagCache.set(url, cached);
+        return new Response(cached.body, {
+            status: 200,
+            headers: { 'Content-Type': 'application/json', 'ETag': cached.etag }
+        });
+    }
+
+    const etag = response.headers.get('ETag');
+    if (response.ok && etag) {
+        const body = await response.clone().text();
+        etagCache.delete(url);
+        etagCache.set(url, { etag, body });
+        if (etagCache.size > ETAG_CACHE_LIMIT) {
+            etagCache.delete(etagCache.keys().next().value);
+        }
+    }
+    return response;
+}
+
+window.fetchWithETag = fetchWithETag;
+
 window.showNotification = function(message, type = 'info') {
     const alertDiv = document.createElement('div');
     alertDiv.className = `alert alert-${type} alert-dismissible fade show position-fixed top-0 end-0 m-3`;
@@ -90,14 +90,45 @@ export class EntryViewer {
 
     initializeManagers() {
         // Initialize reaction and comment managers
-        new ReactionManager();
-        new CommentManager();
+        this.reactionManager = new ReactionManager();
+        this.commentManager = new CommentManager();
+        this.connectStream();
+    }
+
+    connectStream() {
+        // live comments and reaction counts from other viewers of this entry
+        if (!window.EventSource || !this.entry) return;
+        this.stream = new EventSource(`/api/stream?entries=${this.entry.id}`);
+
+        this.stream.addEventListener('comment', (e) => {
+            this.commentManager.addComment(JSON.parse(e.data));
+        });
+        this.stream.addEventListener('reactions', (e) => {
+            const data = JSON.parse(e.data);
+            this.reactionManager.applyCounts(String(data.entry_id), data.likes_count, data.dislikes_count);
+        });
+        // we missed events (slow tab or reconnect), refetch instead
+        this.stream.addEventListener('resync', () => this.resync());
+
+        window.addEventListener('pagehide', () => this.stream.close());
+    }
+
+    async resync() {
+        this.commentManager.loadComments();
+        try {
+            const response = await (window.fetchWithETag || fetch)(`/api/entries/${this.entry.id}`);
+            if (!response.ok) return;
+            const entry = await response.json();
+            this.reactionManager.applyCounts(String(entry.id), entry.likes_count, entry.dislikes_count);
+        } catch (error) {
+            console.error('Error refreshing entry:', error);
+        }
     }
 
     async loadComments() {
         try {
             console.log('Loading comments for entry:', this.entry.id);
-            const response = await fetch(`/api/entries/${this.entry.id}/comments`);
+            const response = await (window.fetchWithETag || fetch)(`/api/entries/${this.entry.id}/comments`);
             if (!response.ok) throw new Error('Failed to fetch comments');
             
             const comments = await response.json();
@@ -296,6 +327,15 @@ export class ReactionManager {
         return this.entryStates.get(entryId);
     }
 
+    applyCounts(entryId, likes, dislikes) {
+        const button = document.querySelector(`.reaction-btn[data-entry-id="${entryId}"]`);
+        const container = button?.closest('.reactions');
+        // our own click is still on its way, its response carries the counts
+        if (!container || container.querySelector('.reaction-btn:disabled')) return;
+        container.querySelector('.likes-count').textContent = likes;
+        container.querySelector('.dislikes-count').textContent = dislikes;
+    }
+
     updateEntryState(entryId, newState) {
         this.entryStates.set(entryId, newState);
         return newState;
@@ -438,7 +478,7 @@ class CommentManager {
 
         try {
             commentsContainer.innerHTML = '<div class="text-center"><div class="spinner-border" role="status"><span class="visually-hidden">Loading comments...</span></div></div>';
-            const response = await fetch(`/api/entries/${this.entryId}/comments`);
+            const response = await (window.fetchWithETag || fetch)(`/api/entries/${this.entryId}/comments`);
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
@@ -495,8 +535,8 @@ class CommentManager {
                 form.classList.add('d-none');
             }
 
-            // Reload comments to show new comment
-            window.location.reload();
+            // the stream may deliver it too, addComment ignores the duplicate
+            this.addComment(await response.json());
 
         } catch (error) {
             console.error('Error posting comment:', error);
@@ -509,6 +549,21 @@ class CommentManager {
         }
     }
 
+    addComment(comment) {
+        const commentsContainer = document.querySelector(`#comments-${this.entryId}`);
+        if (!commentsContainer || commentsContainer.querySelector(`.comment[data-comment-id="${comment.id}"]`)) {
+            return;
+        }
+        const parent = comment.parent_id
+            ? commentsContainer.querySelector(`.comment[data-comment-id="${comment.parent_id}"] .replies`)
+            : commentsContainer;
+        if (!parent) return;
+
+        // "No comments yet" placeholder
+        commentsContainer.querySelector(':scope > p.text-muted')?.remove();
+        parent.insertAdjacentHTML('beforeend', this.createCommentHTML(comment));
+    }
+
     toggleReplyForm(button) {
         const commentId = button.dataset.commentId;
         const replyForm = document.querySelector(`.reply-form[data-parent-id="${commentId}"]`);
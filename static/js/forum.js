@@ -7,6 +7,27 @@ export class ForumManager {
         this.submitTopicBtn = document.getElementById('submitTopic');
         
         this.bindEvents();
+        this.connectStream();
+    }
+
+    connectStream() {
+        // new replies from other people while the topic is open
+        const topicId = this.container.dataset.topicId;
+        if (!topicId || !window.EventSource) return;
+        this.stream = new EventSource(`/api/stream?topics=${topicId}`);
+        this.stream.addEventListener('reply', (e) => this.addReply(JSON.parse(e.data)));
+        window.addEventListener('pagehide', () => this.stream.close());
+    }
+
+    addReply(reply) {
+        const list = this.container.querySelector('.replies-list');
+        // with unloaded pages in between it turns up at the end of "load more"
+        if (!list || this.container.querySelector('.load-more-replies') ||
+            document.getElementById(`reply-${reply.id}`)) {
+            return;
+        }
+        this.container.querySelector('.replies-empty')?.remove();
+        list.insertAdjacentHTML('beforeend', reply.html);
     }
 
     bindEvents() {
@@ -24,6 +45,12 @@ export class ForumManager {
                 const topicId = replyBtn.dataset.topicId;
                 this.showReplyForm(topicId);
             }
+
+            const loadMoreBtn = e.target.closest('.load-more-replies');
+            if (loadMoreBtn) {
+                e.preventDefault();
+                this.loadMoreReplies(loadMoreBtn);
+            }
         });
     }
 
@@ -101,6 +128,32 @@ export class ForumManager {
         // Implementation for showing and handling reply form
     }
 
+    async loadMoreReplies(button) {
+        const list = this.container.querySelector('.replies-list');
+        button.classList.add('disabled');
+
+        try {
+            const response = await fetch(`${button.dataset.url}?after=${button.dataset.after}`);
+            if (!response.ok) {
+                throw new Error('Failed to load replies');
+            }
+
+            const data = await response.json();
+            // html comes from the same server-side partial used for the first page
+            list.insertAdjacentHTML('beforeend', data.replies.map(reply => reply.html).join(''));
+
+            if (data.has_more) {
+                button.dataset.after = data.next_after;
+                button.classList.remove('disabled');
+            } else {
+                button.parentElement.remove();
+            }
+        } catch (error) {
+            console.error('Error loading replies:', error);
+            button.classList.remove('disabled');
+        }
+    }
+
 
 
     escapeHtml(unsafe) {
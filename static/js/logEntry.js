@@ -1,5 +1,23 @@
 let instance = null;
 
+// poll a background job's status url until it has finished; returns the job
+export async function pollJob(statusUrl, { interval = 2000, onProgress = null } = {}) {
+    while (true) {
+        const response = await fetch(statusUrl, { credentials: 'same-origin' });
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        const job = await response.json();
+        if (job.status === 'succeeded' || job.status === 'failed') {
+            return job;
+        }
+        if (onProgress) {
+            onProgress(job);
+        }
+        await new Promise(resolve => setTimeout(resolve, interval));
+    }
+}
+
 export class LogEntry {
     constructor() {
         // Return existing instance if one exists
@@ -61,7 +79,15 @@ export class LogEntry {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
             
-            const commits = await response.json();
+            let commits = await response.json();
+            if (response.status === 202) {
+                // first fetch for this project is still running on the server
+                const job = await pollJob(commits.status_url);
+                if (job.status !== 'succeeded') {
+                    throw new Error(job.error || 'Fetching commits failed');
+                }
+                commits = job.result.commits;
+            }
             console.log("Received commits:", commits);
             
             // clear options
@@ -1,3 +1,5 @@
+import { pollJob } from './logEntry.js';
+
 export class ProjectView {
     constructor() {
         console.log('ProjectView constructor starting...');
@@ -30,6 +32,24 @@ export class ProjectView {
         this.initializeEntryMapping();
         this.setupCommitTimeline();
         this.setupForumHandlers();
+        this.waitForCommits();
+    }
+
+    async waitForCommits() {
+        // the first view of a project queues the GitHub fetch; reload once it's done
+        const pending = document.getElementById('commitsPending');
+        if (!pending) return;
+        try {
+            const job = await pollJob(pending.dataset.statusUrl);
+            if (job.status === 'succeeded') {
+                window.location.reload();
+            } else {
+                pending.className = 'alert alert-warning';
+                pending.textContent = 'Could not fetch commits from GitHub.';
+            }
+        } catch (error) {
+            console.error('Error waiting for commits:', error);
+        }
     }
 
     initializeEntryMapping() {
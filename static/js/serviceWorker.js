@@ -1,5 +1,5 @@
 // pwa stuff
-const CACHE_NAME = 'devlog-v1';
+const CACHE_NAME = 'devlog-v2';
 
 // these urls must match routes
 const URLS_TO_CACHE = [
@@ -52,9 +52,173 @@ self.addEventListener('activate', event => {
     );
 });
 
+// Offline replica of entries, comments and forum posts in IndexedDB, kept
+// current with /api/sync so a reopened app downloads only what changed
+const REPLICA_DB = 'devlog-replica';
+const REPLICA_VERSION = 1;
+const REPLICA_STORES = ['entries', 'comments', 'topics', 'replies'];
+
+function requestResult(request) {
+    return new Promise((resolve, reject) => {
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function transactionDone(tx) {
+    return new Promise((resolve, reject) => {
+        tx.oncomplete = () => resolve();
+        tx.onerror = tx.onabort = () => reject(tx.error);
+    });
+}
+
+function openReplica() {
+    const request = indexedDB.open(REPLICA_DB, REPLICA_VERSION);
+    request.onupgradeneeded = () => {
+        const db = request.result;
+        REPLICA_STORES.forEach(name => {
+            const store = db.createObjectStore(name, { keyPath: 'id' });
+            if (name === 'comments') store.createIndex('entry_id', 'entry_id');
+            if (name === 'replies') store.createIndex('topic_id', 'topic_id');
+        });
+        // cursor and user of the last sync
+        db.createObjectStore('meta');
+    };
+    return requestResult(request);
+}
+
+async function readMeta(db) {
+    const store = db.transaction('meta').objectStore('meta');
+    const [cursor, user] = await Promise.all([
+        requestResult(store.get('cursor')),
+        requestResult(store.get('user'))
+    ]);
+    return { cursor: cursor || 0, user: user || null };
+}
+
+function clearReplica(db) {
+    const tx = db.transaction([...REPLICA_STORES, 'meta'], 'readwrite');
+    [...REPLICA_STORES, 'meta'].forEach(name => tx.objectStore(name).clear());
+    return transactionDone(tx);
+}
+
+function applyPage(db, page) {
+    // one transaction per page, so the cursor never gets ahead of the data
+    const tx = db.transaction([...REPLICA_STORES, 'meta'], 'readwrite');
+    REPLICA_STORES.forEach(name => {
+        const store = tx.objectStore(name);
+        page[name].forEach(row => store.put(row));
+        page.deleted[name].forEach(id => store.delete(id));
+    });
+    const meta = tx.objectStore('meta');
+    meta.put(page.cursor, 'cursor');
+    meta.put(page.user, 'user');
+    return transactionDone(tx);
+}
+
+async function runSync() {
+    const db = await openReplica();
+    let { cursor, user } = await readMeta(db);
+    while (true) {
+        const response = await fetch(`/api/sync?since=${cursor}`, { credentials: 'same-origin' });
+        if (!response.ok) {
+            throw new Error(`Sync failed: ${response.status}`);
+        }
+        const page = await response.json();
+        if (page.reset || (cursor && page.user !== user)) {
+            await clearReplica(db);
+            cursor = 0;
+            user = page.user;
+            continue;
+        }
+        await applyPage(db, page);
+        cursor = page.cursor;
+        if (!page.has_more) {
+            return db;
+        }
+    }
+}
+
+// pages opening at the same time share one sync
+let syncing = null;
+function syncReplica() {
+    if (!syncing) {
+        syncing = runSync().finally(() => { syncing = null; });
+    }
+    return syncing;
+}
+
+function jsonResponse(data, source) {
+    return new Response(JSON.stringify(data), {
+        headers: { 'Content-Type': 'application/json', 'X-Replica': source }
+    });
+}
+
+async function hasReplica(db) {
+    return (await readMeta(db)).cursor > 0;
+}
+
+// GET /api/entries: the whole list from the replica after a delta sync
+async function replicaEntries(request) {
+    let db;
+    let source = 'synced';
+    try {
+        db = await syncReplica();
+    } catch (error) {
+        // offline: a previous sync is still better than nothing
+        db = await openReplica();
+        if (!(await hasReplica(db))) {
+            return fetch(request);
+        }
+        source = 'offline';
+    }
+    const entries = await requestResult(db.transaction('entries').objectStore('entries').getAll());
+    entries.sort((a, b) => (b.timestamp || '').localeCompare(a.timestamp || ''));
+    return jsonResponse(entries, source);
+}
+
+// GET /api/entries/<id>/comments: the network, or the replica when it fails
+async function replicaComments(request, entryId) {
+    try {
+        return await fetch(request);
+    } catch (error) {
+        const db = await openReplica();
+        const index = db.transaction('comments').objectStore('comments').index('entry_id');
+        const comments = await requestResult(index.getAll(entryId));
+        // nest like Comment.to_dict()
+        const byId = new Map(comments.map(comment => [comment.id, { ...comment, replies: [] }]));
+        const topLevel = [];
+        byId.forEach(comment => {
+            const parent = byId.get(comment.parent_id);
+            (parent ? parent.replies : topLevel).push(comment);
+        });
+        return jsonResponse(topLevel, 'offline');
+    }
+}
+
+// pages ask for a sync once they've loaded
+self.addEventListener('message', event => {
+    if (event.data && event.data.type === 'sync') {
+        event.waitUntil(syncReplica().catch(error => console.warn('Replica sync failed:', error)));
+    }
+});
+
 // Fetch event - serve from cache, fall back to network
 self.addEventListener('fetch', event => {
-    // Don't cache API calls
+    const url = new URL(event.request.url);
+    if (event.request.method === 'GET' && url.origin === self.location.origin) {
+        if (url.pathname === '/api/entries') {
+            event.respondWith(replicaEntries(event.request));
+            return;
+        }
+        const comments = url.pathname.match(/^\/api\/entries\/(\d+)\/comments$/);
+        if (comments) {
+            event.respondWith(replicaComments(event.request, Number(comments[1])));
+            return;
+        }
+    }
+
+    // Don't cache other API calls
     if (event.request.url.includes('/api/')) {
         return;
     }